@@ -5,7 +5,7 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 
 from sqlalchemy import engine_from_config
 from sqlalchemy import pool
-from domain.entities.book import Base
+from domain.entities.book import Base, DATABASE_ONLY_OBJECTS
 
 from alembic import context
 
@@ -24,6 +24,11 @@ if config.config_file_name is not None:
 target_metadata = Base.metadata
 #target_metadata = None
 
+
+def include_object(object, name, type_, reflected, compare_to):
+    # Объекты, созданные только миграциями (tsvector, GIN), не считаем лишними
+    return name not in DATABASE_ONLY_OBJECTS
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -48,6 +53,7 @@ def run_migrations_offline() -> None:
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
+        include_object=include_object,
     )
 
     with context.begin_transaction():
@@ -69,7 +75,9 @@ def run_migrations_online() -> None:
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection,
+            target_metadata=target_metadata,
+            include_object=include_object,
         )
 
         with context.begin_transaction():
@@ -0,0 +1,36 @@
+"""add openlibrary enrichment columns
+
+Revision ID: 4b7e2d91c0a3
+Revises: c82e45ec91fb
+Create Date: 2026-10-18 10:12:41.318207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4b7e2d91c0a3'
+down_revision: Union[str, Sequence[str], None] = 'c82e45ec91fb'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('books', sa.Column('openlibrary_key', sa.String(length=64), nullable=True))
+    op.add_column('books', sa.Column('cover_id', sa.Integer(), nullable=True))
+    op.add_column('books', sa.Column('subjects', sa.JSON(), nullable=True))
+    op.add_column('books', sa.Column('first_publish_year', sa.Integer(), nullable=True))
+    op.add_column('books', sa.Column('enriched_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('books', 'enriched_at')
+    op.drop_column('books', 'first_publish_year')
+    op.drop_column('books', 'subjects')
+    op.drop_column('books', 'cover_id')
+    op.drop_column('books', 'openlibrary_key')
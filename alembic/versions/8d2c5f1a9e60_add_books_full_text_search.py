@@ -0,0 +1,45 @@
+"""add books full text search
+
+Revision ID: 8d2c5f1a9e60
+Revises: 4b7e2d91c0a3
+Create Date: 2026-10-18 12:40:05.771342
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d2c5f1a9e60'
+down_revision: Union[str, Sequence[str], None] = '4b7e2d91c0a3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Конфигурация 'simple': каталог смешанный (русский и английский), без стемминга.
+    # Веса: название (A) важнее автора (B), автор важнее описания (C).
+    op.execute("""
+        ALTER TABLE books ADD COLUMN search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+            setweight(to_tsvector('simple', coalesce(author, '')), 'B') ||
+            setweight(to_tsvector('simple', coalesce(description, '')), 'C')
+        ) STORED
+    """)
+    op.create_index(
+        'idx_books_search_vector',
+        'books',
+        ['search_vector'],
+        unique=False,
+        postgresql_using='gin'
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_books_search_vector', table_name='books', postgresql_using='gin')
+    op.drop_column('books', 'search_vector')
@@ -0,0 +1,41 @@
+"""add books trigram indexes
+
+Revision ID: a3f9c6b2d714
+Revises: 8d2c5f1a9e60
+Create Date: 2026-10-18 14:05:12.418330
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3f9c6b2d714'
+down_revision: Union[str, Sequence[str], None] = '8d2c5f1a9e60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    # Нечёткий поиск с опечатками: операторы %, <% и similarity() по GIN-индексу
+    op.execute("CREATE INDEX idx_books_title_trgm ON books USING gin (title gin_trgm_ops)")
+    op.execute("CREATE INDEX idx_books_author_trgm ON books USING gin (author gin_trgm_ops)")
+
+    # Автодополнение по префиксу: диапазон по lower(...) в порядке "C" (по кодам символов)
+    # работает с параметрами запроса и не зависит от collation базы
+    op.execute('CREATE INDEX idx_books_title_prefix ON books ((lower(title) COLLATE "C"))')
+    op.execute('CREATE INDEX idx_books_author_prefix ON books ((lower(author) COLLATE "C"))')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_books_author_prefix', table_name='books')
+    op.drop_index('idx_books_title_prefix', table_name='books')
+    op.drop_index('idx_books_author_trgm', table_name='books')
+    op.drop_index('idx_books_title_trgm', table_name='books')
+    # Расширение не удаляем: им могут пользоваться другие объекты базы
@@ -0,0 +1,122 @@
+"""shard book facet counts
+
+Revision ID: a8e4f2c6d913
+Revises: f1b6d3a8c527
+Create Date: 2026-10-19 16:37:52.804216
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a8e4f2c6d913'
+down_revision: Union[str, Sequence[str], None] = 'f1b6d3a8c527'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Шардов на каждое значение фасета: соединения с разным pg_backend_pid() % SHARDS
+# обновляют разные строки и не ждут коммита друг друга на популярных жанрах
+SHARDS = 32
+
+# Значения фасетов одной книги; используется в триггере и при пересчёте
+FACET_VALUES = """
+    CROSS JOIN LATERAL (VALUES
+        ('genre', b.genre::text),
+        ('decade', (b.year_publication / 10 * 10)::text),
+        ('accessibility', b.accessibility::text)
+    ) AS f(facet, value)
+"""
+
+# Прибавляет к счётчикам шарда своего соединения сумму delta по строкам source.
+# Счётчик одного шарда может уйти в минус (книгу добавило другое соединение) — значение фасета
+# определяет сумма по шардам. Строки блокируются в порядке (facet, value) — без взаимоблокировок.
+APPLY_DELTA = """
+        INSERT INTO book_facet_counts (facet, value, shard, count)
+        SELECT f.facet, f.value, pg_backend_pid() % {shards}, sum(b.delta)
+        FROM ({source}) AS b
+        {facet_values}
+        GROUP BY f.facet, f.value
+        HAVING sum(b.delta) <> 0
+        ORDER BY f.facet, f.value
+        ON CONFLICT (facet, value, shard) DO UPDATE SET count = book_facet_counts.count + EXCLUDED.count;
+"""
+
+# Прежняя версия (один счётчик на значение) — для downgrade
+APPLY_DELTA_SINGLE = """
+        INSERT INTO book_facet_counts (facet, value, count)
+        SELECT f.facet, f.value, sum(b.delta)
+        FROM ({source}) AS b
+        {facet_values}
+        GROUP BY f.facet, f.value
+        HAVING sum(b.delta) <> 0
+        ORDER BY f.facet, f.value
+        ON CONFLICT (facet, value) DO UPDATE SET count = book_facet_counts.count + EXCLUDED.count;
+"""
+
+NEW_ROWS = "SELECT genre, year_publication, accessibility, 1 AS delta FROM new_rows"
+OLD_ROWS = "SELECT genre, year_publication, accessibility, -1 AS delta FROM old_rows"
+
+
+def apply_function(apply_delta: str, cleanup: str) -> str:
+    def apply(source: str) -> str:
+        return apply_delta.format(source=source, facet_values=FACET_VALUES, shards=SHARDS)
+
+    return f"""
+        CREATE OR REPLACE FUNCTION book_facet_counts_apply() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                {apply(NEW_ROWS)}
+            ELSIF TG_OP = 'DELETE' THEN
+                {apply(OLD_ROWS)}
+            ELSE
+                {apply(f"{NEW_ROWS} UNION ALL {OLD_ROWS}")}
+            END IF;
+            IF TG_OP <> 'INSERT' THEN
+                {cleanup}
+            END IF;
+            RETURN NULL;
+        END;
+        $$
+    """
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Имеющиеся счётчики становятся шардом 0
+    op.add_column(
+        'book_facet_counts',
+        sa.Column('shard', sa.Integer(), nullable=False, server_default=sa.text('0'))
+    )
+    op.alter_column('book_facet_counts', 'shard', server_default=None)
+    op.drop_constraint('book_facet_counts_pkey', 'book_facet_counts', type_='primary')
+    op.create_primary_key('book_facet_counts_pkey', 'book_facet_counts', ['facet', 'value', 'shard'])
+    op.create_check_constraint(
+        'check_book_facet_counts_shard', 'book_facet_counts', f'shard >= 0 AND shard < {SHARDS}'
+    )
+    # Чистит только свой шард: чужие строки не блокируются
+    op.execute(apply_function(
+        APPLY_DELTA,
+        f"DELETE FROM book_facet_counts WHERE shard = pg_backend_pid() % {SHARDS} AND count = 0;"
+    ))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(apply_function(APPLY_DELTA_SINGLE, "DELETE FROM book_facet_counts WHERE count <= 0;"))
+    op.execute("DELETE FROM book_facet_counts")
+    op.drop_constraint('check_book_facet_counts_shard', 'book_facet_counts', type_='check')
+    op.drop_constraint('book_facet_counts_pkey', 'book_facet_counts', type_='primary')
+    op.drop_column('book_facet_counts', 'shard')
+    op.create_primary_key('book_facet_counts_pkey', 'book_facet_counts', ['facet', 'value'])
+    op.execute(f"""
+        INSERT INTO book_facet_counts (facet, value, count)
+        SELECT f.facet, f.value, count(*)
+        FROM books AS b
+        {FACET_VALUES}
+        GROUP BY f.facet, f.value
+    """)
@@ -0,0 +1,119 @@
+"""add book facet counts
+
+Revision ID: b5d1e7a4c932
+Revises: a3f9c6b2d714
+Create Date: 2026-10-18 16:20:44.902117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5d1e7a4c932'
+down_revision: Union[str, Sequence[str], None] = 'a3f9c6b2d714'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Значения фасетов одной книги; используется в триггере и при начальном заполнении
+FACET_VALUES = """
+    CROSS JOIN LATERAL (VALUES
+        ('genre', b.genre::text),
+        ('decade', (b.year_publication / 10 * 10)::text),
+        ('accessibility', b.accessibility::text)
+    ) AS f(facet, value)
+"""
+
+# Прибавляет к счётчикам сумму delta по строкам source.
+# Строки счётчиков блокируются в порядке (facet, value) — параллельные записи не дают взаимоблокировок.
+APPLY_DELTA = """
+        INSERT INTO book_facet_counts (facet, value, count)
+        SELECT f.facet, f.value, sum(b.delta)
+        FROM ({source}) AS b
+        {facet_values}
+        GROUP BY f.facet, f.value
+        HAVING sum(b.delta) <> 0
+        ORDER BY f.facet, f.value
+        ON CONFLICT (facet, value) DO UPDATE SET count = book_facet_counts.count + EXCLUDED.count;
+"""
+
+NEW_ROWS = "SELECT genre, year_publication, accessibility, 1 AS delta FROM new_rows"
+OLD_ROWS = "SELECT genre, year_publication, accessibility, -1 AS delta FROM old_rows"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'book_facet_counts',
+        sa.Column('facet', sa.String(length=32), nullable=False),
+        sa.Column('value', sa.String(length=100), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('facet', 'value')
+    )
+    op.execute(f"""
+        INSERT INTO book_facet_counts (facet, value, count)
+        SELECT f.facet, f.value, count(*)
+        FROM books AS b
+        {FACET_VALUES}
+        GROUP BY f.facet, f.value
+    """)
+
+    # Триггеры уровня оператора с таблицами переходов: пакетная вставка
+    # обновляет каждый счётчик один раз, а не по разу на строку
+    op.execute(f"""
+        CREATE FUNCTION book_facet_counts_apply() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                {APPLY_DELTA.format(source=NEW_ROWS, facet_values=FACET_VALUES)}
+            ELSIF TG_OP = 'DELETE' THEN
+                {APPLY_DELTA.format(source=OLD_ROWS, facet_values=FACET_VALUES)}
+            ELSE
+                {APPLY_DELTA.format(source=f"{NEW_ROWS} UNION ALL {OLD_ROWS}", facet_values=FACET_VALUES)}
+            END IF;
+            IF TG_OP <> 'INSERT' THEN
+                DELETE FROM book_facet_counts WHERE count <= 0;
+            END IF;
+            RETURN NULL;
+        END;
+        $$
+    """)
+    op.execute("""
+        CREATE TRIGGER books_facet_counts_insert AFTER INSERT ON books
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION book_facet_counts_apply()
+    """)
+    op.execute("""
+        CREATE TRIGGER books_facet_counts_update AFTER UPDATE ON books
+        REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION book_facet_counts_apply()
+    """)
+    op.execute("""
+        CREATE TRIGGER books_facet_counts_delete AFTER DELETE ON books
+        REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION book_facet_counts_apply()
+    """)
+
+    # Фасетный запрос с фильтром по жанру/году читает только индекс
+    op.drop_index('idx_genre_year', table_name='books')
+    op.create_index(
+        'idx_genre_year',
+        'books',
+        ['genre', 'year_publication'],
+        unique=False,
+        postgresql_include=['accessibility']
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_genre_year', table_name='books')
+    op.create_index('idx_genre_year', 'books', ['genre', 'year_publication'], unique=False)
+    op.execute("DROP TRIGGER books_facet_counts_delete ON books")
+    op.execute("DROP TRIGGER books_facet_counts_update ON books")
+    op.execute("DROP TRIGGER books_facet_counts_insert ON books")
+    op.execute("DROP FUNCTION book_facet_counts_apply()")
+    op.drop_table('book_facet_counts')
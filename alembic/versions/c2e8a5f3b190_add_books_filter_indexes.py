@@ -0,0 +1,32 @@
+"""add books filter indexes
+
+Revision ID: c2e8a5f3b190
+Revises: b5d1e7a4c932
+Create Date: 2026-10-18 17:48:31.250874
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c2e8a5f3b190'
+down_revision: Union[str, Sequence[str], None] = 'b5d1e7a4c932'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('idx_year_publication', 'books', ['year_publication'], unique=False)
+    op.create_index('idx_number_pages', 'books', ['number_pages'], unique=False)
+    op.create_index('idx_title', 'books', ['title'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_title', table_name='books')
+    op.drop_index('idx_number_pages', table_name='books')
+    op.drop_index('idx_year_publication', table_name='books')
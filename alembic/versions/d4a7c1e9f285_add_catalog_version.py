@@ -0,0 +1,56 @@
+"""add catalog version
+
+Revision ID: d4a7c1e9f285
+Revises: c2e8a5f3b190
+Create Date: 2026-10-18 19:02:17.603544
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4a7c1e9f285'
+down_revision: Union[str, Sequence[str], None] = 'c2e8a5f3b190'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'catalog_version',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('version', sa.BigInteger(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.CheckConstraint('id = 1', name='check_catalog_version_single_row'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.execute("INSERT INTO catalog_version (id, version, updated_at) VALUES (1, 1, timezone('utc', now()))")
+
+    # Версия меняется в той же транзакции, что и книги, — новое значение видно
+    # читателям ровно тогда, когда видны и сами изменения
+    op.execute("""
+        CREATE FUNCTION catalog_version_bump() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            UPDATE catalog_version
+            SET version = version + 1, updated_at = timezone('utc', clock_timestamp())
+            WHERE id = 1;
+            RETURN NULL;
+        END;
+        $$
+    """)
+    op.execute("""
+        CREATE TRIGGER books_catalog_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON books
+        FOR EACH STATEMENT EXECUTE FUNCTION catalog_version_bump()
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER books_catalog_version ON books")
+    op.execute("DROP FUNCTION catalog_version_bump()")
+    op.drop_table('catalog_version')
@@ -0,0 +1,112 @@
+"""shard catalog version
+
+Revision ID: e7c3a9d2f416
+Revises: d4a7c1e9f285
+Create Date: 2026-10-19 10:41:08.215390
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7c3a9d2f416'
+down_revision: Union[str, Sequence[str], None] = 'd4a7c1e9f285'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Строк-счётчиков версии: пишущие транзакции разных соединений обновляют разные строки
+# и не ждут друг друга до коммита, как было с единственной строкой
+SHARDS = 32
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("DROP TRIGGER books_catalog_version ON books")
+    op.execute("DROP FUNCTION catalog_version_bump()")
+    op.drop_constraint('check_catalog_version_single_row', 'catalog_version', type_='check')
+    op.create_check_constraint(
+        'check_catalog_version_shard', 'catalog_version', f'id >= 0 AND id < {SHARDS}'
+    )
+    # Версия каталога — сумма по шардам: каждый коммит увеличивает её хотя бы на 1
+    op.execute(f"""
+        INSERT INTO catalog_version (id, version, updated_at)
+        SELECT shard, 0, timezone('utc', now()) FROM generate_series(0, {SHARDS - 1}) AS shard
+        ON CONFLICT (id) DO NOTHING
+    """)
+
+    # Операторы, не затронувшие ни одной строки (UPDATE/DELETE несуществующего id),
+    # версию не меняют: иначе они сбрасывали бы ETag всех списков впустую
+    op.execute(f"""
+        CREATE FUNCTION catalog_version_bump() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                IF NOT EXISTS (SELECT 1 FROM new_rows) THEN
+                    RETURN NULL;
+                END IF;
+            ELSIF TG_OP <> 'TRUNCATE' THEN
+                IF NOT EXISTS (SELECT 1 FROM old_rows) THEN
+                    RETURN NULL;
+                END IF;
+            END IF;
+            UPDATE catalog_version
+            SET version = version + 1, updated_at = timezone('utc', clock_timestamp())
+            WHERE id = pg_backend_pid() % {SHARDS};
+            RETURN NULL;
+        END;
+        $$
+    """)
+    op.execute("""
+        CREATE TRIGGER books_catalog_version_insert AFTER INSERT ON books
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION catalog_version_bump()
+    """)
+    op.execute("""
+        CREATE TRIGGER books_catalog_version_update AFTER UPDATE ON books
+        REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION catalog_version_bump()
+    """)
+    op.execute("""
+        CREATE TRIGGER books_catalog_version_delete AFTER DELETE ON books
+        REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION catalog_version_bump()
+    """)
+    op.execute("""
+        CREATE TRIGGER books_catalog_version_truncate AFTER TRUNCATE ON books
+        FOR EACH STATEMENT EXECUTE FUNCTION catalog_version_bump()
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for operation in ('insert', 'update', 'delete', 'truncate'):
+        op.execute(f"DROP TRIGGER books_catalog_version_{operation} ON books")
+    op.execute("DROP FUNCTION catalog_version_bump()")
+    op.execute("""
+        UPDATE catalog_version
+        SET version = (SELECT sum(version) FROM catalog_version),
+            updated_at = (SELECT max(updated_at) FROM catalog_version)
+        WHERE id = 1
+    """)
+    op.execute("DELETE FROM catalog_version WHERE id <> 1")
+    op.drop_constraint('check_catalog_version_shard', 'catalog_version', type_='check')
+    op.create_check_constraint('check_catalog_version_single_row', 'catalog_version', 'id = 1')
+    op.execute("""
+        CREATE FUNCTION catalog_version_bump() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            UPDATE catalog_version
+            SET version = version + 1, updated_at = timezone('utc', clock_timestamp())
+            WHERE id = 1;
+            RETURN NULL;
+        END;
+        $$
+    """)
+    op.execute("""
+        CREATE TRIGGER books_catalog_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON books
+        FOR EACH STATEMENT EXECUTE FUNCTION catalog_version_bump()
+    """)
@@ -0,0 +1,34 @@
+"""add books code point sort indexes
+
+Revision ID: f1b6d3a8c527
+Revises: e7c3a9d2f416
+Create Date: 2026-10-19 14:02:37.518604
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1b6d3a8c527'
+down_revision: Union[str, Sequence[str], None] = 'e7c3a9d2f416'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Keyset по названию и автору сортирует по кодам символов, как индекс в памяти,
+    # а не по правилам сортировки колонки — индексы по тем же выражениям
+    op.execute('CREATE INDEX idx_books_title_sort ON books ((title COLLATE "C"), book_id)')
+    op.execute('CREATE INDEX idx_books_author_sort ON books ((author COLLATE "C"), book_id)')
+    op.drop_index('idx_title', table_name='books')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index('idx_title', 'books', ['title'], unique=False)
+    op.drop_index('idx_books_author_sort', table_name='books')
+    op.drop_index('idx_books_title_sort', table_name='books')
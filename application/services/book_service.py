@@ -1,78 +1,502 @@
-from typing import List, Optional
+import csv
+import hashlib
+import io
+import json
+from datetime import datetime
+from typing import Any, AsyncContextManager, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
 from fastapi import Depends
+from loguru import logger
+from pydantic import ValidationError
+from sqlalchemy.exc import IntegrityError
+from config.settings import get_settings
+from domain.entities.book import Book
+from domain.exceptions import ValidationException
 from domain.repositories.book_repository import IBookRepository
-from domain.schemas.book import BookCreate, BookResponse
-from infrastructure.external.openlibrary_client import OpenLibraryClient
+from domain.schemas.book import (
+    BookCreate, BookFacets, BookFilter, BookResponse, BookSearchHit, BookSuggestion, BulkCreateResponse, BulkItemError,
+    FacetCount, SORT_VALUE_TYPES
+)
+from domain.schemas.pagination import PaginatedResponse, decode_cursor, encode_cursor
+from application.services.enrichment_worker import EnrichmentQueue, get_enrichment_queue
+from infrastructure.cache.keys import BOOK_CACHE_KEY, BOOK_LIST_NAMESPACE
+from infrastructure.cache.redis_cache import CacheService, get_cache_service
 from infrastructure.external.jsonbin_client import JsonBinClient
-from infrastructure.repositories.book_repository import get_book_repository
-from infrastructure.external.file_storage_client import FileStorageClient
+from infrastructure.repositories.book_repository import get_book_repository, open_book_repository
+from infrastructure.search.memory_index import MemoryIndex, get_memory_index
+from infrastructure.external.file_storage_client import get_file_storage_client
+
+settings = get_settings()
 
 
 class BookService:
     def __init__(
             self,
             repository: IBookRepository,
-            openlibrary_client: Optional[OpenLibraryClient] = None,
-            jsonbin_client: Optional[JsonBinClient] = None
+            enrichment_queue: Optional[EnrichmentQueue] = None,
+            jsonbin_client: Optional[JsonBinClient] = None,
+            cache: Optional[CacheService] = None,
+            repository_factory: Optional[Callable[[], AsyncContextManager[IBookRepository]]] = None,
+            memory_index: Optional[MemoryIndex] = None
     ):
         self.repository = repository
-        self.openlibrary_client = openlibrary_client
+        self.enrichment_queue = enrichment_queue
         self.jsonbin_client = jsonbin_client
+        self.cache = cache
+        # Фоновое обновление кеша переживает запрос и не может использовать его сессию
+        self.repository_factory = repository_factory
+        self.memory_index = memory_index
+
+    @property
+    def _index(self) -> Optional[MemoryIndex]:
+        """Индекс в памяти, если он включён и уже построен"""
+        return self.memory_index if self.memory_index and self.memory_index.ready else None
 
     async def get_book(self, book_id: int) -> BookResponse:
-        book = await self.repository.get_by_id(book_id)
-        if not book:
+        # Промах индекса не означает 404: изменение с другого воркера могло ещё не дойти
+        record = self._index.get(book_id) if self._index else None
+        if record is not None:
+            return BookResponse.from_row(record)
+        data = await self._cached(
+            BOOK_CACHE_KEY.format(book_id=book_id),
+            lambda repository: self._load_book(repository, book_id),
+            settings.cache_book_ttl
+        )
+        if data is None:
             raise ValueError(f"Book with id {book_id} not found")
-        return BookResponse.model_validate(book)
+        return BookResponse.from_cached(data)
+
+    async def get_catalog_version(self, indexed: bool = True) -> Optional[Tuple[str, Optional[datetime]]]:
+        """
+        Версия данных, из которых будет отдан список, для условного GET: индекса (indexed —
+        список читается из него), пространства кеша списков или, без них, каталога в базе.
+        Кеш и индекс обновляются после коммита, так что версия не опережает содержимое.
+        """
+        if indexed and self._index:
+            return f"index:{self._index.version}", self._index.changed_at
+        if self.cache:
+            try:
+                version, bumped_at = await self.cache.namespace_stamp(BOOK_LIST_NAMESPACE)
+                return f"cache:{version}", bumped_at
+            except Exception as e:
+                logger.warning(f"Cache namespace lookup failed: {e}")
+        catalog = await self.repository.get_catalog_version()
+        if catalog is None:
+            return None
+        version, updated_at = catalog
+        return f"db:{version}", updated_at
+
+    @staticmethod
+    async def _load_book(repository: IBookRepository, book_id: int) -> Optional[Dict[str, Any]]:
+        book = await repository.get_by_id(book_id)
+        if not book:
+            return None
+        return BookResponse.from_row(book).model_dump(mode='json')
 
     async def get_books(
             self,
-            author: Optional[str] = None,
-            genre: Optional[str] = None,
-            year_publication: Optional[int] = None
-    ) -> List[BookResponse]:
-        filters = {
-            'author': author,
-            'genre': genre,
-            'year_publication': year_publication
-        }
-        books = await self.repository.get_all(filters)
-        return [BookResponse.model_validate(book) for book in books]
+            filters: Optional[BookFilter] = None,
+            sort: str = 'book_id',
+            order: str = 'asc',
+            cursor: Optional[str] = None,
+            page_size: Optional[int] = None,
+            include_total: bool = False
+    ) -> PaginatedResponse[BookResponse]:
+        filters = self._check_filters(filters)
+        page_size = min(page_size or settings.default_page_size, settings.max_page_size)
+
+        if self._index:
+            return await self._load_page(self._index, filters, sort, order, cursor, page_size, include_total)
+
+        cache_key = await self._list_cache_key(filters, sort, order, cursor, page_size, include_total)
+        if not cache_key:
+            return await self._load_page(self.repository, filters, sort, order, cursor, page_size, include_total)
+
+        async def load(repository: IBookRepository) -> Dict[str, Any]:
+            page = await self._load_page(repository, filters, sort, order, cursor, page_size, include_total)
+            return page.model_dump(mode='json')
+
+        data = await self._cached(cache_key, load, settings.cache_list_ttl)
+        return self._page_from_cached(BookResponse, data)
+
+    @staticmethod
+    async def _load_page(
+            repository: IBookRepository,
+            filters: dict,
+            sort: str,
+            order: str,
+            cursor: Optional[str],
+            page_size: int,
+            include_total: bool
+    ) -> PaginatedResponse[BookResponse]:
+        # Курсор привязан к полю и направлению сортировки
+        cursor_sort = sort if order == 'asc' else f'-{sort}'
+        after = decode_cursor(cursor, cursor_sort, SORT_VALUE_TYPES[sort]) if cursor else None
+
+        # Берём на одну запись больше, чтобы узнать, есть ли следующая страница
+        books = await repository.get_page(filters, sort, after, page_size + 1, order=order)
+        has_more = len(books) > page_size
+        books = books[:page_size]
+
+        next_cursor = None
+        if has_more:
+            last = books[-1]
+            next_cursor = encode_cursor(cursor_sort, [getattr(last, sort), last.book_id])
+
+        total = await repository.count(filters) if include_total else None
+
+        return PaginatedResponse[BookResponse](
+            items=[BookResponse.from_row(book) for book in books],
+            total=total,
+            page_size=page_size,
+            total_pages=-(-total // page_size) if total is not None else None,
+            next_cursor=next_cursor,
+            has_more=has_more
+        )
+
+    @staticmethod
+    def _page_from_cached(item_type: type[BookResponse], data: Dict[str, Any]) -> PaginatedResponse:
+        """Страница из кеша без повторной валидации: её записал сам сервис"""
+        return PaginatedResponse[item_type].model_construct(
+            **{**data, 'items': [item_type.from_cached(item) for item in data['items']]}
+        )
+
+    @staticmethod
+    def _check_filters(filters: Optional[BookFilter]) -> dict:
+        filters = (filters or BookFilter()).model_dump()
+        for low, high in (('year_from', 'year_to'), ('pages_min', 'pages_max')):
+            if filters[low] is not None and filters[high] is not None and filters[low] > filters[high]:
+                raise ValidationException(
+                    message=f"{low} must not be greater than {high}",
+                    details={low: filters[low], high: filters[high]}
+                )
+        return filters
+
+    async def search_books(
+            self,
+            query: str,
+            page: int = 1,
+            page_size: Optional[int] = None
+    ) -> PaginatedResponse[BookSearchHit]:
+        """Полнотекстовый поиск по названию, автору и описанию с ранжированием"""
+        page_size = min(page_size or settings.default_page_size, settings.max_page_size)
+
+        async def load(repository: IBookRepository) -> Dict[str, Any]:
+            hits, total = await repository.search(query, (page - 1) * page_size, page_size)
+            return PaginatedResponse[BookSearchHit](
+                items=[BookSearchHit.from_row(book, rank=rank, highlight=highlight) for book, rank, highlight in hits],
+                total=total,
+                page=page,
+                page_size=page_size,
+                total_pages=-(-total // page_size),
+                has_more=page * page_size < total
+            )
+
+        if self._index:
+            return await load(self._index)
+
+        cache_key = await self._list_cache_key('search', query, page, page_size)
+        if not cache_key:
+            return await load(self.repository)
+
+        async def load_cached(repository: IBookRepository) -> Dict[str, Any]:
+            return (await load(repository)).model_dump(mode='json')
+
+        data = await self._cached(cache_key, load_cached, settings.cache_list_ttl)
+        return self._page_from_cached(BookSearchHit, data)
+
+    async def get_facets(self, filters: Optional[BookFilter] = None) -> BookFacets:
+        """Число книг по жанрам, десятилетиям и доступности для текущих фильтров"""
+        filters = self._check_filters(filters)
+
+        async def load(repository: IBookRepository) -> Dict[str, Any]:
+            facets = await repository.get_facets(filters)
+            return BookFacets(
+                total=sum(facets['accessibility'].values()),
+                genre=[FacetCount(value=value, count=count) for value, count
+                       in sorted(facets['genre'].items(), key=lambda item: (-item[1], item[0]))],
+                decade=[FacetCount(value=value, count=count) for value, count in sorted(facets['decade'].items())],
+                accessibility=[FacetCount(value=value, count=count) for value, count
+                               in sorted(facets['accessibility'].items(), reverse=True)]
+            ).model_dump(mode='json')
+
+        cache_key = await self._list_cache_key('facets', filters)
+        data = await self._cached(cache_key, load, settings.cache_list_ttl) if cache_key else await load(self.repository)
+        return BookFacets.model_validate(data)
+
+    async def autocomplete(self, field: str, prefix: str, limit: Optional[int] = None) -> List[BookSuggestion]:
+        """Подсказки по началу названия или имени автора"""
+        limit = limit or settings.suggest_default_limit
+
+        async def load(repository: IBookRepository) -> List[Dict[str, Any]]:
+            return await repository.autocomplete(field, prefix, limit)
+
+        return await self._suggestions(load, 'autocomplete', field, prefix.lower(), limit)
+
+    async def fuzzy_search(self, field: str, query: str, limit: Optional[int] = None) -> List[BookSuggestion]:
+        """Поиск названия или автора с учётом опечаток"""
+        limit = limit or settings.suggest_default_limit
+        threshold = settings.fuzzy_similarity_threshold
+
+        async def load(repository: IBookRepository) -> List[Dict[str, Any]]:
+            return await repository.fuzzy_search(field, query, limit, threshold)
+
+        return await self._suggestions(load, 'fuzzy', field, query.lower(), limit, threshold)
+
+    async def _suggestions(
+            self,
+            load: Callable[[IBookRepository], Awaitable[List[Dict[str, Any]]]],
+            *key_params: Any
+    ) -> List[BookSuggestion]:
+        # Запросы идут на каждое нажатие клавиши, поэтому повторы отдаются из L1/Redis
+        cache_key = await self._list_cache_key(*key_params)
+        data = await self._cached(cache_key, load, settings.cache_list_ttl) if cache_key else await load(self.repository)
+        return [BookSuggestion.model_validate(item) for item in data]
+
+    async def export_books(
+            self,
+            fmt: str = 'ndjson',
+            filters: Optional[BookFilter] = None
+    ) -> AsyncIterator[bytes]:
+        """Потоковая выгрузка каталога в NDJSON или CSV, по одному куску на порцию курсора"""
+        filters = (filters or BookFilter()).model_dump()
+        fields = list(BookResponse.model_fields)
+
+        if fmt == 'csv':
+            buffer = io.StringIO()
+            writer = csv.DictWriter(buffer, fieldnames=fields)
+            writer.writeheader()
+            yield buffer.getvalue().encode('utf-8')
+
+        async for books in self.repository.stream_all(filters, settings.export_chunk_size):
+            if fmt == 'csv':
+                buffer = io.StringIO()
+                writer = csv.DictWriter(buffer, fieldnames=fields)
+                writer.writerows(
+                    BookResponse.from_row(book).model_dump(mode='json') for book in books
+                )
+                yield buffer.getvalue().encode('utf-8')
+            else:
+                yield b''.join(
+                    BookResponse.from_row(book).model_dump_json().encode('utf-8') + b'\n'
+                    for book in books
+                )
 
     async def create_book(self, book_data: BookCreate) -> BookResponse:
-        # Создаем книгу в БД
+        # Создаем книгу в БД; побочные эффекты — только после коммита
         book = await self.repository.create(book_data)
-        storage = FileStorageClient("books.json")
-        await storage.append_book_async(book_data.model_dump())
+        await self.repository.commit()
+        response = BookResponse.from_row(book)
+        # Сначала индекс и кеш: строка уже в базе, даже если журнал ниже упадёт
+        await self._update_index(upsert=[response])
+        # Ключ новой книги тоже: там может лежать закешированное "не найдено"
+        await self._invalidate([response.book_id])
+        await self._store_created([response.model_dump(mode='json')])
+
+        # Доп. информация из OpenLibrary подтягивается в фоне, POST её не ждёт
+        self._enqueue_enrichment([response])
+
+        return response
 
-        # Опционально: получаем доп. информацию
-        if self.openlibrary_client:
+    async def bulk_create_books(self, items: List[Dict[str, Any]]) -> BulkCreateResponse:
+        """
+        Пакетное создание книг: валидация за один проход, многострочные INSERT
+        пачками по bulk_batch_size и побочные эффекты один раз на пачку.
+        Ошибки отдельных элементов не прерывают обработку остальных.
+        """
+        if len(items) > settings.bulk_max_items:
+            raise ValidationException(
+                message=f"Too many items in bulk request (max {settings.bulk_max_items})",
+                details={"items": len(items)}
+            )
+
+        errors: List[BulkItemError] = []
+        valid: List[Tuple[int, BookCreate]] = []
+        isbn_positions: Dict[str, int] = {}
+
+        for index, item in enumerate(items):
             try:
-                extra_info = await self.openlibrary_client.search(book_data.title)
-                # Можно обновить книгу дополнительной информацией
-            except Exception as e:
-                # Логируем, но не падаем
-                print(f"Failed to fetch extra info: {e}")
+                book_data = BookCreate.model_validate(item)
+            except ValidationError as e:
+                errors.append(BulkItemError(
+                    index=index,
+                    error="validation_error",
+                    details=e.errors(include_url=False, include_context=False)
+                ))
+                continue
+            if book_data.isbn:
+                if book_data.isbn in isbn_positions:
+                    errors.append(BulkItemError(
+                        index=index,
+                        error="duplicate_isbn",
+                        details={"isbn": book_data.isbn, "duplicate_of": isbn_positions[book_data.isbn]}
+                    ))
+                    continue
+                isbn_positions[book_data.isbn] = index
+            valid.append((index, book_data))
+
+        if self._index:
+            existing = self._index.existing_isbns(isbn_positions)
+        else:
+            existing = await self.repository.get_existing_isbns(list(isbn_positions))
+        if existing:
+            for index, book_data in valid:
+                if book_data.isbn in existing:
+                    errors.append(BulkItemError(
+                        index=index,
+                        error="duplicate_isbn",
+                        details={"isbn": book_data.isbn}
+                    ))
+            valid = [(index, book_data) for index, book_data in valid if book_data.isbn not in existing]
+
+        created: List[BookResponse] = []
+        for start in range(0, len(valid), settings.bulk_batch_size):
+            batch = valid[start:start + settings.bulk_batch_size]
+            inserted = [BookResponse.from_row(book) for _, book in await self._insert_batch(batch, errors)]
+            # Каждая пачка фиксируется отдельно: её побочные эффекты не должны опережать коммит
+            await self.repository.commit()
+            created.extend(inserted)
+            if not inserted:
+                continue
+            await self._update_index(upsert=inserted)
+            await self._invalidate([book.book_id for book in inserted])
+            await self._store_created([response.model_dump(mode='json') for response in inserted])
+            self._enqueue_enrichment(inserted)
+
+        errors.sort(key=lambda error: error.index)
+        return BulkCreateResponse(created=created, errors=errors)
+
+    async def _insert_batch(
+            self,
+            batch: List[Tuple[int, BookCreate]],
+            errors: List[BulkItemError]
+    ) -> List[Tuple[BookCreate, Book]]:
+        batch_data = [book_data for _, book_data in batch]
+        try:
+            return list(zip(batch_data, await self.repository.create_many(batch_data)))
+        except IntegrityError:
+            # Пачка конфликтует (например, ISBN вставлен параллельно) —
+            # повторяем поштучно, чтобы сообщить об ошибке только для виноватых строк
+            inserted = []
+            for index, book_data in batch:
+                try:
+                    books = await self.repository.create_many([book_data])
+                    inserted.append((book_data, books[0]))
+                except IntegrityError as e:
+                    errors.append(BulkItemError(
+                        index=index,
+                        error="constraint_violation",
+                        details={"db_error": str(e.orig)}
+                    ))
+            return inserted
+
+    def _enqueue_enrichment(self, books: List[BookResponse]) -> None:
+        if self.enrichment_queue:
+            for book in books:
+                self.enrichment_queue.submit(book.book_id, book.title, book.isbn)
+
+    async def _store_created(self, book_dicts: List[Dict[str, Any]]) -> None:
+        """Побочные эффекты создания: журнал книг и JSONBin, один раз на пачку"""
+        if not book_dicts:
+            return
+        await get_file_storage_client().append_books_async(book_dicts)
 
         # Опционально: сохраняем в JSONBin
         if self.jsonbin_client:
             try:
-                await self.jsonbin_client.save(book_data.model_dump())
+                payload = book_dicts[0] if len(book_dicts) == 1 else {"books": book_dicts}
+                await self.jsonbin_client.save(payload)
             except Exception as e:
-                print(f"Failed to save to JSONBin: {e}")
-
-        return BookResponse.model_validate(book)
+                logger.opt(exception=e).warning(f"Failed to save {len(book_dicts)} book(s) to JSONBin: {e}")
 
     async def update_book(self, book_id: int, book_data: BookCreate) -> BookResponse:
         book = await self.repository.update(book_id, book_data)
-        return BookResponse.model_validate(book)
+        await self.repository.commit()
+        response = BookResponse.from_row(book)
+        await self._invalidate([book_id])
+        await self._update_index(upsert=[response])
+        return response
 
     async def delete_book(self, book_id: int) -> BookResponse:
         book = await self.repository.delete(book_id)
-        return BookResponse.model_validate(book)
+        await self.repository.commit()
+        await self._invalidate([book_id])
+        await self._update_index(delete=[book_id])
+        return BookResponse.from_row(book)
+
+    # --- Кеш (ошибки Redis не должны ломать чтение и запись) ---
+
+    async def _cached(
+            self,
+            key: str,
+            loader: Callable[[IBookRepository], Awaitable[Any]],
+            ttl: int
+    ) -> Any:
+        if not self.cache:
+            return await loader(self.repository)
+
+        refresh_loader = None
+        if self.repository_factory:
+            async def refresh_loader() -> Any:
+                async with self.repository_factory() as repository:
+                    return await loader(repository)
+
+        return await self.cache.get_or_compute(
+            key,
+            lambda: loader(self.repository),
+            refresh_loader=refresh_loader,
+            ttl=ttl,
+            stale_ttl=settings.cache_stale_ttl,
+            negative_ttl=settings.cache_negative_ttl,
+            beta=settings.cache_early_expiration_beta,
+            distributed_lock=settings.cache_distributed_lock
+        )
+
+    async def _list_cache_key(self, *params: Any) -> Optional[str]:
+        if not self.cache:
+            return None
+        try:
+            version = await self.cache.namespace_version(BOOK_LIST_NAMESPACE)
+        except Exception as e:
+            logger.warning(f"Cache namespace lookup failed: {e}")
+            return None
+        digest = hashlib.sha1(json.dumps(params, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+        return f"{BOOK_LIST_NAMESPACE}:v{version}:{digest}"
+
+    async def _invalidate(self, book_ids: List[int]) -> None:
+        """
+        Точечная инвалидация: ключи изменённых книг и версия пространства списков.
+        Только после коммита: чтение между инвалидацией и коммитом вернуло бы в кеш старую строку.
+        """
+        if not self.cache:
+            return
+        try:
+            await self.cache.invalidate(
+                keys=[BOOK_CACHE_KEY.format(book_id=book_id) for book_id in book_ids],
+                namespaces=[BOOK_LIST_NAMESPACE]
+            )
+        except Exception as e:
+            logger.warning(f"Cache invalidation failed for books {book_ids}: {e}")
+
+    async def _update_index(self, upsert: Iterable[BookResponse] = (), delete: Iterable[int] = ()) -> None:
+        """Изменения применяются и во время перестройки индекса — они дождутся её конца"""
+        if not self.memory_index:
+            return
+        try:
+            await self.memory_index.apply(upsert=upsert, delete=delete)
+        except Exception as e:
+            logger.warning(f"Memory index update failed: {e}")
 
 
 def get_book_service(
-        repository: IBookRepository = Depends(get_book_repository)
+        repository: IBookRepository = Depends(get_book_repository),
+        enrichment_queue: Optional[EnrichmentQueue] = Depends(get_enrichment_queue),
+        cache: Optional[CacheService] = Depends(get_cache_service),
+        memory_index: Optional[MemoryIndex] = Depends(get_memory_index)
 ) -> BookService:
-    return BookService(repository)
\ No newline at end of file
+    return BookService(
+        repository,
+        enrichment_queue=enrichment_queue,
+        cache=cache,
+        repository_factory=open_book_repository,
+        memory_index=memory_index
+    )
\ No newline at end of file
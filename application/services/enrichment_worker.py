@@ -0,0 +1,233 @@
+import asyncio
+from dataclasses import dataclass
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional
+from loguru import logger
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from config.settings import get_settings
+from infrastructure.cache.keys import BOOK_CACHE_KEY, BOOK_LIST_NAMESPACE
+from infrastructure.cache.redis_cache import get_cache_service
+from infrastructure.database.session import async_session_maker
+from infrastructure.external.openlibrary_client import OpenLibraryClient
+from infrastructure.repositories.book_repository import BookRepository
+from infrastructure.search.memory_index import get_memory_index
+
+settings = get_settings()
+
+MAX_SUBJECTS = 20
+
+
+@dataclass
+class EnrichmentJob:
+    book_id: int
+    title: str
+    isbn: Optional[str] = None
+    attempts: int = 0
+
+
+class EnrichmentQueue:
+    """
+    Фоновое обогащение книг данными OpenLibrary.
+
+    create_book только ставит задачу в ограниченную очередь и сразу отвечает;
+    пул воркеров забирает задачи пачками (до batch_size или batch_wait секунд),
+    параллельно опрашивает OpenLibrary и сохраняет результаты пачки в одной транзакции.
+    При переполнении очереди задача отбрасывается — POST никогда не ждёт OpenLibrary.
+    """
+
+    def __init__(
+            self,
+            client_factory: Callable[[], OpenLibraryClient],
+            session_factory: async_sessionmaker[AsyncSession],
+            maxsize: int = 1000,
+            workers: int = 2,
+            batch_size: int = 20,
+            batch_wait: float = 0.5,
+            max_attempts: int = 3,
+            retry_delay: float = 1.0
+    ):
+        self.client_factory = client_factory
+        self.session_factory = session_factory
+        self.maxsize = maxsize
+        self.workers = workers
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._client: Optional[OpenLibraryClient] = None
+        self.processed = 0
+        self.failed = 0
+        self.dropped = 0
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "depth": self.depth,
+            "capacity": self.maxsize,
+            "workers": len(self._tasks),
+            "processed": self.processed,
+            "failed": self.failed,
+            "dropped": self.dropped
+        }
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.maxsize)
+        self._client = self.client_factory()
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"enrichment-worker-{n}")
+            for n in range(self.workers)
+        ]
+        logger.info(f"Enrichment queue started with {self.workers} worker(s)")
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Дожидается обработки очереди (не дольше timeout) и останавливает воркеров"""
+        if not self.running:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Enrichment queue not drained in {timeout}s, {self.depth} job(s) left")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        logger.info("Enrichment queue stopped")
+
+    def submit(self, book_id: int, title: str, isbn: Optional[str] = None) -> bool:
+        """Ставит книгу в очередь без ожидания; False, если очередь переполнена или не запущена"""
+        return self._put(EnrichmentJob(book_id=book_id, title=title, isbn=isbn))
+
+    def _put(self, job: EnrichmentJob) -> bool:
+        if not self.running:
+            return False
+        try:
+            self._queue.put_nowait(job)
+            return True
+        except asyncio.QueueFull:
+            self.dropped += 1
+            logger.warning(f"Enrichment queue full, dropping book {job.book_id}")
+            return False
+
+    async def _worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.batch_wait
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                await self._process(batch)
+            except Exception as e:
+                self.failed += len(batch)
+                logger.error(f"Enrichment batch of {len(batch)} failed: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _process(self, batch: List[EnrichmentJob]) -> None:
+        results = await asyncio.gather(
+            *(self._client.search(job.title, isbn=job.isbn) for job in batch),
+            return_exceptions=True
+        )
+
+        updates = {}
+        for job, result in zip(batch, results):
+            if isinstance(result, BaseException):
+                self.failed += 1
+                logger.warning(f"Failed to fetch extra info for book {job.book_id}: {result}")
+                continue
+            updates[job.book_id] = (job, self._extract(result))
+
+        if not updates:
+            return
+
+        async with self.session_factory() as session:
+            repository = BookRepository(session)
+            enriched, missing = [], []
+            for book_id, (job, data) in updates.items():
+                if await repository.update_enrichment(book_id, data):
+                    enriched.append(book_id)
+                else:
+                    missing.append(job)
+            await session.commit()
+
+        self.processed += len(enriched)
+        await self._invalidate_cache(enriched)
+        await self._refresh_index(enriched)
+
+        # Строка могла быть ещё не закоммичена создающим запросом — повторим позже
+        loop = asyncio.get_running_loop()
+        for job in missing:
+            job.attempts += 1
+            if job.attempts < self.max_attempts:
+                loop.call_later(self.retry_delay, self._put, job)
+            else:
+                self.failed += 1
+
+    @staticmethod
+    async def _invalidate_cache(book_ids: List[int]) -> None:
+        cache = get_cache_service()
+        if not cache or not book_ids:
+            return
+        try:
+            await cache.invalidate(
+                keys=[BOOK_CACHE_KEY.format(book_id=book_id) for book_id in book_ids],
+                namespaces=[BOOK_LIST_NAMESPACE]
+            )
+        except Exception as e:
+            logger.warning(f"Cache invalidation after enrichment failed: {e}")
+
+    @staticmethod
+    async def _refresh_index(book_ids: List[int]) -> None:
+        index = get_memory_index()
+        if not index or not book_ids:
+            return
+        try:
+            await index.refresh(book_ids)
+        except Exception as e:
+            logger.warning(f"Memory index refresh after enrichment failed: {e}")
+
+    @staticmethod
+    def _extract(doc: Dict[str, Any]) -> Dict[str, Any]:
+        """Выбирает из ответа OpenLibrary поля, которые сохраняются в книге"""
+        return {
+            "openlibrary_key": doc.get("key"),
+            "cover_id": doc.get("cover_i"),
+            "subjects": (doc.get("subject") or [])[:MAX_SUBJECTS] or None,
+            "first_publish_year": doc.get("first_publish_year"),
+            "enriched_at": datetime.utcnow()
+        }
+
+
+# --- Зависимость для DI ---
+@lru_cache()
+def get_enrichment_queue() -> Optional[EnrichmentQueue]:
+    if not settings.enrichment_enabled or not settings.openlibrary_base_url:
+        return None
+    return EnrichmentQueue(
+        client_factory=OpenLibraryClient,
+        session_factory=async_session_maker,
+        maxsize=settings.enrichment_queue_size,
+        workers=settings.enrichment_workers,
+        batch_size=settings.enrichment_batch_size,
+        batch_wait=settings.enrichment_batch_wait
+    )
@@ -0,0 +1,201 @@
+"""
+Синтетический каталог книг для нагрузочных тестов.
+
+Распределения, похожие на настоящий каталог: авторы и жанры по закону Ципфа
+(несколько авторов пишут много, большинство — по одной-две книги), годы
+смещены к современности, число страниц — логнормальное, описания длинные
+(2–12 предложений, у 10% книг описания нет). Генерация детерминирована: один
+и тот же --seed и --rows дают один и тот же каталог.
+
+Таблица books в базе из DATABASE_URL очищается и заполняется заново:
+в Postgres — через COPY, в остальных базах — пакетными INSERT.
+Схема должна быть создана миграциями (в SQLite создаётся автоматически).
+В Postgres загрузка упирается в вычисление search_vector по описаниям:
+порядка 5–10 тысяч строк в секунду, 10m — около получаса.
+
+    python -m benchmarks.catalog --rows 1m [--seed 42] [--batch-size 10000]
+"""
+import argparse
+import asyncio
+import itertools
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Iterator, List, Tuple
+
+from sqlalchemy import insert, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from domain.entities.book import Base, Book
+from domain.schemas.book import ALLOWED_GENRES
+
+# Размеры каталога, о которых говорят в отчётах (--rows 10k / 1m / 10m)
+SIZES = {"10k": 10_000, "1m": 1_000_000, "10m": 10_000_000}
+
+COLUMNS = (
+    "title", "author", "year_publication", "genre", "number_pages", "isbn",
+    "accessibility", "description", "created_at", "updated_at",
+)
+# Показатель степени распределения Ципфа
+AUTHOR_SKEW = 0.8
+GENRE_SKEW = 0.9
+# В среднем книг на автора; авторов не меньше MIN_AUTHORS
+BOOKS_PER_AUTHOR = 4
+MIN_AUTHORS = 100
+# Ограничение колонки description
+MAX_DESCRIPTION = 5000
+
+FIRST_NAMES = [
+    "Anna", "Boris", "Clara", "David", "Elena", "Felix", "Greta", "Henry", "Irina", "James",
+    "Karin", "Leo", "Maria", "Nikolai", "Olga", "Pavel", "Quinn", "Rosa", "Sergei", "Tatiana",
+    "Ulrich", "Vera", "Walter", "Xenia", "Yuri", "Zoe",
+]
+LAST_NAMES = [
+    "Anderson", "Belov", "Carter", "Dostoevsky", "Ellis", "Fischer", "Garcia", "Hoffmann",
+    "Ivanova", "Jensen", "Kuznetsov", "Larsen", "Morozov", "Nakamura", "Orlov", "Petrova",
+    "Quiroga", "Romanov", "Smirnov", "Turner", "Ueda", "Volkov", "Weber", "Yamada", "Zaitsev",
+]
+WORDS = [
+    "shadow", "river", "empire", "garden", "winter", "silence", "machine", "letters", "island",
+    "memory", "storm", "kingdom", "journey", "city", "night", "glass", "forest", "secret", "war",
+    "light", "house", "ocean", "mirror", "stranger", "fire", "road", "bridge", "dream", "stone",
+    "clock", "harbor", "crown", "signal", "desert", "orchard", "library", "engine", "voyage",
+    "theory", "history", "science", "children", "music", "revolution", "station", "winds", "north",
+]
+TITLE_PATTERNS = [
+    "The {0} of the {1}", "{0} and {1}", "A {0} in the {1}", "The Last {0}", "Beyond the {0}",
+    "{0}", "The {0}", "Notes on {0}", "Songs of the {0}", "The {0} {1}",
+]
+
+
+def _zipf_cum_weights(size: int, skew: float) -> List[float]:
+    return list(itertools.accumulate(1 / rank ** skew for rank in range(1, size + 1)))
+
+
+def author_names(count: int) -> List[str]:
+    """Уникальные имена: когда пары имя-фамилия кончаются, добавляется инициал, затем номер"""
+    names = []
+    for n in range(count):
+        block, pair = divmod(n, len(FIRST_NAMES) * len(LAST_NAMES))
+        first, last = FIRST_NAMES[pair % len(FIRST_NAMES)], LAST_NAMES[pair // len(FIRST_NAMES)]
+        initial = f" {chr(64 + block % 27)}." if block % 27 else ""
+        number = f" {block // 27 + 1}" if block >= 27 else ""
+        names.append(f"{first}{initial} {last}{number}")
+    return names
+
+
+def _sentences(rng: random.Random, count: int) -> List[str]:
+    """Набор предложений, из которых собираются описания: быстрее, чем слово за словом"""
+    sentences = []
+    for _ in range(count):
+        words = rng.choices(WORDS, k=rng.randint(8, 24))
+        sentences.append(" ".join(words).capitalize() + ".")
+    return sentences
+
+
+def generate_books(rows: int, seed: int = 42, batch_size: int = 10_000) -> Iterator[List[Tuple]]:
+    """Строки таблицы books в порядке COLUMNS, пачками по batch_size"""
+    rng = random.Random(seed)
+    authors = author_names(max(MIN_AUTHORS, rows // BOOKS_PER_AUTHOR))
+    # Авторы перемешаны, чтобы самые плодовитые не шли подряд по алфавиту
+    rng.shuffle(authors)
+    author_weights = _zipf_cum_weights(len(authors), AUTHOR_SKEW)
+    genres = sorted(ALLOWED_GENRES)
+    rng.shuffle(genres)
+    genre_weights = _zipf_cum_weights(len(genres), GENRE_SKEW)
+    sentences = _sentences(rng, 5000)
+
+    current_year = datetime.now().year
+    created_from = datetime(2020, 1, 1)
+    created_span = (datetime.now() - created_from).total_seconds()
+
+    for start in range(0, rows, batch_size):
+        count = min(batch_size, rows - start)
+        batch_authors = rng.choices(authors, cum_weights=author_weights, k=count)
+        batch_genres = rng.choices(genres, cum_weights=genre_weights, k=count)
+        batch = []
+        for n in range(count):
+            index = start + n
+            title = rng.choice(TITLE_PATTERNS).format(*(word.capitalize() for word in rng.sample(WORDS, 2)))
+            # Большая часть каталога — последние десятилетия, хвост уходит в прошлые века
+            year = max(1450, current_year - int(rng.expovariate(1 / 25)))
+            pages = min(50_000, max(1, int(rng.lognormvariate(5.5, 0.6))))
+            if rng.random() < 0.1:
+                description = None
+            else:
+                description = " ".join(rng.choices(sentences, k=rng.randint(2, 12)))[:MAX_DESCRIPTION]
+            created_at = created_from + timedelta(seconds=rng.random() * created_span)
+            batch.append((
+                title, batch_authors[n], year, batch_genres[n], pages, f"979{index:010d}",
+                rng.random() < 0.9, description, created_at, created_at,
+            ))
+        yield batch
+
+
+async def _copy(engine: AsyncEngine, batches: Iterator[List[Tuple]]) -> None:
+    """COPY через asyncpg: в разы быстрее INSERT на миллионах строк"""
+    async with engine.connect() as connection:
+        raw = await connection.get_raw_connection()
+        for batch in batches:
+            await raw.driver_connection.copy_records_to_table("books", records=batch, columns=COLUMNS)
+
+
+async def _insert(engine: AsyncEngine, batches: Iterator[List[Tuple]]) -> None:
+    for batch in batches:
+        async with engine.begin() as connection:
+            await connection.execute(insert(Book), [dict(zip(COLUMNS, row)) for row in batch])
+
+
+async def load_catalog(engine: AsyncEngine, rows: int, seed: int = 42, batch_size: int = 10_000) -> float:
+    """Заменяет содержимое books синтетическим каталогом; возвращает время загрузки в секундах"""
+    postgres = engine.dialect.name == "postgresql"
+    started = time.perf_counter()
+    async with engine.begin() as connection:
+        if postgres:
+            # На TRUNCATE триггеры счётчиков фасетов не срабатывают — счётчики очищаются вместе
+            # с книгами, а триггеры уровня оператора заполнят их заново после каждой пачки COPY
+            await connection.execute(text("TRUNCATE books, book_facet_counts RESTART IDENTITY"))
+        else:
+            await connection.run_sync(Base.metadata.create_all)
+            await connection.execute(text("DELETE FROM books"))
+
+    batches = generate_books(rows, seed=seed, batch_size=batch_size)
+    await (_copy(engine, batches) if postgres else _insert(engine, batches))
+
+    async with engine.begin() as connection:
+        await connection.execute(text("ANALYZE books" if postgres else "ANALYZE"))
+    return time.perf_counter() - started
+
+
+def parse_rows(value: str) -> int:
+    """10k, 1m, 10m или число"""
+    if value.lower() in SIZES:
+        return SIZES[value.lower()]
+    try:
+        rows = int(value.replace("_", ""))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected one of {', '.join(SIZES)} or a number, got '{value}'")
+    if rows < 0:
+        raise argparse.ArgumentTypeError("number of rows must not be negative")
+    return rows
+
+
+async def run(rows: int, seed: int, batch_size: int) -> None:
+    from infrastructure.database.session import engine
+
+    elapsed = await load_catalog(engine, rows, seed=seed, batch_size=batch_size)
+    await engine.dispose()
+    print(f"{rows} books loaded in {elapsed:.1f} s ({rows / max(elapsed, 1e-9):.0f} rows/s)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=parse_rows, default=SIZES["10k"], help="10k, 1m, 10m или число книг")
+    parser.add_argument("--seed", type=int, default=42, help="Зерно генератора")
+    parser.add_argument("--batch-size", type=int, default=10_000, help="Строк в одной пачке COPY/INSERT")
+    args = parser.parse_args()
+    asyncio.run(run(args.rows, args.seed, args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
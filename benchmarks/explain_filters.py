@@ -0,0 +1,133 @@
+"""
+Проверка планов запросов списка книг: ни одна поддерживаемая комбинация
+фильтров и сортировки не должна приводить к последовательному сканированию.
+
+Скрипт создаёт временную схему в базе из DATABASE_URL, заполняет в ней
+таблицу books синтетическими данными, выполняет EXPLAIN для запросов,
+которые строит репозиторий, и откатывает транзакцию — в базе ничего не остаётся.
+
+    python -m benchmarks.explain_filters --rows 100000
+
+Код возврата 1, если хотя бы один план содержит Seq Scan.
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import sys
+from typing import Any, Dict, List, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+
+from domain.entities.book import Base
+from infrastructure.database.session import engine
+from infrastructure.repositories.book_query import SORT_COLUMNS, count_query, page_query
+
+GENRES = [
+    'Fiction', 'Non-Fiction', 'Science Fiction', 'Fantasy', 'Mystery', 'Thriller', 'Romance',
+    'Horror', 'Biography', 'History', 'Science', 'Poetry', 'Drama', 'Children'
+]
+
+SEED_SQL = """
+    INSERT INTO books (title, author, year_publication, genre, number_pages, isbn,
+                       accessibility, description, created_at, updated_at)
+    SELECT
+        'Title ' || md5(g::text),
+        'Author ' || (g % 5000),
+        1450 + (g * 7919) % 576,
+        (CAST(:genres AS text[]))[1 + g % 14],
+        20 + (g * 104729) % 1480,
+        lpad(g::text, 13, '0'),
+        g % 10 <> 0,
+        NULL,
+        now(),
+        now()
+    FROM generate_series(1, CAST(:rows AS bigint)) AS g
+"""
+
+# Фильтры с избирательностью, типичной для страницы каталога
+FILTERS: List[Dict[str, Any]] = [
+    {},
+    {'author': 'Author 42'},
+    {'genre': ['Drama']},
+    {'genre': ['Drama', 'Poetry', 'History']},
+    {'year_publication': 1925},
+    {'year_from': 1990, 'year_to': 2000},
+    {'year_from': 2020},
+    {'pages_min': 1400},
+    {'pages_min': 200, 'pages_max': 210},
+    {'accessibility': False},
+    {'genre': ['Drama'], 'year_from': 1900, 'year_to': 1950},
+    {'genre': ['Fantasy', 'Horror'], 'accessibility': True, 'pages_max': 100},
+    {'author': 'Author 7', 'year_from': 1800},
+]
+
+# Для запросов с курсором: значение сортировки где-то в середине диапазона
+CURSOR_VALUES = {
+    'book_id': 50_000,
+    'title': 'Title 8',
+    'author': 'Author 2500',
+    'year_publication': 1750,
+}
+
+
+def compile_sql(statement) -> str:
+    return str(statement.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+
+
+def query_cases(include_counts: bool) -> List[Tuple[str, Any]]:
+    cases = []
+    for filters, sort, order, with_cursor in itertools.product(
+            FILTERS, SORT_COLUMNS, ('asc', 'desc'), (False, True)
+    ):
+        after = [CURSOR_VALUES[sort], CURSOR_VALUES['book_id']] if with_cursor else None
+        label = f"page {filters} sort={sort} {order}{' +cursor' if with_cursor else ''}"
+        cases.append((label, page_query(filters, sort, order, after, limit=21)))
+    if include_counts:
+        cases.extend((f"count {filters}", count_query(filters)) for filters in FILTERS if filters)
+    return cases
+
+
+async def run(rows: int, include_counts: bool, verbose: bool) -> int:
+    schema = f"explain_check_{os.getpid()}"
+    failures = 0
+    async with engine.connect() as connection:
+        transaction = await connection.begin()
+        try:
+            await connection.execute(text(f"CREATE SCHEMA {schema}"))
+            await connection.execute(text(f"SET LOCAL search_path TO {schema}"))
+            await connection.run_sync(Base.metadata.create_all)
+            await connection.execute(
+                text(SEED_SQL).bindparams(genres=GENRES, rows=rows)
+            )
+            await connection.execute(text("ANALYZE books"))
+
+            for label, statement in query_cases(include_counts):
+                plan = "\n".join(
+                    row[0] for row in await connection.exec_driver_sql(f"EXPLAIN {compile_sql(statement)}")
+                )
+                seq_scan = "Seq Scan" in plan
+                failures += seq_scan
+                print(f"{'FAIL' if seq_scan else 'ok  '}  {label}")
+                if verbose or seq_scan:
+                    print("      " + plan.replace("\n", "\n      "))
+        finally:
+            await transaction.rollback()
+    await engine.dispose()
+
+    print(f"\n{failures} plan(s) with a sequential scan")
+    return 1 if failures else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000, help="Сколько книг сгенерировать")
+    parser.add_argument("--counts", action="store_true", help="Проверять и запросы include_total")
+    parser.add_argument("--verbose", action="store_true", help="Печатать все планы")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args.rows, args.counts, args.verbose)))
+
+
+if __name__ == "__main__":
+    main()
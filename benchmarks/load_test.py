@@ -0,0 +1,423 @@
+"""
+Нагрузочный тест API каталога: приложение из create_application() со всеми
+middleware и lifespan, база из DATABASE_URL (Postgres или SQLite; по умолчанию —
+временный файл SQLite), внешние сервисы (OpenLibrary, JSONBin) подменены через
+httpx.MockTransport. Запросы подаются в ASGI-приложение через httpx.ASGITransport.
+
+Каждый эндпоинт /api/v1/books проходится отдельным сценарием: --requests
+запросов при --concurrency одновременных клиентах после --warmup запросов
+прогрева. Сценарии выполняются по очереди, запись (create, update, delete,
+bulk) — после чтения. Полнотекстовый поиск, автодополнение и нечёткий поиск
+есть только в Postgres, на SQLite они пропускаются.
+
+Результат — JSON с p50/p95/p99 и пропускной способностью по каждому сценарию
+и коммитом, на котором он получен; --compare выводит изменения относительно
+прошлого прогона.
+
+    python -m benchmarks.load_test --rows 10k --requests 1000 --concurrency 16 --output load.json
+    python -m benchmarks.load_test --requests 1000 --output new.json --compare load.json
+
+Лимитер запросов по умолчанию выключен (RATE_LIMIT_ENABLED=false), иначе
+сценарии упрутся в лимиты. Остальные настройки берутся из окружения как обычно.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+from sqlalchemy import func, select, text
+
+from benchmarks.catalog import SIZES, WORDS, load_catalog, parse_rows
+from domain.entities.book import Base, Book
+from domain.schemas.book import ALLOWED_GENRES
+
+# Настройки по умолчанию на время теста; заданные в окружении не переопределяются
+DEFAULT_ENV = {
+    "JSONBIN_API_KEY": "benchmark",
+    "SECRET_KEY": "benchmark",
+    "RATE_LIMIT_ENABLED": "false",
+    # Предупреждения о медленных запросах под нагрузкой заглушили бы результаты
+    "LOG_LEVEL": "ERROR",
+    # Кеш ответов OpenLibrary в SQLite-файле не нужен: upstream и так подменён
+    "OPENLIBRARY_CACHE_BACKEND": "none",
+}
+# Сколько книг каталога выбирается для запросов по id и автору
+SAMPLE_SIZE = 1000
+# Популярность книг в выборке — по Ципфу, как у реальных просмотров
+POPULARITY_SKEW = 1.0
+PERCENTILES = (50, 95, 99)
+
+# Поля BookCreate: из ответа на создание собирается тело для PUT
+BOOK_FIELDS = (
+    "title", "author", "year_publication", "genre", "number_pages", "isbn", "accessibility", "description",
+)
+
+# (method, параметры httpx.AsyncClient.request и route_params для пути)
+Request = Tuple[str, Dict[str, Any]]
+
+
+@dataclass
+class Scenario:
+    name: str
+    route: str  # имя эндпоинта, путь берётся из app.url_path_for
+    build: Callable[[int], Request]
+    expected: Tuple[int, ...] = (200,)
+    postgres_only: bool = False
+    on_response: Optional[Callable[[int, Any], None]] = None
+
+
+@dataclass
+class Catalog:
+    """То, что нужно сценариям из загруженной базы"""
+    book_ids: List[int]
+    authors: List[str]
+    etags: Dict[int, str] = field(default_factory=dict)
+    cursors: List[str] = field(default_factory=list)
+    created: Dict[int, Dict[str, Any]] = field(default_factory=dict)
+
+
+def stub_upstream(latency: float) -> Callable:
+    """Обработчик httpx.MockTransport: OpenLibrary находит книгу, JSONBin сохраняет"""
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if latency:
+            await asyncio.sleep(latency)
+        if request.url.path.endswith("/search.json"):
+            return httpx.Response(200, json={"docs": [{
+                "key": "/works/OL1W", "cover_i": 1, "subject": ["Fiction"], "first_publish_year": 2000,
+            }]})
+        if "jsonbin" in request.url.host:
+            return httpx.Response(200, json={"metadata": {"id": "benchmark"}})
+        return httpx.Response(404, json={})
+
+    return handler
+
+
+def book_payload(rng: random.Random, isbn: str) -> Dict[str, Any]:
+    return {
+        "title": " ".join(word.capitalize() for word in rng.sample(WORDS, 3)),
+        "author": "Load Test Author",
+        "year_publication": rng.randint(1900, 2020),
+        "genre": "Fiction",
+        "number_pages": rng.randint(50, 900),
+        "isbn": isbn,
+        "accessibility": True,
+        "description": " ".join(rng.choices(WORDS, k=80)),
+    }
+
+
+def scenarios(catalog: Catalog, seed: int, bulk_size: int) -> List[Scenario]:
+    rng = random.Random(seed)
+    popularity = list(itertools.accumulate(1 / rank ** POPULARITY_SKEW for rank in range(1, len(catalog.book_ids) + 1)))
+    genres = sorted(ALLOWED_GENRES)
+    # ISBN-13 с префиксом 978 (каталог — 979): не пересекаются с загруженными и между прогонами
+    isbn_base = int(time.time()) % 100_000 * 100_000
+    created_ids: List[int] = []
+
+    def popular_book() -> int:
+        return rng.choices(catalog.book_ids, cum_weights=popularity)[0]
+
+    def get(route_params: Optional[Dict[str, Any]] = None, **params: Any) -> Request:
+        return "GET", {"params": params, "route_params": route_params or {}}
+
+    def record_created(n: int, response) -> None:
+        if response.status_code == 201:
+            book = response.json()
+            created_ids.append(book["book_id"])
+            catalog.created[book["book_id"]] = {key: book[key] for key in BOOK_FIELDS}
+
+    def update(n: int) -> Request:
+        book_id = created_ids[n % len(created_ids)] if created_ids else popular_book()
+        body = dict(catalog.created.get(book_id) or book_payload(rng, None))
+        body["number_pages"] = rng.randint(50, 900)
+        return "PUT", {"json": body, "route_params": {"book_id": book_id}}
+
+    def delete(n: int) -> Request:
+        # Каждая созданная книга удаляется один раз; когда они кончатся — 404
+        book_id = created_ids.pop() if created_ids else 0
+        return "DELETE", {"route_params": {"book_id": book_id}}
+
+    def bulk(n: int) -> Request:
+        start = isbn_base + 50_000 + n * bulk_size
+        return "POST", {"json": [book_payload(rng, f"978{start + i:010d}") for i in range(bulk_size)]}
+
+    return [
+        Scenario("list", "get_books", lambda n: get()),
+        Scenario("list_filtered", "get_books", lambda n: get(
+            genre=rng.sample(genres, rng.randint(1, 3)), year_from=rng.randint(1950, 2015), accessibility=True
+        )),
+        Scenario("list_by_author", "get_books", lambda n: get(author=rng.choice(catalog.authors), sort="title")),
+        Scenario("list_sorted_total", "get_books", lambda n: get(
+            sort="year_publication", order="desc", page_size=50, include_total=True, genre=rng.choice(genres)
+        )),
+        Scenario("list_next_page", "get_books", lambda n: get(sort="title", cursor=rng.choice(catalog.cursors))),
+        Scenario("get", "get_book", lambda n: get({"book_id": popular_book()})),
+        Scenario("get_not_modified", "get_book", lambda n: _conditional(catalog, rng), expected=(304,)),
+        Scenario("facets", "get_book_facets", lambda n: get()),
+        # С фильтрами фасеты считаются через GROUPING SETS
+        Scenario("facets_filtered", "get_book_facets", lambda n: get(genre=rng.choice(genres)), postgres_only=True),
+        Scenario("search", "search_books", lambda n: get(q=" ".join(rng.sample(WORDS, 2))), postgres_only=True),
+        Scenario("autocomplete", "autocomplete_books", lambda n: get(
+            q=rng.choice(WORDS)[:3], field=rng.choice(["title", "author"])
+        ), postgres_only=True),
+        Scenario("fuzzy", "fuzzy_search_books", lambda n: get(q=_misspell(rng, rng.choice(catalog.authors))),
+                 postgres_only=True),
+        Scenario("export", "export_books", lambda n: get(
+            author=rng.choice(catalog.authors), format="csv" if n % 2 else "ndjson"
+        )),
+        Scenario("create", "create_book", lambda n: (
+            "POST", {"json": book_payload(rng, f"978{isbn_base + n:010d}")}
+        ), expected=(201,), on_response=record_created),
+        Scenario("update", "update_book", update),
+        Scenario("delete", "delete_book", delete),
+        Scenario("bulk_create", "bulk_create_books", bulk, expected=(201,)),
+    ]
+
+
+def _conditional(catalog: Catalog, rng: random.Random) -> Request:
+    book_id = rng.choice(list(catalog.etags))
+    return "GET", {"headers": {"If-None-Match": catalog.etags[book_id]}, "route_params": {"book_id": book_id}}
+
+
+def _misspell(rng: random.Random, value: str) -> str:
+    """Опечатка: в самом длинном слове имени переставлены две соседние буквы"""
+    word = max((part for part in value.split() if part.isalpha()), key=len, default=value)
+    if len(word) < 3:
+        return word
+    i = rng.randrange(len(word) - 1)
+    return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+
+
+async def sample_catalog(engine, client, app, sample_size: int) -> Catalog:
+    """Книги и авторы для запросов, ETag для условных GET и курсоры страниц"""
+    async with engine.connect() as connection:
+        rows = (await connection.execute(
+            text("SELECT book_id, author FROM books ORDER BY random() LIMIT :limit"), {"limit": sample_size}
+        )).all()
+    if not rows:
+        raise SystemExit("The books table is empty: pass --rows or load a catalog with benchmarks.catalog")
+    catalog = Catalog(book_ids=[row.book_id for row in rows], authors=sorted({row.author for row in rows}))
+
+    for book_id in catalog.book_ids[:100]:
+        response = await client.get(app.url_path_for("get_book", book_id=book_id))
+        if "etag" in response.headers:
+            catalog.etags[book_id] = response.headers["etag"]
+
+    path, cursor = app.url_path_for("get_books"), None
+    for _ in range(20):
+        params = {"sort": "title", **({"cursor": cursor} if cursor else {})}
+        cursor = (await client.get(path, params=params)).json().get("next_cursor")
+        if not cursor:
+            break
+        catalog.cursors.append(cursor)
+    return catalog
+
+
+async def run_scenario(client, app, scenario: Scenario, requests: int, warmup: int, concurrency: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    errors = 0
+
+    async def send(n: int, measured: bool) -> None:
+        nonlocal errors
+        method, kwargs = scenario.build(n)
+        path = app.url_path_for(scenario.route, **kwargs.pop("route_params", {}))
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, path, **kwargs)
+        except Exception:
+            response = None
+        elapsed = time.perf_counter() - started
+        if not measured:
+            return
+        latencies.append(elapsed)
+        status = response.status_code if response is not None else "exception"
+        statuses[str(status)] += 1
+        if status not in scenario.expected:
+            errors += 1
+        if response is not None and scenario.on_response:
+            scenario.on_response(n, response)
+
+    async def worker(numbers, measured: bool) -> None:
+        # Общий итератор: каждый клиент берёт следующий номер запроса
+        for n in numbers:
+            await send(n, measured)
+
+    warmup_numbers = iter(range(-warmup, 0))
+    await asyncio.gather(*(worker(warmup_numbers, False) for _ in range(concurrency)))
+    numbers = iter(range(requests))
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(numbers, True) for _ in range(concurrency)))
+    duration = time.perf_counter() - started
+
+    return {
+        "route": scenario.route,
+        "requests": requests,
+        "errors": errors,
+        "status_codes": dict(sorted(statuses.items())),
+        "duration_s": round(duration, 3),
+        "throughput_rps": round(requests / duration, 1),
+        "latency_ms": latency_summary(latencies),
+    }
+
+
+def latency_summary(latencies: List[float]) -> Dict[str, float]:
+    milliseconds = [value * 1000 for value in latencies]
+    cuts = statistics.quantiles(milliseconds, n=100, method="inclusive") if len(milliseconds) > 1 else milliseconds * 99
+    summary = {f"p{p}": round(cuts[p - 1], 3) for p in PERCENTILES}
+    summary.update(mean=round(statistics.fmean(milliseconds), 3), max=round(max(milliseconds), 3))
+    return summary
+
+
+def git_revision() -> Dict[str, Any]:
+    def git(*args: str) -> str:
+        return subprocess.run(["git", *args], capture_output=True, text=True, check=True).stdout.strip()
+
+    try:
+        return {"commit": git("rev-parse", "HEAD"), "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+
+
+async def run(args: argparse.Namespace, revision: Dict[str, Any]) -> Dict[str, Any]:
+    # Настройки читаются при импорте приложения — после того, как main() заполнил окружение
+    from infrastructure.database.session import engine
+    from infrastructure.external.http_client import http_clients
+    from main import create_application
+
+    postgres = engine.dialect.name == "postgresql"
+    if args.rows is not None:
+        print(f"Loading {args.rows} books...", file=sys.stderr)
+        await load_catalog(engine, args.rows, seed=args.seed)
+    elif not postgres:
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+
+    http_clients.configure(httpx.MockTransport(stub_upstream(args.upstream_latency_ms / 1000)))
+    app = create_application()
+    selected = set(args.scenarios.split(",")) if args.scenarios else None
+    results: Dict[str, Any] = {}
+    skipped: Dict[str, str] = {}
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+            async with engine.connect() as connection:
+                rows = (await connection.execute(select(func.count()).select_from(Book))).scalar_one()
+            catalog = await sample_catalog(engine, client, app, SAMPLE_SIZE)
+
+            for scenario in scenarios(catalog, args.seed, args.bulk_size):
+                if selected is not None and scenario.name not in selected:
+                    continue
+                if scenario.postgres_only and not postgres:
+                    skipped[scenario.name] = "requires PostgreSQL"
+                    continue
+                if scenario.name == "get_not_modified" and not catalog.etags:
+                    skipped[scenario.name] = "no ETag in responses"
+                    continue
+                if scenario.name == "list_next_page" and not catalog.cursors:
+                    skipped[scenario.name] = "catalog fits in one page"
+                    continue
+                requests, warmup = args.requests, args.warmup
+                if scenario.name == "bulk_create":
+                    # Столько же книг, сколько в сценарии create
+                    requests, warmup = max(1, requests // args.bulk_size), warmup // args.bulk_size
+                elif scenario.name in ("create", "delete"):
+                    # Создание и удаление книг не прогреваются: иначе удалять будет нечего
+                    warmup = 0
+                result = await run_scenario(client, app, scenario, requests, warmup, args.concurrency)
+                results[scenario.name] = result
+                print(f"{scenario.name:<18} {result['throughput_rps']:>8.1f} req/s  "
+                      f"p50 {result['latency_ms']['p50']:>8.2f}  p95 {result['latency_ms']['p95']:>8.2f}  "
+                      f"p99 {result['latency_ms']['p99']:>8.2f} ms  errors {result['errors']}", file=sys.stderr)
+    await engine.dispose()
+
+    return {
+        "meta": {
+            **revision,
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "database": engine.dialect.name,
+            "rows": rows,
+            "requests": args.requests,
+            "warmup": args.warmup,
+            "concurrency": args.concurrency,
+            "bulk_size": args.bulk_size,
+            "upstream_latency_ms": args.upstream_latency_ms,
+            "seed": args.seed,
+            "python": platform.python_version(),
+        },
+        "scenarios": results,
+        "skipped": skipped,
+    }
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any]) -> None:
+    """Изменение пропускной способности и p95 относительно прошлого прогона"""
+    print(f"\nvs {baseline['meta'].get('commit') or 'baseline'}")
+    print(f"{'scenario':<18} {'req/s':>10} {'p95 ms':>10}")
+    for name, result in report["scenarios"].items():
+        before = baseline["scenarios"].get(name)
+        if before is None:
+            continue
+        rps = result["throughput_rps"] / before["throughput_rps"] - 1
+        p95 = result["latency_ms"]["p95"] / before["latency_ms"]["p95"] - 1 if before["latency_ms"]["p95"] else 0.0
+        print(f"{name:<18} {rps:>+9.1%} {p95:>+9.1%}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=parse_rows, help=f"Перед тестом загрузить каталог: {', '.join(SIZES)} или число "
+                                                        "(без флага используется то, что уже есть в базе)")
+    parser.add_argument("--requests", type=int, default=1000, help="Запросов на сценарий")
+    parser.add_argument("--warmup", type=int, default=50, help="Запросов прогрева на сценарий")
+    parser.add_argument("--concurrency", type=int, default=16, help="Одновременных клиентов")
+    parser.add_argument("--bulk-size", type=int, default=100, help="Книг в одном запросе /bulk")
+    parser.add_argument("--upstream-latency-ms", type=float, default=20.0, help="Задержка подменённых внешних API")
+    parser.add_argument("--scenarios", help="Только эти сценарии, через запятую")
+    parser.add_argument("--seed", type=int, default=42, help="Зерно генератора каталога и запросов")
+    parser.add_argument("--output", help="Файл для JSON-отчёта (по умолчанию — stdout)")
+    parser.add_argument("--compare", metavar="REPORT", help="JSON-отчёт прошлого прогона для сравнения")
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output) if args.output else None
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    # Журнал книг, логи и временная база SQLite — во временном каталоге, а не в рабочей копии
+    with tempfile.TemporaryDirectory() as workdir:
+        os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{os.path.join(workdir, 'load_test.db')}")
+        for name, value in DEFAULT_ENV.items():
+            os.environ.setdefault(name, value)
+        revision, cwd = git_revision(), os.getcwd()
+        os.chdir(workdir)
+        try:
+            report = asyncio.run(run(args, revision))
+        finally:
+            os.chdir(cwd)
+
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if output:
+        with open(output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if baseline:
+        compare(report, baseline)
+
+
+if __name__ == "__main__":
+    main()
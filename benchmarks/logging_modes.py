@@ -0,0 +1,146 @@
+"""
+Пропускная способность (запросов в секунду) при разных режимах логирования:
+обычный (development и production с JSON-файлом), fast (очереди, один JSON
+на запрос) и fast с выборкой 10% успешных запросов.
+
+Каждый режим запускается в отдельном процессе: настройки и sink'и loguru
+глобальны. Приложение — log_requests_middleware и простой эндпоинт без БД,
+запросы подаются прямо в ASGI-приложение; логи пишутся во временный каталог,
+stdout процесса — в /dev/null.
+
+    python -m benchmarks.logging_modes --requests 5000 --concurrency 20 --rounds 3
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+MODES = (
+    ("default, development", {"LOG_MODE": "default", "ENVIRONMENT": "development"}),
+    ("default, production", {"LOG_MODE": "default", "ENVIRONMENT": "production"}),
+    ("fast", {"LOG_MODE": "fast", "ENVIRONMENT": "production", "LOG_SAMPLE_RATE": "1.0"}),
+    ("fast, 10% sampled", {"LOG_MODE": "fast", "ENVIRONMENT": "production", "LOG_SAMPLE_RATE": "0.1"}),
+)
+# Обязательные настройки, которые этому бенчмарку не нужны
+REQUIRED_ENV = {"DATABASE_URL": "sqlite+aiosqlite://", "JSONBIN_API_KEY": "benchmark", "SECRET_KEY": "benchmark"}
+
+
+def build_app():
+    from fastapi import FastAPI
+    from config.settings import get_settings
+    from infrastructure.logging.setup import setup_logging
+    from presentation.middleware.logging import log_requests_middleware
+
+    settings = get_settings()
+    setup_logging(settings.environment, settings.log_level, mode=settings.log_mode)
+    app = FastAPI()
+    app.middleware("http")(log_requests_middleware)
+
+    @app.get("/books/{book_id}")
+    async def get_book(book_id: int):
+        return {"book_id": book_id, "title": f"Title {book_id}", "author": "Author"}
+
+    return app
+
+
+async def call(app, path: str) -> int:
+    """Один GET напрямую через ASGI — без накладных расходов HTTP-клиента, которые скрыли бы стоимость логов"""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+        "headers": [(b"host", b"bench")], "client": ("127.0.0.1", 50000), "server": ("bench", 80),
+    }
+    status, request_sent, response_complete = 0, False, asyncio.Event()
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await response_complete.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body" and not message.get("more_body"):
+            response_complete.set()
+
+    await app(scope, receive, send)
+    return status
+
+
+async def measure(requests: int, concurrency: int) -> dict:
+    from loguru import logger
+
+    app = build_app()
+
+    async def worker(count: int) -> None:
+        for n in range(count):
+            if await call(app, f"/books/{n}") != 200:
+                raise RuntimeError("unexpected response status")
+
+    await worker(100)  # прогрев
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(requests // concurrency) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    # Сколько ещё ждать, пока фоновые sink'и допишут очередь
+    drain_started = time.perf_counter()
+    await logger.complete()
+    drain = time.perf_counter() - drain_started
+    logger.remove()
+    done = requests // concurrency * concurrency
+    return {"rps": done / elapsed, "drain_ms": drain * 1000}
+
+
+def run_mode(env: dict, args: argparse.Namespace) -> dict:
+    with tempfile.TemporaryDirectory() as workdir:
+        result_path = os.path.join(workdir, "result.json")
+        child_env = {**REQUIRED_ENV, **os.environ, **env, "LOG_LEVEL": "INFO"}
+        child_env["PYTHONPATH"] = os.pathsep.join(filter(None, [os.getcwd(), child_env.get("PYTHONPATH")]))
+        subprocess.run(
+            [sys.executable, "-m", "benchmarks.logging_modes", "--worker", result_path,
+             "--requests", str(args.requests), "--concurrency", str(args.concurrency)],
+            env=child_env, cwd=workdir, stdout=subprocess.DEVNULL, check=True
+        )
+        with open(result_path) as f:
+            return json.load(f)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000, help="Запросов на режим")
+    parser.add_argument("--concurrency", type=int, default=20, help="Одновременных клиентов")
+    parser.add_argument("--rounds", type=int, default=3, help="Повторов каждого режима (берётся лучший)")
+    parser.add_argument("--worker", metavar="RESULT", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        result = asyncio.run(measure(args.requests, args.concurrency))
+        with open(args.worker, "w") as f:
+            json.dump(result, f)
+        return
+
+    # Режимы чередуются по раундам, берётся лучший результат каждого — так меньше влияет шум машины
+    best = {name: {"rps": 0.0, "drain_ms": 0.0} for name, _ in MODES}
+    for _ in range(args.rounds):
+        for name, env in MODES:
+            result = run_mode(env, args)
+            if result["rps"] > best[name]["rps"]:
+                best[name] = result
+
+    baseline = best[MODES[0][0]]["rps"]
+    print(f"{'mode':<22}  {'req/s':>8}  {'vs default':>10}  {'queue drain ms':>14}")
+    for name, _ in MODES:
+        result = best[name]
+        print(f"{name:<22}  {result['rps']:>8.0f}  {result['rps'] / baseline:>9.2f}x  {result['drain_ms']:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Накладные расходы лимитера запросов.
+
+1. RateLimiter.hit: один клиент, 10 000 разных IP, IP + API-ключ.
+2. Время синхронизации с Redis для 1 000 и 10 000 активных ключей (только с --redis-url).
+3. Запрос целиком через ASGI: приложение с RateLimitMiddleware и без него.
+   Лимиты подняты так, чтобы ни один запрос не был отклонён.
+
+    python -m benchmarks.rate_limit_overhead --requests 5000 [--redis-url redis://localhost:6379/15]
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from benchmarks.logging_modes import REQUIRED_ENV, call
+
+# Лимиты, которые бенчмарк не исчерпает: измеряется стоимость проверки, а не отказы
+UNREACHABLE_LIMITS = '{"read": "1000000000/60", "write": "1000000000/60", "bulk": "1000000000/60"}'
+
+
+def bench_hit(label: str, calls: int, keys_for) -> None:
+    from infrastructure.rate_limit.limiter import RateLimit, RateLimiter
+
+    limiter, limit = RateLimiter(), RateLimit.parse("1000000000/60")
+    started = time.perf_counter()
+    for n in range(calls):
+        limiter.hit(keys_for(n), limit)
+    elapsed = time.perf_counter() - started
+    print(f"  {label:<28} {elapsed / calls * 1e6:>8.2f} us/request")
+
+
+async def bench_sync(redis_url: str) -> None:
+    from redis.asyncio import Redis
+    from infrastructure.rate_limit.limiter import RateLimit, RateLimiter
+
+    redis = Redis.from_url(redis_url)
+    limit = RateLimit.parse("1000000000/60")
+    for keys in (1_000, 10_000):
+        limiter = RateLimiter(redis=redis, prefix=f"rl-bench-{os.getpid()}")
+        for n in range(keys):
+            limiter.hit([f"read:ip:{n}"], limit)
+        started = time.perf_counter()
+        await limiter.sync()
+        print(f"  sync, {keys:>6} active keys       {(time.perf_counter() - started) * 1000:>8.1f} ms")
+    await redis.aclose()
+
+
+def build_app(with_limiter: bool):
+    from fastapi import FastAPI
+    from presentation.middleware.rate_limit import RateLimitMiddleware
+
+    app = FastAPI()
+    if with_limiter:
+        app.add_middleware(RateLimitMiddleware)
+
+    @app.get("/books/{book_id}")
+    async def get_book(book_id: int):
+        return {"book_id": book_id}
+
+    return app
+
+
+async def bench_requests(requests: int, rounds: int) -> None:
+    from infrastructure.rate_limit.limiter import close_rate_limiter, init_rate_limiter
+
+    await init_rate_limiter()
+    apps = {"without limiter": build_app(False), "with limiter": build_app(True)}
+    best = {name: float("inf") for name in apps}
+    for _ in range(rounds):
+        for name, app in apps.items():
+            for n in range(100):  # прогрев
+                await call(app, f"/books/{n}")
+            started = time.perf_counter()
+            for n in range(requests):
+                await call(app, f"/books/{n}")
+            best[name] = min(best[name], (time.perf_counter() - started) / requests)
+    await close_rate_limiter()
+
+    for name, seconds in best.items():
+        print(f"  {name:<28} {seconds * 1e6:>8.1f} us/request")
+    print(f"  {'overhead':<28} {(best['with limiter'] - best['without limiter']) * 1e6:>8.1f} us/request")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000, help="Запросов на замер")
+    parser.add_argument("--rounds", type=int, default=3, help="Повторов каждого замера (берётся лучший)")
+    parser.add_argument("--redis-url", help="Redis для замера синхронизации (ключи с префиксом rl-bench-*)")
+    args = parser.parse_args()
+
+    for name, value in {**REQUIRED_ENV, "RATE_LIMITS": UNREACHABLE_LIMITS, "LOG_LEVEL": "WARNING"}.items():
+        os.environ.setdefault(name, value)
+
+    print("RateLimiter.hit")
+    bench_hit("one client", args.requests * 10, lambda n: ["read:ip:127.0.0.1"])
+    bench_hit("10 000 clients", args.requests * 10, lambda n: [f"read:ip:10.0.{n % 10_000 // 256}.{n % 256}"])
+    bench_hit("IP + API key", args.requests * 10, lambda n: ["read:ip:127.0.0.1", "read:key:0123456789abcdef"])
+
+    if args.redis_url:
+        print("Redis sync (one pipeline per interval)")
+        asyncio.run(bench_sync(args.redis_url))
+
+    print("Request through the ASGI app")
+    asyncio.run(bench_requests(args.requests, args.rounds))
+
+
+if __name__ == "__main__":
+    main()
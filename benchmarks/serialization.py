@@ -0,0 +1,122 @@
+"""
+Стоимость сериализации одной книги в ответе списка: прежний путь
+(BookResponse.model_validate + повторная валидация FastAPI по response_model +
+stdlib json) против доверенного (from_row / from_cached + TrustedJSONResponse).
+
+Страницы по 1, 100 и 10 000 книг собираются из ORM-объектов Book (как после
+запроса к БД) и из словарей, как их хранит кеш. База не нужна.
+
+    python -m benchmarks.serialization --repeat 20
+"""
+import argparse
+import asyncio
+import json
+import time
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from application.services.book_service import BookService
+from domain.entities.book import Book
+from domain.schemas.book import BookResponse
+from domain.schemas.pagination import PaginatedResponse
+from presentation.api.responses import TrustedJSONResponse
+
+SIZES = (1, 100, 10_000)
+GENRES = ('Fiction', 'Drama', 'Poetry', 'History', 'Science')
+
+# Поле ответа строится так же, как для response_model=PaginatedResponse[BookResponse]
+RESPONSE_FIELD = create_model_field(
+    name='Response_get_books', type_=PaginatedResponse[BookResponse], mode='serialization'
+)
+
+
+def make_books(count: int) -> List[Book]:
+    created = datetime(2024, 1, 1, 12, 30, 15, 123456)
+    return [
+        Book(
+            book_id=i,
+            title=f'Title {i}',
+            author=f'Author {i % 500}',
+            year_publication=1900 + i % 120,
+            genre=GENRES[i % len(GENRES)],
+            number_pages=100 + i % 900,
+            isbn=f'{9780000000000 + i}',
+            accessibility=i % 10 != 0,
+            description='A fairly ordinary book description. ' * 4,
+            subjects=['Fiction', 'Classics'] if i % 3 == 0 else None,
+            cover_id=i if i % 2 else None,
+            created_at=created,
+            updated_at=created + timedelta(seconds=i),
+        )
+        for i in range(1, count + 1)
+    ]
+
+
+def page(items: List[Any]) -> Dict[str, Any]:
+    return {'items': items, 'page_size': len(items), 'next_cursor': None, 'has_more': False}
+
+
+async def legacy_rows(books: List[Book]) -> bytes:
+    model = PaginatedResponse[BookResponse](**page([BookResponse.model_validate(book) for book in books]))
+    content = await serialize_response(field=RESPONSE_FIELD, response_content=model)
+    return JSONResponse(content).body
+
+
+async def trusted_rows(books: List[Book]) -> bytes:
+    model = PaginatedResponse[BookResponse](**page([BookResponse.from_row(book) for book in books]))
+    return TrustedJSONResponse(model).body
+
+
+async def legacy_cached(data: Dict[str, Any]) -> bytes:
+    model = PaginatedResponse[BookResponse].model_validate(data)
+    content = await serialize_response(field=RESPONSE_FIELD, response_content=model)
+    return JSONResponse(content).body
+
+
+async def trusted_cached(data: Dict[str, Any]) -> bytes:
+    return TrustedJSONResponse(BookService._page_from_cached(BookResponse, data)).body
+
+
+async def best_of(repeat: int, func: Callable[[Any], Awaitable[bytes]], arg: Any) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await func(arg)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+async def run(repeat: int) -> None:
+    print(f"{'rows':>6}  {'source':<7}  {'legacy us/book':>14}  {'trusted us/book':>15}  {'speedup':>7}")
+    for size in SIZES:
+        books = make_books(size)
+        cached = PaginatedResponse[BookResponse](
+            **page([BookResponse.model_validate(book) for book in books])
+        ).model_dump(mode='json')
+
+        cases = (('db', legacy_rows, trusted_rows, books), ('cache', legacy_cached, trusted_cached, cached))
+        for source, legacy, trusted, arg in cases:
+            # Оба пути должны отдавать одинаковый JSON
+            assert json.loads(await legacy(arg)) == json.loads(await trusted(arg)), source
+
+            legacy_time = await best_of(repeat, legacy, arg)
+            trusted_time = await best_of(repeat, trusted, arg)
+            print(
+                f"{size:>6}  {source:<7}  {legacy_time / size * 1e6:>14.2f}  "
+                f"{trusted_time / size * 1e6:>15.2f}  {legacy_time / trusted_time:>6.1f}x"
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20, help="Сколько раз повторять каждый замер (берётся лучший)")
+    args = parser.parse_args()
+    asyncio.run(run(args.repeat))
+
+
+if __name__ == "__main__":
+    main()
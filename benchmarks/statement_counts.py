@@ -0,0 +1,115 @@
+"""
+Число SQL-запросов (обращений к курсору) на операцию BookRepository.
+Запись должна укладываться в один запрос: INSERT/UPDATE/DELETE ... RETURNING.
+
+Скрипт создаёт временную схему в базе из DATABASE_URL, выполняет операции
+в транзакции и откатывает её — в базе ничего не остаётся.
+
+    python -m benchmarks.statement_counts
+
+Код возврата 1, если какая-то операция превысила свой бюджет.
+"""
+import asyncio
+import os
+import sys
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Tuple
+
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from domain.entities.book import Base
+from domain.schemas.book import BookCreate
+from infrastructure.database.session import engine
+from infrastructure.repositories.book_repository import BookRepository
+
+
+def book_data(n: int) -> BookCreate:
+    return BookCreate(
+        title=f'Statement Count {n}',
+        author='Benchmark Author',
+        year_publication=2000,
+        genre='Fiction',
+        number_pages=100 + n,
+        isbn=f'{9790000000000 + n}',
+    )
+
+
+@contextmanager
+def count_statements() -> Iterator[List[str]]:
+    statements: List[str] = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement.split(None, 1)[0].upper())
+
+    event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+
+def operations(repository: BookRepository, ids: Dict[str, int]) -> List[Tuple[str, int, Callable[[], Awaitable[Any]]]]:
+    """(операция, бюджет запросов, вызов)"""
+    async def create() -> None:
+        ids['book'] = (await repository.create(book_data(1))).book_id
+
+    async def update_missing() -> None:
+        try:
+            await repository.update(-1, book_data(3))
+        except ValueError:
+            pass
+
+    async def delete_missing() -> None:
+        try:
+            await repository.delete(-1)
+        except ValueError:
+            pass
+
+    return [
+        ('create', 1, create),
+        ('get_by_id', 1, lambda: repository.get_by_id(ids['book'])),
+        ('update', 1, lambda: repository.update(ids['book'], book_data(2))),
+        ('update (not found)', 1, update_missing),
+        # SAVEPOINT + многострочный INSERT + RELEASE
+        ('create_many (50)', 3, lambda: repository.create_many([book_data(n) for n in range(10, 60)])),
+        ('delete', 1, lambda: repository.delete(ids['book'])),
+        ('delete (not found)', 1, delete_missing),
+    ]
+
+
+async def run() -> int:
+    schema = f"statement_counts_{os.getpid()}"
+    failures = 0
+    async with engine.connect() as connection:
+        transaction = await connection.begin()
+        try:
+            await connection.execute(text(f"CREATE SCHEMA {schema}"))
+            await connection.execute(text(f"SET LOCAL search_path TO {schema}"))
+            await connection.run_sync(Base.metadata.create_all)
+
+            session = AsyncSession(bind=connection, expire_on_commit=False)
+            repository = BookRepository(session)
+            ids: Dict[str, int] = {}
+            for name, budget, call in operations(repository, ids):
+                with count_statements() as statements:
+                    await call()
+                over = len(statements) > budget
+                failures += over
+                print(f"{'FAIL' if over else 'ok  '}  {name:<20} {len(statements)} (budget {budget}): "
+                      f"{' '.join(statements)}")
+            await session.close()
+        finally:
+            await transaction.rollback()
+    await engine.dispose()
+
+    print(f"\n{failures} operation(s) over budget")
+    return 1 if failures else 0
+
+
+def main() -> None:
+    sys.exit(asyncio.run(run()))
+
+
+if __name__ == "__main__":
+    main()
@@ -10,19 +10,85 @@ class Settings(BaseSettings):
     database_url: str
     db_pool_size: int = 5
     db_max_overflow: int = 10
+    db_pool_warmup: bool = True  # открыть db_pool_size соединений при старте
+    # Adaptive overflow: подстройка db_max_overflow по времени ожидания соединения
+    db_pool_adaptive: bool = False
+    db_pool_min_overflow: int = 0
+    db_pool_max_overflow: int = 40
+    db_pool_target_wait_ms: float = 20.0
+    db_pool_adapt_interval: float = 10.0
+
+    # Read replicas (GET/HEAD; writes and a client's reads right after its own write use the primary)
+    database_replica_urls: list[str] = []
+    replica_max_lag: float = 5.0  # секунд; больше — реплика вне ротации
+    # Без позиции WAL клиент читает свои записи из primary max_lag + check_interval секунд
+    replica_check_interval: float = 5.0
+    replica_eject_seconds: float = 30.0  # после ошибки соединения
 
     # External APIs
     jsonbin_api_key: str
     openlibrary_base_url: str = "https://openlibrary.org"
     openlibrary_timeout: int = 20
+    openlibrary_cache_backend: str = "sqlite"  # sqlite, redis, none
+    openlibrary_cache_path: str = "openlibrary_cache.sqlite3"
+    openlibrary_cache_ttl: int = 7 * 24 * 3600
+    openlibrary_negative_cache_ttl: int = 24 * 3600
+
+    # Background OpenLibrary enrichment
+    enrichment_enabled: bool = True
+    enrichment_queue_size: int = 1000
+    enrichment_workers: int = 2
+    enrichment_batch_size: int = 20
+    enrichment_batch_wait: float = 0.5
+
+    # Shared HTTP client pools
+    http_max_connections: int = 100
+    http_max_keepalive_connections: int = 20
+    http_keepalive_expiry: float = 30.0
+    http_default_timeout: float = 10.0
+    http2_enabled: bool = False
+    http_pool_limits_per_host: dict[str, int] = {}
 
     # Redis
     redis_url: Optional[str] = None
+    cache_book_ttl: int = 300
+    cache_list_ttl: int = 60
+    cache_local_maxsize: int = 10000  # 0 — без in-process L1 кеша
+    cache_local_ttl: float = 30.0
+    cache_stale_ttl: int = 30  # stale-while-revalidate окно после истечения TTL
+    cache_negative_ttl: int = 10  # TTL для пустых результатов и "не найдено"
+    cache_early_expiration_beta: float = 1.0  # 0 — без вероятностного раннего обновления
+    cache_distributed_lock: bool = False
+
+    # Prometheus metrics (/metrics). With several uvicorn workers set PROMETHEUS_MULTIPROC_DIR
+    # to an empty directory before start: workers write their values there and /metrics aggregates them
+    metrics_enabled: bool = True
+
+    # Per-request profiling (Server-Timing header: SQL, cache, external HTTP, serialization)
+    server_timing_enabled: bool = True
+    slow_query_threshold_ms: float = 200.0  # запросы дольше логируются с параметрами; 0 — не логировать
+    request_max_queries: int = 20  # больше SQL-запросов на один HTTP-запрос — предупреждение (N+1)
+
+    # Rate limiting per client IP and API key ("<requests>/<seconds>", sliding window).
+    # Counted in each worker and reconciled through Redis every rate_limit_sync_interval.
+    # Клиент определяется по request.client: за reverse proxy запускайте uvicorn с
+    # --proxy-headers --forwarded-allow-ips=<адрес прокси>, иначе все клиенты делят один лимит
+    rate_limit_enabled: bool = False
+    rate_limits: dict[str, str] = {"read": "300/60", "write": "60/60", "bulk": "10/60"}
+    # Класс по имени эндпоинта; остальные — read (GET/HEAD) или write; "none" — без лимита
+    rate_limit_route_classes: dict[str, str] = {"bulk_create_books": "bulk", "export_books": "bulk"}
+    rate_limit_exempt_paths: list[str] = ["/health", "/metrics"]
+    rate_limit_api_key_header: str = "X-API-Key"
+    rate_limit_sync_interval: float = 1.0
 
     # Environment
     environment: str = "development"
     debug: bool = False
     log_level: str = "INFO"
+    # fast: queued sinks, one JSON record per request, success logs sampled (production under load)
+    log_mode: str = "default"  # default, fast
+    log_sample_rate: float = 1.0  # доля успешных (< 400) запросов в логе в режиме fast
+    log_sample_rates: dict[str, float] = {}  # по шаблону маршрута, например {"/health/health/": 0.0}
 
     # Security
     secret_key: str
@@ -39,6 +105,31 @@ class Settings(BaseSettings):
     default_page_size: int = 20
     max_page_size: int = 100
 
+    # Suggestions (autocomplete / fuzzy search)
+    suggest_default_limit: int = 10
+    fuzzy_similarity_threshold: float = 0.3  # порог word_similarity (pg_trgm)
+
+    # In-process catalog index (per worker; changes are broadcast over Redis)
+    memory_index_enabled: bool = False
+    memory_index_chunk_size: int = 5000
+    memory_index_retry_interval: float = 30.0  # секунд между попытками после неудачной перестройки
+    # Число процессов приложения (ту же переменную WEB_CONCURRENCY читают uvicorn и gunicorn).
+    # Без Redis индексы процессов расходятся, поэтому при нескольких процессах индекс не включается
+    web_concurrency: int = 1
+
+    # Export
+    export_chunk_size: int = 1000
+
+    # File storage (append-only journal + snapshot in the legacy format)
+    storage_journal_path: str = "books.jsonl"
+    storage_snapshot_path: str = "books.json"
+    storage_fsync_batch_size: int = 64
+    storage_fsync_interval: float = 1.0
+
+    # Bulk create
+    bulk_batch_size: int = 500
+    bulk_max_items: int = 10000
+
     model_config = SettingsConfigDict(
         env_file=".env",
         env_file_encoding="utf-8",
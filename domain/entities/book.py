@@ -1,12 +1,47 @@
 from sqlalchemy import (
-    Column, Integer, String, Boolean, DateTime,
-    CheckConstraint, Index, UniqueConstraint
+    Column, Integer, BigInteger, String, Boolean, DateTime, JSON,
+    CheckConstraint, Index, PrimaryKeyConstraint, UniqueConstraint
 )
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.orm import declarative_base
+from sqlalchemy.sql.functions import FunctionElement
 from datetime import datetime
 
 Base = declarative_base()
 
+# Postgres-специфичные объекты, которые создаются только миграциями и не описаны в модели
+# (генерируемая tsvector-колонка, GIN/trigram-индексы и индексы по выражениям).
+# Alembic autogenerate их пропускает.
+SEARCH_VECTOR_COLUMN = 'search_vector'
+DATABASE_ONLY_OBJECTS = {
+    SEARCH_VECTOR_COLUMN,
+    'idx_books_search_vector',
+    'idx_books_title_trgm',
+    'idx_books_author_trgm',
+    'idx_books_title_prefix',
+    'idx_books_author_prefix',
+}
+
+
+class CodePointOrder(FunctionElement):
+    """
+    Строка в порядке кодов символов — так же сравнивает строки Python (индекс в памяти):
+    COLLATE "C" в Postgres, в SQLite это порядок по умолчанию (BINARY)
+    """
+    name = 'code_point_order'
+    type = String()
+    inherit_cache = True
+
+
+@compiles(CodePointOrder)
+def _code_point_order(element, compiler, **kw):
+    return f'({compiler.process(element.clauses, **kw)} COLLATE "C")'
+
+
+@compiles(CodePointOrder, 'sqlite')
+def _code_point_order_sqlite(element, compiler, **kw):
+    return compiler.process(element.clauses, **kw)
+
 
 class Book(Base):
     __tablename__ = "books"
@@ -21,6 +56,13 @@ class Book(Base):
     accessibility = Column(Boolean, default=True, nullable=False)
     description = Column(String(5000), nullable=True)
 
+    # Метаданные OpenLibrary, заполняются фоновым воркером обогащения
+    openlibrary_key = Column(String(64), nullable=True)
+    cover_id = Column(Integer, nullable=True)
+    subjects = Column(JSON, nullable=True)
+    first_publish_year = Column(Integer, nullable=True)
+    enriched_at = Column(DateTime, nullable=True)
+
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(
         DateTime,
@@ -36,9 +78,59 @@ class Book(Base):
         CheckConstraint('number_pages > 0', name='check_pages_positive'),
         CheckConstraint('number_pages <= 50000', name='check_pages_max'),
         Index('idx_author_title', 'author', 'title'),
-        Index('idx_genre_year', 'genre', 'year_publication'),
+        Index('idx_genre_year', 'genre', 'year_publication', postgresql_include=['accessibility']),
         Index('idx_accessibility', 'accessibility'),
+        # Диапазоны по году/страницам без жанра
+        Index('idx_year_publication', 'year_publication'),
+        Index('idx_number_pages', 'number_pages'),
+    )
+
+    def __repr__(self):
+        return f"<Book(id={self.book_id}, title='{self.title}', author='{self.author}')>"
+
+
+# Keyset-сортировка по названию и автору в порядке кодов символов (см. SORT_COLUMNS)
+Index('idx_books_title_sort', CodePointOrder(Book.title), Book.book_id)
+Index('idx_books_author_sort', CodePointOrder(Book.author), Book.book_id)
+
+
+class BookFacetCount(Base):
+    """
+    Шард счётчика книг по значению фасета (жанр, десятилетие, доступность).
+    Поддерживаются триггерами на books (см. миграции): каждое соединение меняет свой шард,
+    число книг — сумма по шардам. Приложение счётчики только читает.
+    """
+    __tablename__ = "book_facet_counts"
+
+    facet = Column(String(32), nullable=False)
+    value = Column(String(100), nullable=False)
+    shard = Column(Integer, nullable=False)
+    count = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        PrimaryKeyConstraint('facet', 'value', 'shard'),
+        CheckConstraint('shard >= 0 AND shard < 32', name='check_book_facet_counts_shard'),
+    )
+
+    def __repr__(self):
+        return f"<BookFacetCount(facet='{self.facet}', value='{self.value}', shard={self.shard}, count={self.count})>"
+
+
+class CatalogVersion(Base):
+    """
+    Шард версии каталога: триггер увеличивает строку своего соединения на каждый
+    оператор, изменивший хотя бы одну книгу. Версия — сумма по шардам; служит
+    валидатором условных GET для списков.
+    """
+    __tablename__ = "catalog_version"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(BigInteger, nullable=False)
+    updated_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        CheckConstraint('id >= 0 AND id < 32', name='check_catalog_version_shard'),
     )
 
     def __repr__(self):
-        return f"<Book(id={self.book_id}, title='{self.title}', author='{self.author}')>"
\ No newline at end of file
+        return f"<CatalogVersion(version={self.version}, updated_at={self.updated_at})>"
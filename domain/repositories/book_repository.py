@@ -1,5 +1,6 @@
 from abc import ABC, abstractmethod
-from typing import Optional, List
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Optional, List, Tuple
 from domain.entities.book import Book
 from domain.schemas.book import BookCreate
 
@@ -9,18 +10,98 @@ class IBookRepository(ABC):
     async def get_by_id(self, book_id: int) -> Optional[Book]:
         pass
 
+    @abstractmethod
+    async def get_by_ids(self, book_ids: List[int]) -> List[Book]:
+        pass
+
+    @abstractmethod
+    async def get_catalog_version(self) -> Optional[Tuple[int, datetime]]:
+        """Версия каталога и время её последнего изменения; None, если версия не ведётся"""
+        pass
+
     @abstractmethod
     async def get_all(self, filters: dict) -> List[Book]:
         pass
 
+    @abstractmethod
+    async def get_page(
+            self,
+            filters: dict,
+            sort: str,
+            after: Optional[List[Any]],
+            limit: int,
+            order: str = 'asc'
+    ) -> List[Book]:
+        """Keyset-страница: книги, идущие после позиции after = [значение sort, book_id] в порядке order"""
+        pass
+
+    @abstractmethod
+    def stream_all(self, filters: dict, chunk_size: int) -> AsyncIterator[List[Book]]:
+        """Серверный курсор: отдаёт книги порциями по chunk_size"""
+        pass
+
+    @abstractmethod
+    async def count(self, filters: dict) -> int:
+        pass
+
+    @abstractmethod
+    async def search(
+            self,
+            query: str,
+            offset: int,
+            limit: int
+    ) -> Tuple[List[Tuple[Book, float, Optional[str]]], int]:
+        """Полнотекстовый поиск: [(книга, ранг, фрагмент)], общее число совпадений"""
+        pass
+
+    @abstractmethod
+    async def autocomplete(self, field: str, prefix: str, limit: int) -> List[Dict[str, Any]]:
+        """Значения поля, начинающиеся с prefix (без учёта регистра), со схожестью"""
+        pass
+
+    @abstractmethod
+    async def fuzzy_search(
+            self,
+            field: str,
+            query: str,
+            limit: int,
+            threshold: float
+    ) -> List[Dict[str, Any]]:
+        """Значения поля, похожие на query с учётом опечаток, по убыванию схожести"""
+        pass
+
+    @abstractmethod
+    async def get_facets(self, filters: dict) -> Dict[str, Dict[Any, int]]:
+        """Число книг по значениям фасетов: {фасет: {значение: количество}}"""
+        pass
+
     @abstractmethod
     async def create(self, book_data: BookCreate) -> Book:
         pass
 
+    @abstractmethod
+    async def create_many(self, books_data: List[BookCreate]) -> List[Book]:
+        """Создаёт все книги одним запросом; при ошибке не создаёт ни одной"""
+        pass
+
+    @abstractmethod
+    async def get_existing_isbns(self, isbns: List[str]) -> set:
+        pass
+
     @abstractmethod
     async def update(self, book_id: int, book_data: BookCreate) -> Book:
         pass
 
+    @abstractmethod
+    async def update_enrichment(self, book_id: int, data: dict) -> bool:
+        """Сохраняет метаданные OpenLibrary; False, если книги (ещё) нет"""
+        pass
+
     @abstractmethod
     async def delete(self, book_id: int) -> Book:
-        pass
\ No newline at end of file
+        pass
+
+    @abstractmethod
+    async def commit(self) -> None:
+        """Фиксирует транзакцию; кеш и индекс обновляются только после неё"""
+        pass
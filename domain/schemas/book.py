@@ -1,7 +1,23 @@
 from pydantic import BaseModel, Field, field_validator, model_validator
-from typing import Optional
+from typing import Any, Dict, List, Literal, Optional, Self, Union
 from datetime import datetime
 
+# Поля, по которым допускается сортировка списка книг (ключ курсора: (поле, book_id))
+BookSortField = Literal['book_id', 'title', 'author', 'year_publication']
+# Тип значения поля сортировки в курсоре
+SORT_VALUE_TYPES = {'book_id': int, 'title': str, 'author': str, 'year_publication': int}
+
+BookSortOrder = Literal['asc', 'desc']
+
+# Поля, по которым работают подсказки (автодополнение и нечёткий поиск)
+SuggestField = Literal['title', 'author']
+
+ALLOWED_GENRES = frozenset({
+    'Fiction', 'Non-Fiction', 'Science Fiction', 'Fantasy',
+    'Mystery', 'Thriller', 'Romance', 'Horror', 'Biography',
+    'History', 'Science', 'Poetry', 'Drama', 'Children'
+})
+
 
 class BookCreate(BaseModel):
     """Schema for creating a book"""
@@ -66,15 +82,10 @@ class BookCreate(BaseModel):
     @classmethod
     def validate_genre(cls, value: str) -> str:
         """Validate genre against allowed list"""
-        allowed_genres = {
-            'Fiction', 'Non-Fiction', 'Science Fiction', 'Fantasy',
-            'Mystery', 'Thriller', 'Romance', 'Horror', 'Biography',
-            'History', 'Science', 'Poetry', 'Drama', 'Children'
-        }
         cleaned = ' '.join(value.split())
-        if cleaned not in allowed_genres:
+        if cleaned not in ALLOWED_GENRES:
             raise ValueError(
-                f"Genre must be one of: {', '.join(sorted(allowed_genres))}"
+                f"Genre must be one of: {', '.join(sorted(ALLOWED_GENRES))}"
             )
         return cleaned
 
@@ -121,6 +132,11 @@ class BookResponse(BookCreate):
     book_id: int
     created_at: datetime
     updated_at: datetime
+    openlibrary_key: Optional[str] = None
+    cover_id: Optional[int] = None
+    subjects: Optional[List[str]] = None
+    first_publish_year: Optional[int] = None
+    enriched_at: Optional[datetime] = None
 
     model_config = {
         "from_attributes": True,
@@ -139,4 +155,79 @@ class BookResponse(BookCreate):
                 "updated_at": "2024-01-01T00:00:00"
             }]
         }
-    }
\ No newline at end of file
+    }
+
+    @classmethod
+    def from_row(cls, row: Any, **extra: Any) -> Self:
+        """
+        Trusted construction from a stored row (ORM object or index record).
+        Skips validation: the data was validated on write.
+        """
+        values = {name: getattr(row, name) for name in BOOK_RESPONSE_FIELDS}
+        return cls.model_construct(**values, **extra)
+
+    @classmethod
+    def from_cached(cls, data: Dict[str, Any]) -> Self:
+        """Trusted construction from our own model_dump(mode='json') output (cache, pub/sub)"""
+        values = dict(data)
+        for name in BOOK_DATETIME_FIELDS:
+            if values.get(name) is not None:
+                values[name] = datetime.fromisoformat(values[name])
+        return cls.model_construct(**values)
+
+
+BOOK_RESPONSE_FIELDS = tuple(BookResponse.model_fields)
+BOOK_DATETIME_FIELDS = ('created_at', 'updated_at', 'enriched_at')
+
+
+class BookFilter(BaseModel):
+    """Фильтры списка книг; фильтры со значением None не применяются"""
+    author: Optional[str] = None
+    genre: Optional[List[str]] = None
+    year_publication: Optional[int] = None
+    year_from: Optional[int] = None
+    year_to: Optional[int] = None
+    pages_min: Optional[int] = None
+    pages_max: Optional[int] = None
+    accessibility: Optional[bool] = None
+
+
+class BookSearchHit(BookResponse):
+    """Schema for a full-text search result"""
+    rank: float = Field(..., description="Релевантность (ts_rank_cd)")
+    highlight: Optional[str] = Field(None, description="Фрагмент с подсвеченными совпадениями")
+
+
+class BookSuggestion(BaseModel):
+    """Подсказка автодополнения или нечёткого поиска"""
+    value: str = Field(..., description="Найденное название или автор")
+    score: float = Field(..., description="Схожесть с запросом (pg_trgm, от 0 до 1)")
+    book_id: Optional[int] = Field(None, description="Книга (только для подсказок по названию)")
+    author: Optional[str] = Field(None, description="Автор книги (только для подсказок по названию)")
+
+
+class FacetCount(BaseModel):
+    """Число книг с данным значением фасета"""
+    value: Union[bool, int, str]
+    count: int
+
+
+class BookFacets(BaseModel):
+    """Фасеты каталога для текущего набора фильтров"""
+    total: int = Field(..., description="Число книг, подходящих под фильтры")
+    genre: List[FacetCount] = Field(default_factory=list, description="По жанрам, от самых частых")
+    decade: List[FacetCount] = Field(default_factory=list, description="По десятилетиям (1920 — 1920-е)")
+    accessibility: List[FacetCount] = Field(default_factory=list, description="По доступности")
+
+
+class BulkItemError(BaseModel):
+    """Ошибка одного элемента пакетного создания"""
+    index: int = Field(..., description="Позиция элемента во входном списке")
+    error: str = Field(..., description="Краткое описание ошибки")
+    details: Any = Field(None, description="Подробности (ошибки валидации, конфликт и т.п.)")
+
+
+class BulkCreateResponse(BaseModel):
+    """Schema for bulk create response"""
+    created: List[BookResponse]
+    errors: List[BulkItemError]
@@ -1,6 +1,10 @@
-from typing import Generic, List, TypeVar
+import base64
+import json
+from typing import Any, Generic, List, Optional, TypeVar
 from pydantic import BaseModel, Field
 
+from domain.exceptions import ValidationException
+
 # Тип-параметр для обобщённой (generic) модели
 T = TypeVar('T')
 
@@ -8,12 +12,15 @@ class PaginatedResponse(BaseModel, Generic[T]):
     """
     Обобщённая (Generic) схема для ответа с пагинацией.
     Позволяет возвращать список элементов вместе с метаданными пагинации.
+    Поддерживает как постраничную (page), так и курсорную (next_cursor) пагинацию.
     """
     items: List[T] = Field(..., description="Список элементов на текущей странице")
-    total: int = Field(..., description="Общее количество элементов")
-    page: int = Field(..., description="Номер текущей страницы (1-индексированная)")
+    total: Optional[int] = Field(None, description="Общее количество элементов (если запрошено)")
+    page: Optional[int] = Field(None, description="Номер текущей страницы (1-индексированная)")
     page_size: int = Field(..., description="Количество элементов на странице")
-    total_pages: int = Field(..., description="Общее количество страниц")
+    total_pages: Optional[int] = Field(None, description="Общее количество страниц (если известно)")
+    next_cursor: Optional[str] = Field(None, description="Курсор для получения следующей страницы")
+    has_more: bool = Field(False, description="Есть ли ещё элементы после текущей страницы")
 
     model_config = {
         "json_schema_extra": {
@@ -30,8 +37,52 @@ class PaginatedResponse(BaseModel, Generic[T]):
                     "total": 100,
                     "page": 1,
                     "page_size": 20,
-                    "total_pages": 5
+                    "total_pages": 5,
+                    "next_cursor": "eyJzIjoiYm9va19pZCIsInYiOlsyMCwyMF19",
+                    "has_more": True
                 }
             ]
         }
-    }
\ No newline at end of file
+    }
+
+
+def encode_cursor(sort: str, values: List[Any]) -> str:
+    """Кодирует позицию последнего элемента страницы в непрозрачный курсор"""
+    payload = json.dumps({"s": sort, "v": values}, separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str, value_type: type = object) -> List[Any]:
+    """
+    Декодирует курсор и проверяет, что он выдан для той же сортировки
+    и содержит [значение поля сортировки типа value_type, book_id]
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        values = payload["v"]
+        cursor_sort = payload["s"]
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValidationException(
+            message="Invalid pagination cursor",
+            details={"cursor": cursor, "error": str(e)}
+        )
+    if cursor_sort != sort:
+        raise ValidationException(
+            message="Pagination cursor does not match requested sort",
+            details={"cursor_sort": cursor_sort, "sort": sort}
+        )
+    if not (
+            isinstance(values, list) and len(values) == 2
+            and _has_type(values[0], value_type) and _has_type(values[1], int)
+    ):
+        raise ValidationException(
+            message="Invalid pagination cursor",
+            details={"cursor": cursor, "error": f"expected [{value_type.__name__}, int]"}
+        )
+    return values
+
+
+def _has_type(value: Any, expected: type) -> bool:
+    # bool — подкласс int, но в курсоре это ошибка
+    return isinstance(value, expected) and not isinstance(value, bool)
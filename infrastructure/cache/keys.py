@@ -0,0 +1,4 @@
+# Ключи кеша книг: книга по id и версионируемое пространство имён для списков.
+# Любая запись увеличивает версию списков — все старые страницы сразу становятся недостижимы.
+BOOK_CACHE_KEY = "books:item:{book_id}"
+BOOK_LIST_NAMESPACE = "books:list"
@@ -1,19 +1,56 @@
 from redis.asyncio import Redis
+from redis.exceptions import RedisError
+import asyncio
 import json
-from typing import Optional, Any
+import math
+import random
+import time
+import uuid
+from datetime import datetime
+from typing import Optional, Any, Awaitable, Callable, Dict, Iterable, List, Set, Tuple
 from functools import wraps
+from loguru import logger
+from infrastructure.cache.local_cache import LocalTTLCache
+from infrastructure.monitoring.metrics import CACHE_REQUESTS
+from infrastructure.monitoring.profiling import record
+
+# Дочерние счётчики с готовыми метками: без поиска по меткам на каждом обращении
+L1_HIT, L1_MISS = CACHE_REQUESTS.labels("l1", "hit"), CACHE_REQUESTS.labels("l1", "miss")
+L2_HIT, L2_MISS = CACHE_REQUESTS.labels("l2", "hit"), CACHE_REQUESTS.labels("l2", "miss")
+
+
+def _is_empty(value: Any) -> bool:
+    return value is None or value == [] or value == {} or value == ""
+
+
+def _log_task_error(task: asyncio.Task):
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning(f"Background cache task failed: {task.exception()}")
 
 
 class CacheService:
     def __init__(self, redis: Redis):
         self.redis = redis
         self.default_ttl = 300  # 5 minutes
+        self.hits = 0
+        self.misses = 0
+        # Single-flight: одна задача пересчёта на ключ в пределах процесса
+        self._inflight: Dict[str, asyncio.Task] = {}
+        # > 0 при чтении с реплик: инвалидация повторяется через столько секунд
+        self.repeat_invalidation_after = 0.0
+        self._repeats: Set[asyncio.Task] = set()
 
     async def get(self, key: str) -> Optional[Any]:
         """Get value from cache"""
+        started = time.perf_counter()
         value = await self.redis.get(key)
+        record("cache", time.perf_counter() - started)
         if value:
+            self.hits += 1
+            L2_HIT.inc()
             return json.loads(value)
+        self.misses += 1
+        L2_MISS.inc()
         return None
 
     async def set(self, key: str, value: Any, ttl: int = None):
@@ -29,15 +66,350 @@ class CacheService:
         """Delete key from cache"""
         await self.redis.delete(key)
 
+    async def namespace_version(self, namespace: str) -> int:
+        """Current version of a key namespace (part of every key in it)"""
+        version = await self.redis.get(f"ns:{namespace}")
+        return int(version) if version else 0
+
+    async def namespace_stamp(self, namespace: str) -> Tuple[int, Optional[datetime]]:
+        """Namespace version and the time of its last bump (None if it was never bumped)"""
+        version, bumped_at = await self.redis.mget(f"ns:{namespace}", f"ns:{namespace}:at")
+        return int(version or 0), datetime.utcfromtimestamp(float(bumped_at)) if bumped_at else None
+
+    async def bump_namespace(self, namespace: str):
+        """Invalidate a whole namespace in O(1): old keys become unreachable and expire by TTL"""
+        await self.invalidate(namespaces=[namespace], repeat=False)
+
+    async def invalidate(self, keys: Iterable[str] = (), namespaces: Iterable[str] = (), repeat: bool = True):
+        """
+        Delete keys and bump namespaces in a single round trip.
+        With repeat_invalidation_after set (reads served by replicas) it is repeated once later:
+        a miss read from a lagging replica may have put the old data back in the meantime.
+        """
+        keys, namespaces = list(keys), list(namespaces)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            if keys:
+                pipe.delete(*keys)
+            bumped_at = time.time()
+            for namespace in namespaces:
+                pipe.incr(f"ns:{namespace}")
+                pipe.set(f"ns:{namespace}:at", bumped_at)
+            await pipe.execute()
+        if repeat and self.repeat_invalidation_after > 0:
+            task = asyncio.ensure_future(self._invalidate_later(keys, namespaces))
+            self._repeats.add(task)
+            task.add_done_callback(self._repeats.discard)
+            task.add_done_callback(_log_task_error)
+
+    async def _invalidate_later(self, keys: List[str], namespaces: List[str]):
+        await asyncio.sleep(self.repeat_invalidation_after)
+        await self.invalidate(keys, namespaces, repeat=False)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"l2": {"hits": self.hits, "misses": self.misses}}
+
+    async def get_or_compute(
+            self,
+            key: str,
+            loader: Callable[[], Awaitable[Any]],
+            ttl: int = None,
+            stale_ttl: int = 0,
+            negative_ttl: Optional[int] = None,
+            beta: float = 1.0,
+            distributed_lock: bool = False,
+            lock_timeout: float = 2.0,
+            refresh_loader: Optional[Callable[[], Awaitable[Any]]] = None
+    ) -> Any:
+        """
+        Read-through lookup with herd protection.
+        refresh_loader is used for every shared computation — background refreshes and the
+        single-flight load that concurrent callers await — since those outlive the caller
+        that started them: it must not depend on request-scoped resources such as the
+        request's DB session. loader only serves the caller itself when the cache is unreachable.
+
+        - single-flight: concurrent misses for a key in this process share one loader call;
+        - distributed_lock: a short Redis lock (SET NX PX) coalesces misses across processes;
+        - stale-while-revalidate: for stale_ttl seconds after expiry the old value is served
+          while one background task recomputes it;
+        - probabilistic early expiration (XFetch, beta > 0): hot keys are refreshed
+          shortly before they expire, proportionally to how long they take to compute;
+        - negative caching: empty results (None, [], {}) are cached for negative_ttl.
+        """
+        ttl = ttl or self.default_ttl
+        refresh_loader = refresh_loader or loader
+        try:
+            entry = await self.get(key)
+        except Exception as e:
+            logger.warning(f"Cache read failed for {key}: {e}")
+            return await loader()
+
+        if isinstance(entry, dict) and "v" in entry and "t" in entry:
+            now = time.time()
+            expires_at, delta = entry["t"], entry.get("d", 0.0)
+            if now < expires_at:
+                if beta > 0 and now - delta * beta * math.log(1.0 - random.random()) >= expires_at:
+                    self._refresh(key, refresh_loader, ttl, stale_ttl, negative_ttl, distributed_lock, lock_timeout)
+                return entry["v"]
+            if now < expires_at + stale_ttl:
+                self._refresh(key, refresh_loader, ttl, stale_ttl, negative_ttl, distributed_lock, lock_timeout)
+                return entry["v"]
+
+        return await asyncio.shield(
+            self._single_flight(key, refresh_loader, ttl, stale_ttl, negative_ttl, distributed_lock, lock_timeout)
+        )
+
+    def _refresh(self, key: str, *args) -> None:
+        if key not in self._inflight:
+            self._single_flight(key, *args).add_done_callback(_log_task_error)
+
+    def _single_flight(self, key: str, *args) -> asyncio.Task:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._compute(key, *args))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return task
+
+    async def _compute(
+            self,
+            key: str,
+            loader: Callable[[], Awaitable[Any]],
+            ttl: int,
+            stale_ttl: int,
+            negative_ttl: Optional[int],
+            distributed_lock: bool,
+            lock_timeout: float
+    ) -> Any:
+        lock_key, token = f"lock:{key}", uuid.uuid4().hex
+        locked = False
+        if distributed_lock:
+            try:
+                locked = bool(await self.redis.set(lock_key, token, nx=True, px=int(lock_timeout * 1000)))
+                if not locked:
+                    # Другой процесс уже пересчитывает — ждём его результат
+                    value = await self._wait_for_fresh(key, lock_timeout)
+                    if value is not None:
+                        return value["v"]
+            except Exception as e:
+                logger.warning(f"Cache lock failed for {key}: {e}")
+
+        try:
+            started = time.monotonic()
+            value = await loader()
+            delta = time.monotonic() - started
+
+            effective_ttl = negative_ttl if negative_ttl is not None and _is_empty(value) else ttl
+            try:
+                await self.set(
+                    key,
+                    {"v": value, "t": time.time() + effective_ttl, "d": delta},
+                    max(1, math.ceil(effective_ttl + stale_ttl))
+                )
+            except Exception as e:
+                logger.warning(f"Cache write failed for {key}: {e}")
+            return value
+        finally:
+            if locked:
+                try:
+                    if (await self.redis.get(lock_key)) == token.encode():
+                        await self.redis.delete(lock_key)
+                except Exception as e:
+                    logger.warning(f"Cache unlock failed for {key}: {e}")
+
+    async def _wait_for_fresh(self, key: str, timeout: float) -> Optional[dict]:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+            entry = await CacheService.get(self, key)
+            if isinstance(entry, dict) and "t" in entry and entry["t"] > time.time():
+                return entry
+        return None
+
     async def delete_pattern(self, pattern: str):
-        """Delete keys by pattern"""
-        keys = await self.redis.keys(pattern)
-        if keys:
-            await self.redis.delete(*keys)
+        """Delete keys by pattern (incremental SCAN, does not block Redis like KEYS)"""
+        batch = []
+        async for key in self.redis.scan_iter(match=pattern, count=500):
+            batch.append(key)
+            if len(batch) >= 500:
+                await self.redis.delete(*batch)
+                batch = []
+        if batch:
+            await self.redis.delete(*batch)
+
+
+class TieredCache(CacheService):
+    """
+    Two-tier cache: per-worker LocalTTLCache (L1) in front of Redis (L2).
+    Invalidations are applied locally and broadcast over Redis pub/sub,
+    so every uvicorn worker and pod drops the same L1 entries.
+    """
+
+    channel = "cache:invalidate"
+
+    def __init__(self, redis: Redis, local: LocalTTLCache):
+        super().__init__(redis)
+        self.local = local
+        self.instance_id = uuid.uuid4().hex
+        self._listener: Optional[asyncio.Task] = None
 
+    async def get(self, key: str) -> Optional[Any]:
+        found, value = self.local.get(key)
+        if found:
+            L1_HIT.inc()
+            record("cache", 0.0)
+            return value
+        L1_MISS.inc()
+        value = await super().get(key)
+        if value is not None:
+            self.local.set(key, value)
+        return value
+
+    async def set(self, key: str, value: Any, ttl: int = None):
+        await super().set(key, value, ttl)
+        self.local.set(key, value, ttl or self.default_ttl)
+
+    async def delete(self, key: str):
+        await self.invalidate(keys=[key])
+
+    async def namespace_version(self, namespace: str) -> int:
+        found, version = self.local.get(f"ns:{namespace}")
+        if found:
+            return version
+        version = await super().namespace_version(namespace)
+        self.local.set(f"ns:{namespace}", version)
+        return version
+
+    async def namespace_stamp(self, namespace: str) -> Tuple[int, Optional[datetime]]:
+        found, stamp = self.local.get(f"ns:{namespace}:at")
+        if found:
+            return stamp
+        stamp = await super().namespace_stamp(namespace)
+        self.local.set(f"ns:{namespace}:at", stamp)
+        return stamp
+
+    async def bump_namespace(self, namespace: str):
+        await self.invalidate(namespaces=[namespace])
+
+    async def invalidate(self, keys: Iterable[str] = (), namespaces: Iterable[str] = (), repeat: bool = True):
+        keys, namespaces = list(keys), list(namespaces)
+        # L1 evicted even when Redis is down; after L2 too, so a read in between cannot refill it
+        self._evict_local(keys, namespaces)
+        try:
+            await super().invalidate(keys, namespaces, repeat)
+        finally:
+            self._evict_local(keys, namespaces)
+        await self.redis.publish(self.channel, json.dumps({
+            "origin": self.instance_id,
+            "keys": keys,
+            "namespaces": namespaces
+        }))
+
+    def stats(self) -> Dict[str, Any]:
+        return {"l1": self.local.stats(), **super().stats()}
+
+    async def start_listener(self):
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen(), name="cache-invalidation-listener")
+
+    async def stop_listener(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+            self._listener = None
+
+    def _evict_local(self, keys: Iterable[str], namespaces: Iterable[str]):
+        for key in keys:
+            self.local.delete(key)
+        for namespace in namespaces:
+            self.local.delete(f"ns:{namespace}")
+            self.local.delete(f"ns:{namespace}:at")
+
+    async def _listen(self):
+        while True:
+            pubsub = self.redis.pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                # Пока не были подписаны, могли пропустить инвалидации
+                self.local.clear()
+                async for message in pubsub.listen():
+                    if message["type"] != "message":
+                        continue
+                    payload = json.loads(message["data"])
+                    if payload.get("origin") != self.instance_id:
+                        self._evict_local(payload.get("keys", []), payload.get("namespaces", []))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Cache invalidation listener failed, resubscribing: {e}")
+                self.local.clear()
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.aclose()
 
-def cache_response(key_prefix: str, ttl: int = 300):
-    """Decorator for caching endpoint responses"""
+
+# --- Клиент Redis на всё приложение (создаётся в lifespan) ---
+
+_cache_service: Optional[CacheService] = None
+
+
+async def init_cache(
+        redis_url: Optional[str],
+        local_maxsize: int = 0,
+        local_ttl: float = 30.0,
+        redis: Optional[Redis] = None,
+        repeat_invalidation_after: float = 0.0
+) -> Optional[CacheService]:
+    """
+    Create the shared cache; the cache stays disabled if Redis is unreachable.
+    local_maxsize > 0 enables the in-process L1 tier. A ready Redis client
+    (e.g. fakeredis) may be passed instead of a URL.
+    repeat_invalidation_after > 0 repeats every invalidation after that many seconds.
+    """
+    global _cache_service
+    if redis is None:
+        if not redis_url:
+            return None
+        redis = Redis.from_url(redis_url)
+    try:
+        await redis.ping()
+    except (RedisError, OSError) as e:
+        logger.warning(f"Redis is unavailable at {redis_url}, caching disabled: {e}")
+        await redis.aclose()
+        return None
+    if local_maxsize > 0:
+        _cache_service = TieredCache(redis, LocalTTLCache(maxsize=local_maxsize, ttl=local_ttl))
+        await _cache_service.start_listener()
+    else:
+        _cache_service = CacheService(redis)
+    _cache_service.repeat_invalidation_after = repeat_invalidation_after
+    return _cache_service
+
+
+async def close_cache():
+    global _cache_service
+    if _cache_service is not None:
+        if isinstance(_cache_service, TieredCache):
+            await _cache_service.stop_listener()
+        for task in list(_cache_service._repeats):
+            task.cancel()
+        await _cache_service.redis.aclose()
+        _cache_service = None
+
+
+def get_cache_service() -> Optional[CacheService]:
+    """Dependency: shared CacheService or None when caching is disabled"""
+    return _cache_service
+
+
+def cache_response(
+        key_prefix: str,
+        ttl: int = 300,
+        stale_ttl: int = 0,
+        negative_ttl: Optional[int] = None,
+        beta: float = 1.0,
+        distributed_lock: bool = False
+):
+    """Decorator for caching endpoint responses (see CacheService.get_or_compute)"""
 
     def decorator(func):
         @wraps(func)
@@ -47,22 +419,20 @@ def cache_response(key_prefix: str, ttl: int = 300):
             if not cache:
                 return await func(*args, **kwargs)
 
-            # Создаем ключ кеша
-            cache_key = f"{key_prefix}:{json.dumps(kwargs, default=str)}"
-
-            # Проверяем кеш
-            cached = await cache.get(cache_key)
-            if cached:
-                return cached
-
-            # Вызываем функцию
-            result = await func(*args, **kwargs)
-
-            # Сохраняем в кеш
-            await cache.set(cache_key, result, ttl)
+            # Создаем ключ кеша (сам cache в ключ не входит)
+            key_params = {name: value for name, value in kwargs.items() if name != 'cache'}
+            cache_key = f"{key_prefix}:{json.dumps(key_params, sort_keys=True, default=str)}"
 
-            return result
+            return await cache.get_or_compute(
+                cache_key,
+                lambda: func(*args, **kwargs),
+                ttl=ttl,
+                stale_ttl=stale_ttl,
+                negative_ttl=negative_ttl,
+                beta=beta,
+                distributed_lock=distributed_lock
+            )
 
         return wrapper
 
-    return decorator
\ No newline at end of file
+    return decorator
@@ -0,0 +1,55 @@
+import time
+
+from loguru import logger
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from infrastructure.monitoring.metrics import DB_QUERY_DURATION, DB_QUERY_ERRORS
+from infrastructure.monitoring.profiling import current_profile
+
+# Ключ в Connection.info: стек времён начала (курсоры могут выполняться вложенно)
+_STARTED = "query_started_at"
+STATEMENT_KINDS = frozenset({"SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "SAVEPOINT", "RELEASE", "ROLLBACK"})
+# Параметры bulk-вставок бывают огромными — в лог попадает только начало
+MAX_LOGGED_PARAMETERS = 1000
+
+
+def statement_kind(statement: str) -> str:
+    """Первое слово запроса — метка с ограниченным числом значений"""
+    words = statement.lstrip().split(None, 1)
+    kind = words[0].upper() if words else ""
+    return kind if kind in STATEMENT_KINDS else "OTHER"
+
+
+def instrument_engine(engine: AsyncEngine, database: str, slow_query_ms: float = 0.0) -> None:
+    """
+    Время SQL-запросов движка по событиям before/after_cursor_execute: гистограмма
+    Prometheus, профиль текущего запроса (Server-Timing) и лог запросов дольше
+    slow_query_ms вместе с параметрами (0 — не логировать).
+    """
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault(_STARTED, []).append(time.perf_counter())
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info[_STARTED].pop()
+        DB_QUERY_DURATION.labels(database, statement_kind(statement)).observe(elapsed)
+        profile = current_profile()
+        if profile is not None:
+            profile.add_query(statement, elapsed)
+        if slow_query_ms and elapsed * 1000 >= slow_query_ms:
+            logger.warning(
+                f"Slow query on {database} ({elapsed * 1000:.1f}ms): {statement} "
+                f"parameters={repr(parameters)[:MAX_LOGGED_PARAMETERS]}"
+            )
+
+    def handle_error(exception_context):
+        conn = exception_context.connection
+        if conn is None or not conn.info.get(_STARTED):
+            return
+        conn.info[_STARTED].pop()
+        DB_QUERY_ERRORS.labels(database, statement_kind(exception_context.statement or "")).inc()
+
+    event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", after_cursor_execute)
+    event.listen(engine.sync_engine, "handle_error", handle_error)
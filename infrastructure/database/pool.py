@@ -0,0 +1,264 @@
+import asyncio
+import bisect
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+from loguru import logger
+from sqlalchemy import event, exc
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+# Границы корзин гистограммы ожидания соединения, мс
+WAIT_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class Histogram:
+    """Fixed-bucket histogram; quantiles are estimated as the upper bound of their bucket"""
+
+    def __init__(self, buckets: Sequence[float] = WAIT_BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank, seen = q * self.count, 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return self.buckets[index] if index < len(self.buckets) else self.max
+        return self.max
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "mean": round(self.sum / self.count, 3) if self.count else 0.0,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "max": round(self.max, 3),
+            "buckets": {
+                **{f"le_{bound}": count for bound, count in zip(self.buckets, self.counts)},
+                "inf": self.counts[-1],
+            },
+        }
+
+
+class PoolWindow:
+    """Checkout statistics since the previous autoscaler tick"""
+
+    def __init__(self):
+        self.wait = Histogram()
+        self.timeouts = 0
+        self.peak_overflow = 0
+
+
+class PoolMetrics:
+    """Checkout waits, timeouts and connection ages of one pool; survives pool recreation"""
+
+    def __init__(self):
+        self.wait = Histogram()
+        self.window = PoolWindow()
+        self.timeouts = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.peak_checked_out = 0
+        self._opened_at: Dict[int, float] = {}
+
+    def observe_checkout(self, seconds: float, checked_out: int, overflow: int) -> None:
+        wait_ms = seconds * 1000
+        self.wait.observe(wait_ms)
+        self.window.wait.observe(wait_ms)
+        self.peak_checked_out = max(self.peak_checked_out, checked_out)
+        self.window.peak_overflow = max(self.window.peak_overflow, overflow)
+
+    def observe_timeout(self) -> None:
+        self.timeouts += 1
+        self.window.timeouts += 1
+
+    def take_window(self) -> PoolWindow:
+        window, self.window = self.window, PoolWindow()
+        return window
+
+    def attach(self, pool: "InstrumentedQueuePool") -> None:
+        """Следит за открытием и закрытием соединений (для возраста соединений)"""
+        def on_connect(dbapi_connection, record):
+            self.connects += 1
+            self._opened_at[id(record)] = time.monotonic()
+
+        def on_close(dbapi_connection, record):
+            self._opened_at.pop(id(record), None)
+
+        def on_invalidate(dbapi_connection, record, exception):
+            self.invalidations += 1
+
+        event.listen(pool, "connect", on_connect)
+        event.listen(pool, "close", on_close)
+        event.listen(pool, "detach", on_close)
+        event.listen(pool, "invalidate", on_invalidate)
+
+    def ages(self) -> List[float]:
+        now = time.monotonic()
+        return [now - opened_at for opened_at in self._opened_at.values()]
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Async queue pool that times every checkout (waiting for a free slot, opening
+    a connection and the pre-ping included) and lets the overflow allowance be
+    changed at runtime. pool_size itself is fixed: it is the capacity of the
+    underlying queue.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+        # Пересозданный пул (recreate) получает слушателей событий старого через _dispatch
+        if "_dispatch" not in kwargs:
+            self.metrics.attach(self)
+
+    def recreate(self) -> "InstrumentedQueuePool":
+        # Engine.dispose() пересоздаёт пул; метрики и текущий overflow переживают это
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        pool.max_overflow = self.max_overflow
+        return pool
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.metrics.observe_timeout()
+            raise
+        self.metrics.observe_checkout(time.perf_counter() - started, self.checkedout(), max(0, self.overflow()))
+        return connection
+
+    @property
+    def max_overflow(self) -> int:
+        return self._max_overflow
+
+    @max_overflow.setter
+    def max_overflow(self, value: int) -> None:
+        # Лишние overflow-соединения закрываются при возврате в пул, новые сверх лимита не открываются
+        self._max_overflow = value
+
+    def stats(self) -> Dict[str, Any]:
+        ages = self.metrics.ages()
+        return {
+            "pool_size": self.size(),
+            "max_overflow": self.max_overflow,
+            "checked_out": self.checkedout(),
+            "idle": self.checkedin(),
+            "overflow": max(0, self.overflow()),
+            "peak_checked_out": self.metrics.peak_checked_out,
+            "connections": len(ages),
+            "connection_age_seconds": {
+                "oldest": round(max(ages), 1) if ages else 0.0,
+                "mean": round(sum(ages) / len(ages), 1) if ages else 0.0,
+            },
+            "connects": self.metrics.connects,
+            "invalidations": self.metrics.invalidations,
+            "timeouts": self.metrics.timeouts,
+            "checkout_wait_ms": self.metrics.wait.snapshot(),
+        }
+
+
+def pool_stats(engine: AsyncEngine) -> Dict[str, Any]:
+    pool = engine.sync_engine.pool
+    if isinstance(pool, InstrumentedQueuePool):
+        return pool.stats()
+    return {"status": pool.status()}
+
+
+async def warm_up(engine: AsyncEngine, count: int) -> int:
+    """
+    Открывает count соединений заранее (в lifespan), чтобы первые запросы после
+    деплоя не платили за установку соединения. Возвращает число открытых.
+    """
+    results = await asyncio.gather(*(engine.connect() for _ in range(count)), return_exceptions=True)
+    opened = [connection for connection in results if not isinstance(connection, BaseException)]
+    for connection in opened:
+        await connection.close()
+    if len(opened) < count:
+        errors = [result for result in results if isinstance(result, BaseException)]
+        logger.warning(f"Pool warm-up opened {len(opened)}/{count} connections to {engine.url}: {errors[0]}")
+    return len(opened)
+
+
+class PoolAutoscaler:
+    """
+    Adaptive overflow: every interval the checkout waits of the last window are
+    compared with target_wait_ms. Saturation (p95 above target or checkout
+    timeouts) grows the overflow allowance by half; a quiet window whose peak
+    overflow used less than half of it shrinks it by one. Always within
+    [min_overflow, max_overflow].
+    """
+
+    def __init__(
+            self,
+            engine: AsyncEngine,
+            min_overflow: int,
+            max_overflow: int,
+            target_wait_ms: float = 20.0,
+            interval: float = 10.0
+    ):
+        self.engine = engine
+        self.min_overflow = min_overflow
+        self.max_overflow = max_overflow
+        self.target_wait_ms = target_wait_ms
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    def adjust(self) -> Optional[int]:
+        """Один шаг подстройки; новое значение overflow или None, если оно не изменилось"""
+        pool = self.engine.sync_engine.pool
+        if not isinstance(pool, InstrumentedQueuePool):
+            return None
+        window = pool.metrics.take_window()
+        current = pool.max_overflow
+        p95 = window.wait.quantile(0.95)
+
+        if window.timeouts or p95 > self.target_wait_ms:
+            target = current + max(1, current // 2)
+        elif p95 <= self.target_wait_ms / 4 and window.peak_overflow < current // 2:
+            target = current - 1
+        else:
+            return None
+        target = min(self.max_overflow, max(self.min_overflow, target))
+        if target == current:
+            return None
+
+        pool.max_overflow = target
+        logger.info(
+            f"Pool overflow for {self.engine.url.database} {current} -> {target} "
+            f"(p95 wait {p95}ms, timeouts {window.timeouts}, peak overflow {window.peak_overflow})"
+        )
+        return target
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="pool-autoscaler")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                self.adjust()
+            except Exception as e:
+                logger.warning(f"Pool autoscaler step failed: {e}")
@@ -0,0 +1,192 @@
+import asyncio
+import time
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+# Отставание реплики Postgres в секундах. Реплика не отстаёт, только если применила WAL
+# до позиции primary на момент проверки: сравнение с pg_last_wal_receive_lsn() давало 0,
+# когда отстаёт сам приём WAL. Без позиции primary (он недоступен) — сравнение с принятым
+POSTGRES_LAG_QUERY = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_replay_lsn() >= COALESCE(
+            CAST(CAST(:primary_lsn AS text) AS pg_lsn), pg_last_wal_receive_lsn()
+        ) THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - COALESCE(pg_last_xact_replay_timestamp(), pg_postmaster_start_time()))
+    END
+""")
+# Позиция конца WAL на primary: после коммита записи она не меньше LSN этого коммита
+# (в отличие от pg_current_wal_lsn() — и при synchronous_commit = off)
+PRIMARY_LSN_QUERY = text("SELECT CAST(pg_current_wal_insert_lsn() AS text)")
+# Применила ли реплика WAL до заданной позиции (токен read-your-writes клиента)
+REPLAYED_QUERY = text("""
+    SELECT NOT pg_is_in_recovery()
+        OR COALESCE(pg_last_wal_replay_lsn() >= CAST(CAST(:lsn AS text) AS pg_lsn), false)
+""")
+# Остальные СУБД (SQLite в локальной разработке) проверяются только на доступность
+GENERIC_LAG_QUERY = text("SELECT 0")
+
+
+class Replica:
+    """A read replica: its engine, session factory and health state"""
+
+    def __init__(self, engine: AsyncEngine):
+        self.engine = engine
+        self.name = engine.url.render_as_string(hide_password=True)
+        self.session_maker = async_sessionmaker(
+            engine,
+            class_=AsyncSession,
+            expire_on_commit=False,
+            autocommit=False,
+            autoflush=False
+        )
+        self.ejected_until = 0.0
+        self.lag: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.sessions = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "ejected_for": round(max(0.0, self.ejected_until - time.monotonic()), 1),
+            "lag": self.lag,
+            "sessions": self.sessions,
+            "last_error": self.last_error,
+        }
+
+
+class ReplicaRouter:
+    """
+    Round-robin over read replicas with health ejection.
+
+    A replica leaves the rotation for eject_seconds when a connection to it fails,
+    or until the next check when its replication lag exceeds max_lag. A background
+    task re-checks every replica each check_interval seconds and brings recovered
+    ones back early. With no replica available reads fall back to the primary.
+
+    A read may carry a WAL position (the client's last write, see primary_lsn):
+    then only a replica that has already replayed it is used.
+    """
+
+    def __init__(
+            self,
+            engines: List[AsyncEngine],
+            primary: Optional[AsyncEngine] = None,
+            max_lag: float = 5.0,
+            check_interval: float = 5.0,
+            eject_seconds: float = 30.0
+    ):
+        self.replicas = [Replica(engine) for engine in engines]
+        self.primary = primary
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.eject_seconds = eject_seconds
+        self.fallbacks = 0
+        self._next = 0
+        self._checker: Optional[asyncio.Task] = None
+
+    def available(self) -> List[Replica]:
+        now = time.monotonic()
+        return [
+            replica for replica in self.replicas
+            if replica.ejected_until <= now and (replica.lag is None or replica.lag <= self.max_lag)
+        ]
+
+    async def open_session(self, min_lsn: Optional[str] = None) -> Optional[AsyncSession]:
+        """
+        Session on the next healthy replica, or None (read from the primary).
+        The connection is checked out here, so an unreachable replica is ejected
+        and the next one is tried before the request starts using the session.
+        With min_lsn a Postgres replica that has not replayed up to it is skipped.
+        """
+        candidates = self.available()
+        start, self._next = self._next, self._next + 1
+        for offset in range(len(candidates)):
+            replica = candidates[(start + offset) % len(candidates)]
+            session = replica.session_maker(info={"replica": replica})
+            try:
+                await session.connection()
+                caught_up = (
+                    min_lsn is None
+                    or replica.engine.dialect.name != "postgresql"
+                    or (await session.execute(REPLAYED_QUERY, {"lsn": min_lsn})).scalar_one()
+                )
+            except (DBAPIError, OSError) as e:
+                await session.close()
+                self.eject(replica, e)
+                continue
+            if not caught_up:
+                await session.close()
+                continue
+            replica.sessions += 1
+            return session
+        self.fallbacks += 1
+        return None
+
+    def eject(self, replica: Replica, error: Exception) -> None:
+        replica.ejected_until = time.monotonic() + self.eject_seconds
+        replica.last_error = str(error)
+        logger.warning(f"Read replica {replica.name} ejected for {self.eject_seconds}s: {error}")
+
+    async def primary_lsn(self) -> Optional[str]:
+        """Текущая позиция WAL на primary; None, если primary не Postgres или недоступен"""
+        if self.primary is None or self.primary.dialect.name != "postgresql":
+            return None
+        try:
+            async with self.primary.connect() as connection:
+                return (await connection.execute(PRIMARY_LSN_QUERY)).scalar_one()
+        except (DBAPIError, OSError) as e:
+            logger.warning(f"Could not read the primary WAL position: {e}")
+            return None
+
+    async def check(self) -> None:
+        """Одна проверка всех реплик: доступность и отставание"""
+        primary_lsn = await self.primary_lsn()
+        for replica in self.replicas:
+            postgres = replica.engine.dialect.name == "postgresql"
+            query = POSTGRES_LAG_QUERY if postgres else GENERIC_LAG_QUERY
+            params = {"primary_lsn": primary_lsn} if postgres else {}
+            try:
+                async with replica.engine.connect() as connection:
+                    replica.lag = float((await connection.execute(query, params)).scalar_one())
+            except (DBAPIError, OSError) as e:
+                replica.lag = None
+                self.eject(replica, e)
+                continue
+            if replica.lag > self.max_lag:
+                logger.warning(f"Read replica {replica.name} lags {replica.lag:.1f}s, out of rotation")
+            else:
+                replica.ejected_until = 0.0
+                replica.last_error = None
+
+    async def start(self) -> None:
+        if self._checker is None:
+            await self.check()
+            self._checker = asyncio.create_task(self._check_loop(), name="replica-health-check")
+
+    async def stop(self) -> None:
+        if self._checker is not None:
+            self._checker.cancel()
+            await asyncio.gather(self._checker, return_exceptions=True)
+            self._checker = None
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+    async def _check_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.check_interval)
+            try:
+                await self.check()
+            except Exception as e:
+                logger.warning(f"Read replica health check failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "available": len(self.available()),
+            "fallbacks": self.fallbacks,
+            "replicas": [replica.stats() for replica in self.replicas],
+        }
@@ -1,19 +1,33 @@
+from typing import List
 from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
     AsyncSession,
     create_async_engine,
     async_sessionmaker
 )
 from config.settings import get_settings
+from infrastructure.database.instrumentation import instrument_engine
+from infrastructure.database.pool import InstrumentedQueuePool
+from infrastructure.database.replicas import ReplicaRouter
 
 settings = get_settings()
 
-engine = create_async_engine(
-    settings.database_url,
-    echo=settings.debug,
-    pool_size=settings.db_pool_size,
-    max_overflow=settings.db_max_overflow,
-    pool_pre_ping=True,  # Проверка соединений
-)
+
+def _create_engine(url: str, database: str) -> AsyncEngine:
+    engine = create_async_engine(
+        url,
+        echo=settings.debug,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_pre_ping=True,  # Проверка соединений
+        poolclass=InstrumentedQueuePool,  # метрики пула, см. /health/pool
+    )
+    # Время запросов: метрики, Server-Timing и лог медленных запросов
+    instrument_engine(engine, database, slow_query_ms=settings.slow_query_threshold_ms)
+    return engine
+
+
+engine = _create_engine(settings.database_url, "primary")
 
 async_session_maker = async_sessionmaker(
     engine,
@@ -21,4 +35,18 @@ async_session_maker = async_sessionmaker(
     expire_on_commit=False,
     autocommit=False,
     autoflush=False
-)
\ No newline at end of file
+)
+
+# Реплики для чтения (GET/HEAD); без них все запросы идут в primary
+replicas = ReplicaRouter(
+    [_create_engine(url, "replica") for url in settings.database_replica_urls],
+    primary=engine,
+    max_lag=settings.replica_max_lag,
+    check_interval=settings.replica_check_interval,
+    eject_seconds=settings.replica_eject_seconds
+) if settings.database_replica_urls else None
+
+
+def all_engines() -> List[AsyncEngine]:
+    """Primary и реплики — для прогрева пулов, метрик и адаптивного overflow"""
+    return [engine, *(replica.engine for replica in replicas.replicas)] if replicas else [engine]
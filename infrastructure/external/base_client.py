@@ -9,6 +9,7 @@ from tenacity import (
 )
 from config.settings import get_settings
 from domain.exceptions import ExternalServiceException
+from infrastructure.external.http_client import http_clients
 
 settings = get_settings()
 
@@ -42,8 +43,8 @@ class BaseHttpApiClient(BaseExternalApiClient):
     def __init__(self, base_url: str, timeout: int = 10):
         self.base_url = base_url
         self.timeout = timeout
-        # Общий httpx.AsyncClient может быть инициализирован тут,
-        # но часто его лучше создавать в каждом методе, чтобы избежать проблем с жизненным циклом.
+        # Соединения берутся из общего пула приложения (http_clients),
+        # жизненным циклом клиентов управляет lifespan.
 
     def get_retry_decorator(self, attempts: int = 3):
         """
@@ -65,18 +66,18 @@ class BaseHttpApiClient(BaseExternalApiClient):
     ) -> httpx.Response:
         """
         Внутренний метод для выполнения HTTP-запросов.
-        Инкапсулирует общую логику: создание клиента, отправка, обработка статусов.
+        Инкапсулирует общую логику: получение клиента из пула, отправка, обработка статусов.
         """
         url = f"{self.base_url.rstrip('/')}/{endpoint.lstrip('/')}"
         # Добавляем общий таймаут, если не задан явно в kwargs
         kwargs.setdefault('timeout', self.timeout)
 
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.request(method, url, **kwargs)
-                # Обработка успешных ответов
-                response.raise_for_status()
-                return response
+            client = http_clients.get(self.base_url)
+            response = await client.request(method, url, **kwargs)
+            # Обработка успешных ответов
+            response.raise_for_status()
+            return response
         except httpx.TimeoutException as e:
             logger.error(f"Timeout while requesting {method} {url}: {e}")
             raise ExternalServiceException(
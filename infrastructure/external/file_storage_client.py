@@ -1,35 +1,223 @@
 import asyncio
-import aiofiles
 import json
+import os
+import sys
+import time
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 from loguru import logger
+from config.settings import get_settings
+
+try:
+    import fcntl
+except ImportError:  # Windows: межпроцессная блокировка недоступна
+    fcntl = None
+
+settings = get_settings()
 
 
 class FileStorageClient:
-    def __init__(self, file_path: str = "books.json"):
+    """
+    Файловое хранилище книг в виде append-only журнала (JSON Lines).
+
+    Каждая книга — одна строка, дописываемая в конец журнала под межпроцессной
+    блокировкой (flock), поэтому несколько воркеров uvicorn не теряют записи,
+    а стоимость добавления не зависит от размера каталога.
+    fsync выполняется пачками: раз в fsync_batch_size записей или
+    раз в fsync_interval секунд.
+    Прежний формат (JSON-массив в file_path) строится по запросу через compact_async().
+    """
+
+    def __init__(
+            self,
+            file_path: str = "books.json",
+            journal_path: Optional[str] = None,
+            fsync_batch_size: int = 64,
+            fsync_interval: float = 1.0
+    ):
         self.file_path = Path(file_path)
+        self.journal_path = Path(journal_path) if journal_path else self.file_path.with_suffix(".jsonl")
+        self.fsync_batch_size = fsync_batch_size
+        self.fsync_interval = fsync_interval
+        # Сериализует записи внутри процесса; между процессами — flock
+        self._lock = asyncio.Lock()
+        self._unsynced = 0
+        self._last_fsync = time.monotonic()
 
     async def append_book_async(self, book_dict: Dict[str, Any]) -> None:
-        """Асинхронная запись в файл"""
-        # Читаем существующие книги
-        if self.file_path.exists():
-            async with aiofiles.open(self.file_path, "r", encoding="utf-8") as f:
-                content = await f.read()
-                books = json.loads(content) if content else []
-        else:
-            books = []
-
-        # Добавляем новую книгу
-        books.append(book_dict)
-
-        # Записываем обратно
-        async with aiofiles.open(self.file_path, "w", encoding="utf-8") as f:
-            await f.write(json.dumps(books, ensure_ascii=False, indent=2))
-        logger.info(f"Book appended to {self.file_path}")
-
-    # Можно добавить методы для чтения, удаления и т.д.
-    # async def get_books_async(self) -> list:
-    #     ...
-    # async def remove_book_async(self, book_id: int) -> None:
-    #     ...
\ No newline at end of file
+        """Асинхронная запись в журнал"""
+        await self.append_books_async([book_dict])
+
+    async def append_books_async(self, book_dicts: List[Dict[str, Any]]) -> None:
+        """Асинхронная запись пачки книг одним дописыванием в журнал"""
+        if not book_dicts:
+            return
+        data = "".join(
+            json.dumps(book, ensure_ascii=False, default=str) + "\n" for book in book_dicts
+        ).encode("utf-8")
+        async with self._lock:
+            await asyncio.to_thread(self._append, data, len(book_dicts))
+        logger.info(f"{len(book_dicts)} book(s) appended to {self.journal_path}")
+
+    async def flush_async(self) -> None:
+        """Принудительный fsync журнала (вызывается при остановке приложения)"""
+        async with self._lock:
+            if self._unsynced and self.journal_path.exists():
+                await asyncio.to_thread(self._fsync_path)
+
+    async def compact_async(self) -> int:
+        """
+        Компактирует журнал (последняя запись для каждого book_id побеждает)
+        и пишет снимок в прежнем формате JSON-массива в file_path.
+        Возвращает количество книг в снимке.
+        """
+        async with self._lock:
+            return await asyncio.to_thread(self._compact)
+
+    # --- Синхронная часть, выполняется в пуле потоков ---
+
+    def _append(self, data: bytes, records: int) -> None:
+        fd = self._open_locked()
+        try:
+            if os.fstat(fd).st_size == 0:
+                self._seed_from_legacy(fd)
+            self._write_all(fd, data)
+            self._unsynced += records
+            if (self._unsynced >= self.fsync_batch_size
+                    or time.monotonic() - self._last_fsync >= self.fsync_interval):
+                os.fsync(fd)
+                self._unsynced = 0
+                self._last_fsync = time.monotonic()
+        finally:
+            self._unlock_close(fd)
+
+    def _compact(self) -> int:
+        fd = self._open_locked()
+        try:
+            if os.fstat(fd).st_size == 0:
+                self._seed_from_legacy(fd)
+            books = self._read_journal()
+
+            journal_tmp = self.journal_path.with_suffix(self.journal_path.suffix + ".tmp")
+            with open(journal_tmp, "w", encoding="utf-8") as f:
+                for book in books:
+                    f.write(json.dumps(book, ensure_ascii=False, default=str) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+            snapshot_tmp = self.file_path.with_suffix(self.file_path.suffix + ".tmp")
+            with open(snapshot_tmp, "w", encoding="utf-8") as f:
+                f.write(json.dumps(books, ensure_ascii=False, indent=2, default=str))
+                f.flush()
+                os.fsync(f.fileno())
+
+            # Писатели после получения блокировки сверяют inode и переоткрывают файл
+            os.replace(journal_tmp, self.journal_path)
+            os.replace(snapshot_tmp, self.file_path)
+            self._unsynced = 0
+            self._last_fsync = time.monotonic()
+        finally:
+            self._unlock_close(fd)
+        logger.info(f"Journal {self.journal_path} compacted into {self.file_path}: {len(books)} book(s)")
+        return len(books)
+
+    def _read_journal(self) -> List[Dict[str, Any]]:
+        by_id: Dict[Any, Dict[str, Any]] = {}
+        anonymous: List[Dict[str, Any]] = []
+        order: List[Any] = []
+        with open(self.journal_path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    book = json.loads(line)
+                except json.JSONDecodeError:
+                    # Оборванная последняя строка после сбоя — пропускаем
+                    logger.warning(f"Skipping corrupted journal line in {self.journal_path}")
+                    continue
+                book_id = book.get("book_id")
+                if book_id is None:
+                    anonymous.append(book)
+                    order.append(None)
+                    continue
+                if book_id not in by_id:
+                    order.append(book_id)
+                by_id[book_id] = book
+
+        books, anonymous_iter = [], iter(anonymous)
+        for book_id in order:
+            books.append(next(anonymous_iter) if book_id is None else by_id[book_id])
+        return books
+
+    def _seed_from_legacy(self, fd: int) -> None:
+        """Переносит книги из прежнего books.json в пустой журнал"""
+        if not self.file_path.exists():
+            return
+        content = self.file_path.read_text(encoding="utf-8")
+        legacy = json.loads(content) if content.strip() else []
+        if legacy:
+            self._write_all(fd, "".join(
+                json.dumps(book, ensure_ascii=False) + "\n" for book in legacy
+            ).encode("utf-8"))
+            logger.info(f"Journal {self.journal_path} seeded with {len(legacy)} book(s) from {self.file_path}")
+
+    def _open_locked(self) -> int:
+        while True:
+            fd = os.open(self.journal_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            if fcntl is None:
+                return fd
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            # Журнал могли подменить компактированием, пока мы ждали блокировку
+            try:
+                if os.fstat(fd).st_ino == os.stat(self.journal_path).st_ino:
+                    return fd
+            except FileNotFoundError:
+                pass
+            self._unlock_close(fd)
+
+    def _fsync_path(self) -> None:
+        fd = os.open(self.journal_path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+            self._unsynced = 0
+            self._last_fsync = time.monotonic()
+        finally:
+            os.close(fd)
+
+    @staticmethod
+    def _write_all(fd: int, data: bytes) -> None:
+        view = memoryview(data)
+        while view:
+            written = os.write(fd, view)
+            view = view[written:]
+
+    @staticmethod
+    def _unlock_close(fd: int) -> None:
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+        finally:
+            os.close(fd)
+
+
+# --- Зависимость для DI ---
+@lru_cache()
+def get_file_storage_client() -> FileStorageClient:
+    """Один клиент на процесс: общий счётчик fsync-пачек и блокировка"""
+    return FileStorageClient(
+        file_path=settings.storage_snapshot_path,
+        journal_path=settings.storage_journal_path,
+        fsync_batch_size=settings.storage_fsync_batch_size,
+        fsync_interval=settings.storage_fsync_interval
+    )
+
+
+if __name__ == "__main__":
+    # python -m infrastructure.external.file_storage_client compact
+    if len(sys.argv) > 1 and sys.argv[1] == "compact":
+        count = asyncio.run(get_file_storage_client().compact_async())
+        print(f"{count} book(s) written to {settings.storage_snapshot_path}")
+    else:
+        print("usage: python -m infrastructure.external.file_storage_client compact")
@@ -0,0 +1,97 @@
+import time
+import httpx
+from typing import Dict, Iterable, Optional
+from loguru import logger
+from config.settings import get_settings
+from infrastructure.monitoring.metrics import HTTP_CLIENT_REQUEST_DURATION
+from infrastructure.monitoring.profiling import record
+
+settings = get_settings()
+
+
+async def _start_timer(request: httpx.Request) -> None:
+    request.extensions["started_at"] = time.perf_counter()
+
+
+async def _observe_latency(response: httpx.Response) -> None:
+    """Время вызова upstream до получения заголовков ответа"""
+    request = response.request
+    started = request.extensions.get("started_at")
+    if started is not None:
+        elapsed = time.perf_counter() - started
+        HTTP_CLIENT_REQUEST_DURATION.labels(
+            request.url.host, request.method, str(response.status_code)
+        ).observe(elapsed)
+        record("http", elapsed)
+
+
+class HttpClientRegistry:
+    """
+    Реестр общих httpx.AsyncClient на всё приложение.
+    Для каждого upstream (схема + хост + порт) держится один клиент со своим пулом
+    keep-alive соединений, поэтому DNS, TCP и TLS не повторяются на каждый вызов.
+    Открывается в lifespan приложения и закрывается при остановке.
+    """
+
+    def __init__(self, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._transport = transport
+
+    def configure(self, transport: Optional[httpx.AsyncBaseTransport] = None) -> None:
+        """Подменяет транспорт (например, httpx.MockTransport в тестах и бенчмарках)"""
+        self._transport = transport
+
+    async def startup(self, base_urls: Iterable[str] = ()) -> None:
+        """Заранее создаёт клиентов для известных upstream"""
+        for base_url in base_urls:
+            if base_url:
+                self.get(base_url)
+
+    def get(self, base_url: str) -> httpx.AsyncClient:
+        """Возвращает общий клиент для хоста base_url (создаёт при первом обращении)"""
+        url = httpx.URL(base_url)
+        key = f"{url.scheme}://{url.host}" + (f":{url.port}" if url.port else "")
+        client = self._clients.get(key)
+        if client is None or client.is_closed:
+            client = self._clients[key] = self._create_client(url.host)
+        return client
+
+    async def aclose(self) -> None:
+        """Закрывает все пулы соединений"""
+        clients, self._clients = self._clients, {}
+        for client in clients.values():
+            await client.aclose()
+
+    def _create_client(self, host: str) -> httpx.AsyncClient:
+        max_connections = settings.http_pool_limits_per_host.get(host, settings.http_max_connections)
+        limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=min(settings.http_max_keepalive_connections, max_connections),
+            keepalive_expiry=settings.http_keepalive_expiry
+        )
+        return httpx.AsyncClient(
+            limits=limits,
+            http2=self._http2_available(),
+            timeout=settings.http_default_timeout,
+            transport=self._transport,
+            event_hooks={"request": [_start_timer], "response": [_observe_latency]}
+        )
+
+    @staticmethod
+    def _http2_available() -> bool:
+        if not settings.http2_enabled:
+            return False
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            logger.warning("HTTP/2 is enabled but the 'h2' package is not installed, falling back to HTTP/1.1")
+            return False
+        return True
+
+
+# Общий реестр на процесс
+http_clients = HttpClientRegistry()
+
+
+def get_http_clients() -> HttpClientRegistry:
+    return http_clients
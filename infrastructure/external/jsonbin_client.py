@@ -2,6 +2,7 @@ import httpx
 from loguru import logger
 from config.settings import get_settings
 from domain.exceptions import ExternalServiceException
+from infrastructure.external.http_client import http_clients
 from tenacity import (
     retry,
     stop_after_attempt,
@@ -37,18 +38,19 @@ class JsonBinClient:
         }
 
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                # POST-запрос для создания новой записи
-                response = await client.post(
-                    self.base_url,
-                    json=data,
-                    headers=headers
-                )
-                response.raise_for_status() # Возбуждает исключение для 4xx/5xx
-                result = response.json()
+            client = http_clients.get(self.base_url)
+            # POST-запрос для создания новой записи
+            response = await client.post(
+                self.base_url,
+                json=data,
+                headers=headers,
+                timeout=self.timeout
+            )
+            response.raise_for_status() # Возбуждает исключение для 4xx/5xx
+            result = response.json()
 
-                logger.info(f"Data successfully saved to JSONBin with ID: {result.get('id')}")
-                return result
+            logger.info(f"Data successfully saved to JSONBin with ID: {result.get('id')}")
+            return result
 
         except httpx.TimeoutException as e:
             logger.error(f"Timeout while saving data to JSONBin: {e}")
@@ -0,0 +1,130 @@
+import asyncio
+import json
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+from loguru import logger
+from config.settings import get_settings
+from infrastructure.cache.redis_cache import get_cache_service
+
+settings = get_settings()
+
+
+def normalize_title(title: str) -> str:
+    """Нормализует название: регистр, юникод, пунктуация и лишние пробелы не влияют на ключ"""
+    title = unicodedata.normalize("NFKC", title).casefold()
+    title = re.sub(r"[^\w\s]", " ", title)
+    return " ".join(title.split())
+
+
+def normalize_isbn(isbn: str) -> str:
+    return re.sub(r"[^0-9X]", "", isbn.upper())
+
+
+def lookup_key(title: str, isbn: Optional[str] = None) -> str:
+    """ISBN однозначнее названия, поэтому при наличии ключ строится по нему"""
+    if isbn:
+        return f"isbn:{normalize_isbn(isbn)}"
+    return f"title:{normalize_title(title)}"
+
+
+class OpenLibraryLookupCache(ABC):
+    """
+    Кеш ответов OpenLibrary. Хранит и найденные книги, и пустые ответы
+    ("ничего не найдено") — у них отдельный, более короткий TTL.
+    """
+
+    @abstractmethod
+    async def get(self, key: str) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """Возвращает (найдено, ответ); ответ {} означает закешированное "нет результатов" """
+        pass
+
+    @abstractmethod
+    async def set(self, key: str, value: Dict[str, Any], ttl: int) -> None:
+        pass
+
+
+class RedisLookupCache(OpenLibraryLookupCache):
+    """Хранение в общем Redis приложения (если он доступен)"""
+
+    prefix = "openlibrary:"
+
+    async def get(self, key: str) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        cache = get_cache_service()
+        if cache is None:
+            return False, None
+        value = await cache.redis.get(self.prefix + key)
+        if value is None:
+            return False, None
+        return True, json.loads(value)
+
+    async def set(self, key: str, value: Dict[str, Any], ttl: int) -> None:
+        cache = get_cache_service()
+        if cache is not None:
+            await cache.redis.setex(self.prefix + key, ttl, json.dumps(value, default=str))
+
+
+class SqliteLookupCache(OpenLibraryLookupCache):
+    """Хранение в локальном файле SQLite — переживает перезапуски и не требует Redis"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+
+    async def get(self, key: str) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        return await asyncio.to_thread(self._get, key)
+
+    async def set(self, key: str, value: Dict[str, Any], ttl: int) -> None:
+        await asyncio.to_thread(self._set, key, value, ttl)
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS openlibrary_lookups ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+        return self._connection
+
+    def _get(self, key: str) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        with self._lock:
+            connection = self._connect()
+            row = connection.execute(
+                "SELECT value, expires_at FROM openlibrary_lookups WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return False, None
+            if row[1] <= time.time():
+                connection.execute("DELETE FROM openlibrary_lookups WHERE key = ?", (key,))
+                connection.commit()
+                return False, None
+            return True, json.loads(row[0])
+
+    def _set(self, key: str, value: Dict[str, Any], ttl: int) -> None:
+        with self._lock:
+            connection = self._connect()
+            connection.execute(
+                "INSERT OR REPLACE INTO openlibrary_lookups (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value, default=str), time.time() + ttl)
+            )
+            connection.commit()
+
+
+# --- Зависимость для DI ---
+@lru_cache()
+def get_openlibrary_lookup_cache() -> Optional[OpenLibraryLookupCache]:
+    backend = settings.openlibrary_cache_backend
+    if backend == "redis":
+        return RedisLookupCache()
+    if backend == "sqlite":
+        return SqliteLookupCache(settings.openlibrary_cache_path)
+    if backend != "none":
+        logger.warning(f"Unknown openlibrary_cache_backend '{backend}', lookup cache disabled")
+    return None
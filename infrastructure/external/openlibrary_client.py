@@ -1,7 +1,14 @@
 import httpx
+from typing import Optional
 from loguru import logger
 from config.settings import get_settings
 from domain.exceptions import ExternalServiceException
+from infrastructure.external.http_client import http_clients
+from infrastructure.external.openlibrary_cache import (
+    OpenLibraryLookupCache,
+    get_openlibrary_lookup_cache,
+    lookup_key,
+)
 from tenacity import (
     retry,
     stop_after_attempt,
@@ -13,9 +20,34 @@ settings = get_settings()
 
 
 class OpenLibraryClient:
-    def __init__(self):
+    def __init__(self, lookup_cache: Optional[OpenLibraryLookupCache] = None):
         self.base_url = settings.openlibrary_base_url
         self.timeout = settings.openlibrary_timeout
+        self.lookup_cache = lookup_cache if lookup_cache is not None else get_openlibrary_lookup_cache()
+
+    async def search(self, title: str, isbn: Optional[str] = None) -> dict:
+        """
+        Ищет информацию о книге по ISBN (если задан) или по названию.
+        Ответы, включая "ничего не найдено", кешируются по нормализованному ключу.
+        """
+        key = lookup_key(title, isbn)
+        if self.lookup_cache:
+            try:
+                found, cached = await self.lookup_cache.get(key)
+                if found:
+                    return cached
+            except Exception as e:
+                logger.warning(f"OpenLibrary lookup cache read failed for '{key}': {e}")
+
+        result = await self._search_remote(title, isbn)
+
+        if self.lookup_cache:
+            ttl = settings.openlibrary_cache_ttl if result else settings.openlibrary_negative_cache_ttl
+            try:
+                await self.lookup_cache.set(key, result, ttl)
+            except Exception as e:
+                logger.warning(f"OpenLibrary lookup cache write failed for '{key}': {e}")
+        return result
 
     @retry(
         stop=stop_after_attempt(3),
@@ -23,28 +55,28 @@ class OpenLibraryClient:
         retry=retry_if_exception_type((httpx.HTTPError, httpx.TimeoutException)),
         reraise=True
     )
-    async def search(self, title: str) -> dict:
+    async def _search_remote(self, title: str, isbn: Optional[str] = None) -> dict:
         """
-        Ищет информацию о книге по названию.
+        Запрос к OpenLibrary search API.
         Использует retry для повторных попыток при ошибках.
         """
         url = f"{self.base_url}/search.json"
-        params = {"title": title}
+        params = {"isbn": isbn} if isbn else {"title": title}
 
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(url, params=params)
-                response.raise_for_status()  # Возбуждает исключение для 4xx/5xx
-                data = response.json()
+            client = http_clients.get(self.base_url)
+            response = await client.get(url, params=params, timeout=self.timeout)
+            response.raise_for_status()  # Возбуждает исключение для 4xx/5xx
+            data = response.json()
 
-                # API OpenLibrary возвращает {"docs": [...]}
-                # Возвращаем первый результат или пустой словарь
-                docs = data.get("docs", [])
-                if docs:
-                    return docs[0]  # Возвращаем первую найденную книгу
-                else:
-                    logger.info(f"No results found for title: {title} on OpenLibrary")
-                    return {}  # Или можно бросить исключение, если результат обязателен
+            # API OpenLibrary возвращает {"docs": [...]}
+            # Возвращаем первый результат или пустой словарь
+            docs = data.get("docs", [])
+            if docs:
+                return docs[0]  # Возвращаем первую найденную книгу
+            else:
+                logger.info(f"No results found for title: {title} on OpenLibrary")
+                return {}  # Или можно бросить исключение, если результат обязателен
 
         except httpx.TimeoutException as e:
             logger.error(f"Timeout while searching for '{title}' on OpenLibrary: {e}")
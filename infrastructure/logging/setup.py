@@ -1,14 +1,32 @@
 import logging
 import sys
+import traceback
+import orjson
 from loguru import logger
+from infrastructure.logging.sinks import BackgroundWriter, DailyFile
 
+LOG_MODES = ("default", "fast")
 
-def setup_logging(environment: str, log_level: str):
-    """Setup structured logging"""
+
+def setup_logging(environment: str, log_level: str, mode: str = "default"):
+    """
+    Setup structured logging.
+    mode="fast" (production under load): sinks are queued and written by background
+    threads, records are single-line JSON, the previous day's file is compressed
+    in a separate thread; request logs are sampled by the middleware.
+    """
+    if mode not in LOG_MODES:
+        raise ValueError(f"Unknown log mode '{mode}', expected one of {', '.join(LOG_MODES)}")
 
     # Remove default handlers
     logger.remove()
 
+    if mode == "fast":
+        _setup_fast_sinks(log_level)
+        # Записи stdlib ниже уровня отбрасываются сразу, без перехода в loguru
+        logging.basicConfig(handlers=[InterceptHandler()], level=log_level, force=True)
+        return
+
     # Console logging
     logger.add(
         sys.stdout,
@@ -43,6 +61,35 @@ def setup_logging(environment: str, log_level: str):
     logging.basicConfig(handlers=[InterceptHandler()], level=0, force=True)
 
 
+def _setup_fast_sinks(log_level: str):
+    # Вызывающий код только кладёт готовую строку в очередь; запись, ротация и сжатие — в других потоках.
+    # enqueue=True loguru здесь не подходит: он сериализует (pickle) каждую запись в вызывающем потоке
+    logger.add(BackgroundWriter(sys.stdout, name="log-writer-stdout"), format=json_format, level=log_level, colorize=False)
+    logger.add(
+        BackgroundWriter(DailyFile("logs/app_{date}.json", retention_days=90), name="log-writer-file"),
+        format=json_format,
+        level=log_level,
+        colorize=False
+    )
+
+
+def json_format(record) -> str:
+    """Одна строка JSON на запись: время, уровень, сообщение, источник и все поля extra"""
+    # Запись общая для всех sink'ов — JSON строится один раз
+    if "_json" not in record["extra"]:
+        payload = {
+            "time": record["time"].isoformat(),
+            "level": record["level"].name,
+            "message": record["message"],
+            "logger": record["name"],
+            **record["extra"],
+        }
+        if record["exception"] is not None:
+            payload["exception"] = "".join(traceback.format_exception(*record["exception"]))
+        record["extra"]["_json"] = orjson.dumps(payload, default=str).decode()
+    return "{extra[_json]}\n"
+
+
 class InterceptHandler(logging.Handler):
     """Intercept standard logging and redirect to loguru"""
 
@@ -52,11 +99,12 @@ class InterceptHandler(logging.Handler):
         except ValueError:
             level = record.levelno
 
-        frame, depth = sys._getframe(6), 6
-        while frame and frame.f_code.co_filename == logging.__file__:
+        # Первый кадр за пределами модуля logging (после самого emit) — место вызова в исходном коде
+        frame, depth = logging.currentframe(), 0
+        while frame and (depth == 0 or frame.f_code.co_filename == logging.__file__):
             frame = frame.f_back
             depth += 1
 
         logger.opt(depth=depth, exception=record.exc_info).log(
             level, record.getMessage()
-        )
\ No newline at end of file
+        )
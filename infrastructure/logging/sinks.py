@@ -0,0 +1,136 @@
+import asyncio
+import glob
+import os
+import queue
+import sys
+import threading
+import time
+import zipfile
+from datetime import date
+from typing import List, Optional, TextIO, Union
+
+# Сколько строк писатель берёт из очереди за одну запись
+MAX_BATCH = 1000
+
+
+class BackgroundWriter:
+    """
+    Stream-like loguru sink: write() only puts the formatted line on an in-process
+    queue and a daemon thread writes batches to the target. Unlike enqueue=True the
+    record is not pickled and sent through a pipe, so the caller pays almost nothing.
+    """
+
+    def __init__(self, target: Union[TextIO, "DailyFile"], name: str = "log-writer"):
+        self._target = target
+        self._queue: "queue.SimpleQueue[Union[str, threading.Event, None]]" = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def write(self, message: str) -> None:
+        self._queue.put(message)
+
+    def stop(self) -> None:
+        """Вызывается loguru при logger.remove(): дописывает очередь и закрывает файл"""
+        self._queue.put(None)
+        self._thread.join()
+        if isinstance(self._target, DailyFile):
+            self._target.close()
+
+    async def complete(self) -> None:
+        """logger.complete(): ждёт, пока всё, что уже в очереди, будет записано"""
+        written = threading.Event()
+        self._queue.put(written)
+        await asyncio.to_thread(written.wait)
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            items = [self._queue.get()]
+            while len(items) < MAX_BATCH:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            lines: List[str] = [item for item in items if isinstance(item, str)]
+            if lines:
+                try:
+                    self._target.write("".join(lines))
+                    self._target.flush()
+                except (OSError, ValueError) as e:
+                    sys.__stderr__.write(f"Log sink write failed: {e}\n")
+            for item in items:
+                if isinstance(item, threading.Event):
+                    item.set()
+                elif item is None:
+                    stopping = True
+
+
+class DailyFile:
+    """
+    Log file per day (path_pattern with {date}). On the first write of a new day the
+    previous file is closed and zipped in a separate thread, archives older than
+    retention_days are removed.
+    """
+
+    def __init__(self, path_pattern: str, retention_days: int = 90):
+        self.path_pattern = path_pattern
+        self.retention_days = retention_days
+        self._date: Optional[date] = None
+        self._path: Optional[str] = None
+        self._file: Optional[TextIO] = None
+
+    def write(self, data: str) -> None:
+        today = date.today()
+        if today != self._date:
+            self._rotate(today)
+        self._file.write(data)
+
+    def flush(self) -> None:
+        if self._file is not None:
+            self._file.flush()
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _rotate(self, today: date) -> None:
+        previous = self._path
+        self.close()
+        self._date = today
+        self._path = self.path_pattern.format(date=today.isoformat())
+        os.makedirs(os.path.dirname(self._path) or ".", exist_ok=True)
+        self._file = open(self._path, "a", encoding="utf-8")
+        if previous is not None and previous != self._path:
+            compress_in_background(previous)
+            self._remove_expired()
+
+    def _remove_expired(self) -> None:
+        deadline = time.time() - self.retention_days * 24 * 3600
+        for path in glob.glob(self.path_pattern.format(date="*") + ".zip"):
+            try:
+                if os.path.getmtime(path) < deadline:
+                    os.remove(path)
+            except OSError:
+                pass
+
+
+def compress_in_background(path: str) -> None:
+    """Сжатие файла после ротации в отдельном потоке: запись логов не ждёт архиватор"""
+    threading.Thread(target=_zip_and_remove, args=(path,), name="log-compression", daemon=True).start()
+
+
+def _zip_and_remove(path: str) -> None:
+    # Архив пишется во временный файл: прерванное сжатие не оставит битый .zip вместо лога.
+    # Несколько воркеров пишут в один файл и сжимают его одновременно — кто первый, тот и сжал
+    partial = f"{path}.zip.{os.getpid()}.part"
+    try:
+        with zipfile.ZipFile(partial, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            archive.write(path, arcname=os.path.basename(path))
+        os.replace(partial, f"{path}.zip")
+        os.remove(path)
+    except FileNotFoundError:
+        if os.path.exists(partial):
+            os.remove(partial)
+    except OSError as e:
+        sys.__stderr__.write(f"Log compression failed for {path}: {e}\n")
@@ -0,0 +1,70 @@
+import os
+from typing import Tuple
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+# Несколько воркеров uvicorn: каждый пишет значения в файлы каталога PROMETHEUS_MULTIPROC_DIR,
+# а /metrics любого воркера собирает их вместе. Переменная должна быть задана до запуска
+# процесса, сам каталог очищается перед каждым стартом сервера
+MULTIPROCESS_DIR = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+
+DB_QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "HTTP requests being processed",
+    ["method"],
+    multiprocess_mode="livesum",
+)
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds",
+    "SQL statement execution time (cursor execute)",
+    ["database", "statement"],
+    buckets=DB_QUERY_BUCKETS,
+)
+DB_QUERY_ERRORS = Counter(
+    "db_query_errors",
+    "SQL statements that raised an error",
+    ["database", "statement"],
+)
+# Доля попаданий: sum(rate(cache_requests_total{result="hit"}[5m])) / sum(rate(cache_requests_total[5m]))
+CACHE_REQUESTS = Counter(
+    "cache_requests",
+    "Cache lookups by tier (l1 - in-process, l2 - Redis) and result",
+    ["tier", "result"],
+)
+HTTP_CLIENT_REQUEST_DURATION = Histogram(
+    "http_client_request_duration_seconds",
+    "Outgoing HTTP call latency (until response headers) per upstream",
+    ["upstream", "method", "status"],
+)
+
+
+def render_latest() -> Tuple[bytes, str]:
+    """Текст для /metrics и его Content-Type; в режиме multiprocess — по всем воркерам"""
+    if MULTIPROCESS_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead() -> None:
+    """При остановке воркера: его livesum-гауги (запросы в обработке) больше не учитываются"""
+    if MULTIPROCESS_DIR:
+        multiprocess.mark_process_dead(os.getpid())
@@ -0,0 +1,74 @@
+from collections import Counter
+from contextvars import ContextVar, Token
+from typing import Dict, List, Optional, Tuple
+
+# Части профиля: (имя в Server-Timing, описание)
+PHASES = (
+    ("db", "SQL"),
+    ("cache", "Cache lookups"),
+    ("http", "External HTTP"),
+    ("serialize", "Serialization"),
+)
+
+
+class RequestProfile:
+    """
+    Where the time of one request went: SQL statements, cache lookups,
+    external HTTP calls and response serialization (count and total seconds each).
+    Lives in a ContextVar, so instrumentation anywhere down the call stack adds to it.
+    """
+
+    def __init__(self):
+        self.counts: Dict[str, int] = {name: 0 for name, _ in PHASES}
+        self.seconds: Dict[str, float] = {name: 0.0 for name, _ in PHASES}
+        self.statements: Counter = Counter()
+
+    def add(self, phase: str, seconds: float) -> None:
+        self.counts[phase] += 1
+        self.seconds[phase] += seconds
+
+    def add_query(self, statement: str, seconds: float) -> None:
+        self.add("db", seconds)
+        self.statements[statement] += 1
+
+    @property
+    def queries(self) -> int:
+        return self.counts["db"]
+
+    def most_repeated(self) -> Tuple[Optional[str], int]:
+        """Самый частый запрос и сколько раз он выполнен (признак N+1)"""
+        if not self.statements:
+            return None, 0
+        return self.statements.most_common(1)[0]
+
+    def server_timing(self, total: float) -> str:
+        """Значение заголовка Server-Timing, длительности в миллисекундах"""
+        parts: List[str] = []
+        for name, description in PHASES:
+            if self.counts[name]:
+                parts.append(f'{name};dur={self.seconds[name] * 1000:.1f};desc="{description} x{self.counts[name]}"')
+        parts.append(f"total;dur={total * 1000:.1f}")
+        return ", ".join(parts)
+
+
+_profile: ContextVar[Optional[RequestProfile]] = ContextVar("request_profile", default=None)
+
+
+def start_profile() -> Tuple[RequestProfile, Token]:
+    profile = RequestProfile()
+    return profile, _profile.set(profile)
+
+
+def stop_profile(token: Token) -> None:
+    _profile.reset(token)
+
+
+def current_profile() -> Optional[RequestProfile]:
+    """Профиль текущего запроса; None вне запроса (фоновые задачи, lifespan)"""
+    return _profile.get()
+
+
+def record(phase: str, seconds: float) -> None:
+    profile = _profile.get()
+    if profile is not None:
+        profile.add(phase, seconds)
@@ -0,0 +1,210 @@
+import asyncio
+import math
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from loguru import logger
+from redis.asyncio import Redis
+
+
+class RateLimit:
+    """requests per period seconds"""
+
+    __slots__ = ("requests", "period")
+
+    def __init__(self, requests: int, period: float):
+        self.requests = requests
+        self.period = period
+
+    @classmethod
+    def parse(cls, value: str) -> "RateLimit":
+        """Разбирает строку вида "100/60" (100 запросов за 60 секунд)"""
+        try:
+            requests, period = value.split("/")
+            limit = cls(int(requests), float(period))
+        except ValueError:
+            raise ValueError(f"Invalid rate limit '{value}', expected '<requests>/<seconds>'")
+        if limit.requests <= 0 or limit.period <= 0:
+            raise ValueError(f"Invalid rate limit '{value}': both numbers must be positive")
+        return limit
+
+    def __str__(self) -> str:
+        return f"{self.requests}/{self.period:g}"
+
+
+class _Counter:
+    """Counts of one key per fixed window: global as of the last sync plus local, not yet synced"""
+
+    __slots__ = ("limit", "synced", "pending")
+
+    def __init__(self, limit: RateLimit):
+        self.limit = limit
+        self.synced: Dict[int, int] = {}
+        self.pending: Dict[int, int] = {}
+
+    def count(self, window: int) -> int:
+        return self.synced.get(window, 0) + self.pending.get(window, 0)
+
+    def retry_after(self, now: float) -> float:
+        """0.0, если ещё один запрос укладывается в лимит, иначе через сколько секунд уложится"""
+        limit = self.limit
+        window, elapsed = divmod(now, limit.period)
+        window, fraction = int(window), elapsed / limit.period
+        previous, current = self.count(window - 1), self.count(window)
+        # Скользящее окно: предыдущее фиксированное окно учитывается с весом своей доли в нём
+        if previous * (1 - fraction) + current + 1 <= limit.requests:
+            return 0.0
+        free = limit.requests - current - 1
+        if free >= 0:
+            # Место появится, когда вес предыдущего окна упадёт до free
+            return (1 - free / previous - fraction) * limit.period
+        # Текущее окно исчерпано: ждать следующего, а в нём — пока не ослабнет вес этого
+        return ((1 - fraction) + max(0.0, 1 - (limit.requests - 1) / current)) * limit.period
+
+
+class RateLimiter:
+    """
+    Sliding-window rate limiter (weighted previous + current fixed window) with
+    in-process counters. hit() never waits on Redis: requests are counted locally
+    and every sync_interval one pipeline pushes the increments of all keys and
+    reads back their global counts. Between syncs a worker sees the traffic of other
+    workers as of the last sync, so a limit can be overshot by what the others admit
+    within one sync_interval. Without Redis the limits are per worker.
+    """
+
+    def __init__(self, redis: Optional[Redis] = None, sync_interval: float = 1.0, prefix: str = "rl"):
+        self.redis = redis
+        self.sync_interval = sync_interval
+        self.prefix = prefix
+        self.allowed = 0
+        self.rejected = 0
+        self.sync_errors = 0
+        self._counters: Dict[str, _Counter] = {}
+        self._failing = False
+        self._task: Optional[asyncio.Task] = None
+
+    def hit(self, keys: Sequence[str], limit: RateLimit, now: Optional[float] = None) -> float:
+        """
+        Counts a request against every key (e.g. client IP and API key) if all of them
+        have room. Returns 0.0 when allowed, otherwise seconds to wait (Retry-After).
+        """
+        now = time.time() if now is None else now
+        counters = []
+        wait = 0.0
+        for key in keys:
+            counter = self._counters.get(key)
+            if counter is None:
+                counter = self._counters[key] = _Counter(limit)
+            counters.append(counter)
+            wait = max(wait, counter.retry_after(now))
+        if wait > 0:
+            self.rejected += 1
+            return wait
+
+        self.allowed += 1
+        for counter in counters:
+            window = int(now // counter.limit.period)
+            counter.pending[window] = counter.pending.get(window, 0) + 1
+        return 0.0
+
+    async def sync(self) -> None:
+        """Отправляет накопленные счётчики в Redis и забирает глобальные; забывает неактивные ключи"""
+        now = time.time()
+        active: List[Tuple[str, _Counter, Dict[int, int]]] = []
+        for key, counter in list(self._counters.items()):
+            window = int(now // counter.limit.period)
+            # Окна старше предыдущего на лимит уже не влияют (и в Redis истекают по TTL)
+            counter.synced = {w: n for w, n in counter.synced.items() if w >= window - 1}
+            counter.pending = {w: n for w, n in counter.pending.items() if w >= window - 1}
+            if not counter.synced and not counter.pending:
+                del self._counters[key]
+            elif self.redis is not None:
+                # То, что насчитают во время синхронизации, попадёт в новый pending
+                active.append((key, counter, counter.pending))
+                counter.pending = {}
+        if not active:
+            return
+
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                names = []
+                for key, counter, pending in active:
+                    ttl = math.ceil(counter.limit.period * 2) + 1
+                    for window, count in pending.items():
+                        pipe.incrby(f"{self.prefix}:{key}:{window}", count)
+                        pipe.expire(f"{self.prefix}:{key}:{window}", ttl)
+                    window = int(now // counter.limit.period)
+                    names += [f"{self.prefix}:{key}:{window - 1}", f"{self.prefix}:{key}:{window}"]
+                pipe.mget(names)
+                results = await pipe.execute()
+        except Exception as e:
+            # Неотправленное возвращается в pending: уйдёт при следующей синхронизации
+            for _, counter, pending in active:
+                for window, count in pending.items():
+                    counter.pending[window] = counter.pending.get(window, 0) + count
+            self.sync_errors += 1
+            if not self._failing:
+                logger.warning(f"Rate limiter sync with Redis failed, limits are per worker until it recovers: {e}")
+            self._failing = True
+            return
+
+        if self._failing:
+            logger.info("Rate limiter sync with Redis recovered")
+            self._failing = False
+        values = iter(results[-1])
+        for _, counter, _ in active:
+            window = int(now // counter.limit.period)
+            previous, current = next(values), next(values)
+            counter.synced = {window - 1: int(previous or 0), window: int(current or 0)}
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="rate-limiter-sync")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+            await self.sync()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            try:
+                await self.sync()
+            except Exception as e:
+                logger.warning(f"Rate limiter sync failed: {e}")
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "keys": len(self._counters),
+            "allowed": self.allowed,
+            "rejected": self.rejected,
+            "sync_errors": self.sync_errors,
+            "distributed": self.redis is not None,
+        }
+
+
+# --- Лимитер на процесс (создаётся в lifespan) ---
+
+_rate_limiter: Optional[RateLimiter] = None
+
+
+async def init_rate_limiter(redis: Optional[Redis] = None, sync_interval: float = 1.0) -> RateLimiter:
+    """Without Redis (cache disabled) every worker enforces the limits on its own"""
+    global _rate_limiter
+    _rate_limiter = RateLimiter(redis=redis, sync_interval=sync_interval)
+    await _rate_limiter.start()
+    return _rate_limiter
+
+
+async def close_rate_limiter() -> None:
+    global _rate_limiter
+    if _rate_limiter is not None:
+        await _rate_limiter.stop()
+        _rate_limiter = None
+
+
+def get_rate_limiter() -> Optional[RateLimiter]:
+    return _rate_limiter
@@ -0,0 +1,91 @@
+from typing import Any, List, Optional
+
+from sqlalchemy import ColumnElement, Select, and_, func, or_, select
+from domain.entities.book import Book, CodePointOrder
+
+
+# Колонки сортировки для keyset-пагинации. Порядок всегда (колонка, book_id),
+# book_id — уникальный тай-брейкер, поэтому позиция курсора однозначна.
+# Строки сравниваются по кодам символов, как в индексе в памяти: курсор, выданный
+# одним путём, продолжает список на другом без пропусков и повторов
+SORT_COLUMNS = {
+    'book_id': Book.book_id,
+    'title': CodePointOrder(Book.title),
+    'author': CodePointOrder(Book.author),
+    'year_publication': Book.year_publication,
+}
+
+
+def filter_conditions(filters: dict) -> List[ColumnElement[bool]]:
+    """
+    Условия фильтрации в виде, пригодном для индексов: голая колонка слева,
+    константа справа (=, IN, >=, <=), без функций и выражений над колонкой.
+    Фильтры со значением None не применяются.
+    """
+    conditions = []
+    if filters.get('author') is not None:
+        conditions.append(Book.author == filters['author'])
+    genres = sorted(set(filters.get('genre') or ()))
+    if len(genres) == 1:
+        conditions.append(Book.genre == genres[0])
+    elif genres:
+        conditions.append(Book.genre.in_(genres))
+    if filters.get('year_publication') is not None:
+        conditions.append(Book.year_publication == filters['year_publication'])
+    if filters.get('year_from') is not None:
+        conditions.append(Book.year_publication >= filters['year_from'])
+    if filters.get('year_to') is not None:
+        conditions.append(Book.year_publication <= filters['year_to'])
+    if filters.get('pages_min') is not None:
+        conditions.append(Book.number_pages >= filters['pages_min'])
+    if filters.get('pages_max') is not None:
+        conditions.append(Book.number_pages <= filters['pages_max'])
+    if filters.get('accessibility') is not None:
+        conditions.append(Book.accessibility == filters['accessibility'])
+    return conditions
+
+
+def apply_filters(query: Select, filters: dict) -> Select:
+    """Добавляет к запросу условия фильтрации"""
+    conditions = filter_conditions(filters)
+    return query.where(*conditions) if conditions else query
+
+
+def apply_keyset(query: Select, sort: str, order: str, after: Optional[List[Any]]) -> Select:
+    """Условие "после курсора" и порядок (колонка, book_id) в нужном направлении"""
+    column = SORT_COLUMNS[sort]
+    descending = order == 'desc'
+
+    if after is not None:
+        last_value, last_id = after
+        if column is Book.book_id:
+            query = query.where(Book.book_id < last_id if descending else Book.book_id > last_id)
+        elif descending:
+            query = query.where(
+                column <= last_value,
+                or_(column < last_value, and_(column == last_value, Book.book_id < last_id))
+            )
+        else:
+            # "column >= x" попадает в условие индекса, уточнение по book_id проверяется уже фильтром
+            query = query.where(
+                column >= last_value,
+                or_(column > last_value, and_(column == last_value, Book.book_id > last_id))
+            )
+
+    columns = [Book.book_id] if column is Book.book_id else [column, Book.book_id]
+    return query.order_by(*(c.desc() if descending else c for c in columns))
+
+
+def page_query(
+        filters: dict,
+        sort: str = 'book_id',
+        order: str = 'asc',
+        after: Optional[List[Any]] = None,
+        limit: int = 20
+) -> Select:
+    """Запрос страницы списка книг (keyset-пагинация)"""
+    return apply_keyset(apply_filters(select(Book), filters), sort, order, after).limit(limit)
+
+
+def count_query(filters: dict) -> Select:
+    return apply_filters(select(func.count()).select_from(Book), filters)
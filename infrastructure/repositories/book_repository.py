@@ -1,14 +1,45 @@
-from typing import Optional, List
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Optional, List, Tuple
 
 from fastapi import Depends
-from sqlalchemy import select
+from sqlalchemy import delete, func, insert, literal, literal_column, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from domain.repositories.book_repository import IBookRepository
-from domain.entities.book import Book
+from domain.entities.book import Book, BookFacetCount, CatalogVersion, SEARCH_VECTOR_COLUMN
 from domain.schemas.book import BookCreate
+from infrastructure.database.session import async_session_maker
+from infrastructure.repositories.book_query import apply_filters, count_query, page_query
 from presentation.api.dependencies import get_db
 
 
+# Колонка search_vector создаётся миграцией (GENERATED ... STORED) и в модели не описана
+SEARCH_VECTOR = literal_column(f"books.{SEARCH_VECTOR_COLUMN}")
+SEARCH_CONFIG = literal_column("'simple'::regconfig")
+HEADLINE_OPTIONS = "StartSel=<mark>, StopSel=</mark>, MaxWords=35, MinWords=15, MaxFragments=2"
+
+# Колонки подсказок; для каждой миграцией созданы trigram GIN-индекс
+# и индекс lower(колонка) COLLATE "C" для поиска по префиксу
+SUGGEST_COLUMNS = {
+    'title': Book.title,
+    'author': Book.author,
+}
+
+# Фасеты каталога: имя -> выражение над books
+FACET_COLUMNS = {
+    'genre': Book.genre,
+    'decade': Book.year_publication.op('/')(literal_column('10')) * literal_column('10'),
+    'accessibility': Book.accessibility,
+}
+
+
+def prefix_range(prefix: str) -> Tuple[str, str]:
+    """Границы [low, high) строк с префиксом prefix в порядке "C" (по кодам символов)"""
+    low = prefix.lower()
+    high = low[:-1] + chr(min(ord(low[-1]) + 1, 0x10FFFF))
+    return low, high
+
+
 class BookRepository(IBookRepository):
     def __init__(self, session: AsyncSession):
         self.session = session
@@ -19,47 +50,274 @@ class BookRepository(IBookRepository):
         )
         return result.scalar_one_or_none()
 
-    async def get_all(self, filters: dict) -> List[Book]:
-        query = select(Book)
+    async def get_by_ids(self, book_ids: List[int]) -> List[Book]:
+        if not book_ids:
+            return []
+        result = await self.session.execute(
+            select(Book).where(Book.book_id.in_(book_ids)).order_by(Book.book_id)
+        )
+        return result.scalars().all()
 
-        if filters.get('author'):
-            query = query.where(Book.author == filters['author'])
-        if filters.get('genre'):
-            query = query.where(Book.genre == filters['genre'])
-        if filters.get('year_publication'):
-            query = query.where(Book.year_publication == filters['year_publication'])
+    async def get_catalog_version(self) -> Optional[Tuple[int, datetime]]:
+        result = await self.session.execute(
+            select(func.sum(CatalogVersion.version), func.max(CatalogVersion.updated_at))
+        )
+        version, updated_at = result.one()
+        return (int(version), updated_at) if version is not None else None
 
+    async def get_all(self, filters: dict) -> List[Book]:
+        query = apply_filters(select(Book), filters)
         result = await self.session.execute(query)
         return result.scalars().all()
 
+    async def get_page(
+            self,
+            filters: dict,
+            sort: str,
+            after: Optional[List[Any]],
+            limit: int,
+            order: str = 'asc'
+    ) -> List[Book]:
+        result = await self.session.execute(page_query(filters, sort, order, after, limit))
+        return result.scalars().all()
+
+    async def stream_all(self, filters: dict, chunk_size: int) -> AsyncIterator[List[Book]]:
+        query = apply_filters(select(Book), filters).order_by(Book.book_id)
+        result = await self.session.stream_scalars(
+            query.execution_options(yield_per=chunk_size)
+        )
+        async for partition in result.partitions(chunk_size):
+            yield partition
+            # Не копим объекты в identity map — память не растёт вместе с таблицей
+            self.session.expunge_all()
+
+    async def search(
+            self,
+            query: str,
+            offset: int,
+            limit: int
+    ) -> Tuple[List[Tuple[Book, float, Optional[str]]], int]:
+        ts_query = func.websearch_to_tsquery(SEARCH_CONFIG, query)
+        match = SEARCH_VECTOR.op('@@')(ts_query)
+        rank = func.ts_rank_cd(SEARCH_VECTOR, ts_query)
+
+        # Сначала ранжируем и отрезаем страницу по GIN-индексу,
+        # дорогой ts_headline считаем только для строк этой страницы
+        ranked = (
+            select(Book.book_id, rank.label('rank'))
+            .where(match)
+            .order_by(rank.desc(), Book.book_id)
+            .offset(offset)
+            .limit(limit)
+            .subquery()
+        )
+        headline = func.ts_headline(
+            SEARCH_CONFIG,
+            func.concat_ws(' — ', Book.title, Book.author, Book.description),
+            ts_query,
+            HEADLINE_OPTIONS
+        )
+        result = await self.session.execute(
+            select(Book, ranked.c.rank, headline)
+            .join(ranked, Book.book_id == ranked.c.book_id)
+            .order_by(ranked.c.rank.desc(), Book.book_id)
+        )
+        hits = [(book, float(book_rank), highlight) for book, book_rank, highlight in result.all()]
+
+        total = await self.session.execute(select(func.count()).select_from(Book).where(match))
+        return hits, total.scalar_one()
+
+    async def autocomplete(self, field: str, prefix: str, limit: int) -> List[Dict[str, Any]]:
+        column = SUGGEST_COLUMNS[field]
+        key = func.lower(column).collate('C')
+        low, high = prefix_range(prefix)
+        score = func.similarity(column, prefix).label('score')
+
+        # Диапазонный скан индекса в его же порядке + LIMIT: читаются только первые строки.
+        # Короткие дополнения идут раньше длинных ("harry" < "harry potter").
+        if field == 'author':
+            query = (
+                select(column, score)
+                .where(key >= low, key < high)
+                .distinct(key)
+                .order_by(key)
+                .limit(limit)
+            )
+        else:
+            query = (
+                select(column, score, Book.book_id, Book.author)
+                .where(key >= low, key < high)
+                .order_by(key, Book.book_id)
+                .limit(limit)
+            )
+        result = await self.session.execute(query)
+        return [self._suggestion(field, row) for row in result.all()]
+
+    async def fuzzy_search(
+            self,
+            field: str,
+            query: str,
+            limit: int,
+            threshold: float
+    ) -> List[Dict[str, Any]]:
+        column = SUGGEST_COLUMNS[field]
+        # Порог оператора <% задаётся только на текущую транзакцию
+        await self.session.execute(
+            select(func.set_config('pg_trgm.word_similarity_threshold', str(threshold), True))
+        )
+        match = literal(query).op('<%')(column)
+        similarity = func.word_similarity(query, column)
+
+        if field == 'author':
+            score = func.max(similarity).label('score')
+            statement = (
+                select(column, score)
+                .where(match)
+                .group_by(column)
+                .order_by(score.desc(), column)
+                .limit(limit)
+            )
+        else:
+            score = similarity.label('score')
+            statement = (
+                select(column, score, Book.book_id, Book.author)
+                .where(match)
+                .order_by(score.desc(), Book.book_id)
+                .limit(limit)
+            )
+        result = await self.session.execute(statement)
+        return [self._suggestion(field, row) for row in result.all()]
+
+    @staticmethod
+    def _suggestion(field: str, row: Any) -> Dict[str, Any]:
+        suggestion = {'value': row[0], 'score': round(float(row[1]), 4)}
+        if field == 'title':
+            suggestion.update(book_id=row[2], author=row[3])
+        return suggestion
+
+    async def get_facets(self, filters: dict) -> Dict[str, Dict[Any, int]]:
+        facets = {facet: {} for facet in FACET_COLUMNS}
+        postgres = self.session.get_bind().dialect.name == 'postgresql'
+        if postgres and all(value is None for value in filters.values()):
+            # Без фильтров — готовые счётчики (сумма по шардам), их размер не зависит от размера каталога
+            total = func.sum(BookFacetCount.count)
+            result = await self.session.execute(
+                select(BookFacetCount.facet, BookFacetCount.value, total)
+                .group_by(BookFacetCount.facet, BookFacetCount.value)
+                .having(total > 0)
+            )
+            for facet, value, count in result.all():
+                facets[facet][self._facet_value(facet, value)] = count
+            if facets['accessibility']:
+                return facets
+            # Счётчиков нет: каталог пуст или схема без триггеров (create_all) — считаем по books
+
+        columns = list(FACET_COLUMNS.values())
+        if not postgres:
+            # Без GROUPING SETS (SQLite) — группы по всем фасетам сразу, суммы по каждому в Python;
+            # групп не больше, чем сочетаний жанра, десятилетия и доступности
+            result = await self.session.execute(
+                apply_filters(select(*columns, func.count()), filters).group_by(*columns)
+            )
+            for *values, count in result.all():
+                for facet, value in zip(FACET_COLUMNS, values):
+                    facets[facet][value] = facets[facet].get(value, 0) + count
+            return facets
+
+        # Один проход по подходящим строкам, все фасеты через GROUPING SETS
+        query = apply_filters(select(*columns, func.count()), filters).group_by(func.grouping_sets(*columns))
+        result = await self.session.execute(query)
+        for *values, count in result.all():
+            # Колонки фасетов NOT NULL, так что NULL означает "не эта группировка"
+            for facet, value in zip(FACET_COLUMNS, values):
+                if value is not None:
+                    facets[facet][value] = count
+        return facets
+
+    @staticmethod
+    def _facet_value(facet: str, value: str) -> Any:
+        if facet == 'decade':
+            return int(value)
+        if facet == 'accessibility':
+            return value == 'true'
+        return value
+
+    async def count(self, filters: dict) -> int:
+        result = await self.session.execute(count_query(filters))
+        return result.scalar_one()
+
+    # Запись — один запрос: INSERT/UPDATE/DELETE ... RETURNING сразу отдаёт итоговую строку
+    # (со значениями по умолчанию и onupdate), без предварительного SELECT и refresh.
+    # populate_existing: загруженная ранее в сессию книга обновляется из RETURNING
     async def create(self, book_data: BookCreate) -> Book:
-        db_book = Book(**book_data.model_dump())
-        self.session.add(db_book)
-        await self.session.flush()
-        await self.session.refresh(db_book)
-        return db_book
+        result = await self.session.scalars(
+            insert(Book).values(**book_data.model_dump()).returning(Book),
+            execution_options={"populate_existing": True}
+        )
+        return result.one()
+
+    async def create_many(self, books_data: List[BookCreate]) -> List[Book]:
+        if not books_data:
+            return []
+        # Многострочный INSERT ... RETURNING в собственном SAVEPOINT:
+        # нарушение ограничения откатывает только этот пакет, а не всю транзакцию
+        async with self.session.begin_nested():
+            result = await self.session.scalars(
+                insert(Book).returning(Book, sort_by_parameter_order=True),
+                [book_data.model_dump() for book_data in books_data]
+            )
+            return result.all()
+
+    async def get_existing_isbns(self, isbns: List[str]) -> set:
+        if not isbns:
+            return set()
+        result = await self.session.execute(
+            select(Book.isbn).where(Book.isbn.in_(isbns))
+        )
+        return set(result.scalars().all())
 
     async def update(self, book_id: int, book_data: BookCreate) -> Book:
-        book = await self.get_by_id(book_id)
+        result = await self.session.scalars(
+            update(Book)
+            .where(Book.book_id == book_id)
+            .values(**book_data.model_dump(exclude_unset=True))
+            .returning(Book),
+            execution_options={"synchronize_session": False, "populate_existing": True}
+        )
+        book = result.one_or_none()
         if not book:
             raise ValueError(f"Book with id {book_id} not found")
-
-        for key, value in book_data.model_dump(exclude_unset=True).items():
-            setattr(book, key, value)
-
-        await self.session.flush()
-        await self.session.refresh(book)
         return book
 
+    async def update_enrichment(self, book_id: int, data: dict) -> bool:
+        result = await self.session.execute(
+            update(Book)
+            .where(Book.book_id == book_id)
+            .values(**data)
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount > 0
+
     async def delete(self, book_id: int) -> Book:
-        book = await self.get_by_id(book_id)
+        result = await self.session.scalars(
+            delete(Book).where(Book.book_id == book_id).returning(Book),
+            execution_options={"synchronize_session": False, "populate_existing": True}
+        )
+        book = result.one_or_none()
         if not book:
             raise ValueError(f"Book with id {book_id} not found")
-
-        await self.session.delete(book)
-        await self.session.flush()
         return book
 
+    async def commit(self) -> None:
+        await self.session.commit()
+
 
 def get_book_repository(session: AsyncSession = Depends(get_db)) -> IBookRepository:
-    return BookRepository(session)
\ No newline at end of file
+    return BookRepository(session)
+
+
+@asynccontextmanager
+async def open_book_repository() -> AsyncIterator[IBookRepository]:
+    """Репозиторий на собственной сессии — для фоновой работы вне запроса"""
+    async with async_session_maker() as session:
+        yield BookRepository(session)
\ No newline at end of file
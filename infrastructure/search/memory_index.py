@@ -0,0 +1,539 @@
+import asyncio
+import bisect
+import heapq
+import itertools
+import json
+import operator
+import re
+import sys
+import time
+import uuid
+from array import array
+from datetime import datetime
+from typing import Any, AsyncContextManager, Callable, Dict, Iterable, List, Optional, Set, Tuple
+from loguru import logger
+from redis.asyncio import Redis
+from domain.repositories.book_repository import IBookRepository
+from domain.schemas.book import BookResponse
+
+TOKEN_RE = re.compile(r"\w+")
+QUERY_TERM_RE = re.compile(r'(-?)("[^"]*"|\S+)')
+
+# Веса полей как у ts_rank для setweight A/B/C в search_vector
+FIELD_WEIGHTS = {'title': 1.0, 'author': 0.4, 'description': 0.2}
+SORT_FIELDS = ('book_id', 'title', 'author', 'year_publication')
+FILTER_FIELDS = ('author', 'genre', 'year_publication')
+# Фильтры, которые проверяются по самой записи: (параметр, атрибут книги, сравнение)
+RECORD_FILTERS = (
+    ('year_from', 'year_publication', operator.ge),
+    ('year_to', 'year_publication', operator.le),
+    ('pages_min', 'number_pages', operator.ge),
+    ('pages_max', 'number_pages', operator.le),
+    ('accessibility', 'accessibility', operator.eq),
+)
+HIGHLIGHT_MAX_WORDS = 35
+# Если кандидатов после фильтров меньше 1/8 каталога, сортируем их, иначе идём по готовому порядку
+CANDIDATE_SORT_RATIO = 8
+MEMORY_SAMPLE_SIZE = 1000
+
+EMPTY = array('I')
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Токены как у конфигурации 'simple': слова в нижнем регистре без стемминга"""
+    return TOKEN_RE.findall(text.casefold()) if text else []
+
+
+class IndexedBook:
+    """Книга в индексе: поля BookResponse в __slots__, без __dict__ на каждую запись"""
+
+    __slots__ = tuple(BookResponse.model_fields)
+
+    def __init__(self, book: BookResponse):
+        for name in self.__slots__:
+            setattr(self, name, getattr(book, name))
+        # Авторы и жанры повторяются — храним одну копию строки
+        self.author = sys.intern(self.author)
+        self.genre = sys.intern(self.genre)
+        if self.subjects is not None:
+            self.subjects = tuple(self.subjects)
+
+
+def _add(postings: Dict[Any, array], key: Any, book_id: int) -> None:
+    ids = postings.get(key)
+    if ids is None:
+        postings[key] = array('I', (book_id,))
+        return
+    position = bisect.bisect_left(ids, book_id)
+    if position == len(ids) or ids[position] != book_id:
+        ids.insert(position, book_id)
+
+
+def _discard(postings: Dict[Any, array], key: Any, book_id: int) -> None:
+    ids = postings.get(key)
+    if ids is None:
+        return
+    position = bisect.bisect_left(ids, book_id)
+    if position < len(ids) and ids[position] == book_id:
+        del ids[position]
+        if not ids:
+            del postings[key]
+
+
+class MemoryIndex:
+    """
+    In-process catalog index for read-heavy workers.
+
+    Records live in a dict of __slots__ objects; every secondary structure is a
+    sorted array('I') of book ids: token postings per field, author/genre/year
+    maps and one keyset order per sort field. ISBNs are kept in a sorted list
+    with a parallel id array. The index is built from a streamed scan of books,
+    then kept current from BookService writes, which are applied locally and
+    broadcast to other workers over Redis pub/sub once committed. A failed
+    build is retried in the background every retry_interval seconds.
+
+    get_page/count/search mirror the repository signatures and filters, so
+    BookService serves reads through the same code path as for the database.
+    """
+
+    channel = "books:index"
+
+    def __init__(
+            self,
+            repository_factory: Callable[[], AsyncContextManager[IBookRepository]],
+            redis: Optional[Redis] = None,
+            chunk_size: int = 5000,
+            retry_interval: float = 30.0
+    ):
+        self.repository_factory = repository_factory
+        self.redis = redis
+        self.chunk_size = chunk_size
+        self.retry_interval = retry_interval
+        self.instance_id = uuid.uuid4().hex
+        self.ready = False
+        self.built_at: Optional[datetime] = None
+        self.build_seconds = 0.0
+        self.updates = 0
+        # Время последнего изменения содержимого — Last-Modified списков из индекса
+        self.changed_at: Optional[datetime] = None
+        self._pending: Optional[List[Tuple[List[BookResponse], List[int]]]] = None
+        self._listener: Optional[asyncio.Task] = None
+        self._retry: Optional[asyncio.Task] = None
+        self._subscribed = asyncio.Event()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._books: Dict[int, IndexedBook] = {}
+        self._order: Dict[str, array] = {field: array('I') for field in SORT_FIELDS}
+        self._tokens: Dict[str, Dict[str, array]] = {field: {} for field in FIELD_WEIGHTS}
+        self._filters: Dict[str, Dict[Any, array]] = {field: {} for field in FILTER_FIELDS}
+        self._isbns: List[str] = []
+        self._isbn_ids = array('I')
+
+    # --- Построение и обновление ---
+
+    async def build(self) -> None:
+        """Полная перестройка потоковым чтением таблицы; пока идёт, чтения обслуживает БД"""
+        started = time.perf_counter()
+        self.ready = False
+        self._pending = []
+        try:
+            self._reset()
+            async with self.repository_factory() as repository:
+                async for chunk in repository.stream_all({}, self.chunk_size):
+                    for book in chunk:
+                        record = IndexedBook(BookResponse.from_row(book))
+                        self._books[record.book_id] = record
+                        self._index_terms(record)
+            self._sort_all()
+        finally:
+            # Изменения, пришедшие во время сканирования, новее прочитанных строк
+            pending, self._pending = self._pending, None
+        for upsert, delete in pending:
+            self._apply(upsert, delete)
+
+        self.ready = True
+        self.built_at = self.changed_at = datetime.utcnow()
+        self.build_seconds = time.perf_counter() - started
+        logger.info(f"Memory index built: {len(self._books)} books in {self.build_seconds:.2f}s")
+
+    def schedule_rebuild(self) -> None:
+        """Повторяет перестройку в фоне, пока она не удастся; до тех пор чтения обслуживает БД"""
+        if self._retry is None or self._retry.done():
+            self._retry = asyncio.create_task(self._rebuild_until_ready(), name="memory-index-rebuild")
+
+    async def _rebuild_until_ready(self) -> None:
+        while not self.ready:
+            await asyncio.sleep(self.retry_interval)
+            try:
+                await self.build()
+            except Exception as e:
+                logger.warning(f"Memory index rebuild failed, retrying in {self.retry_interval:g}s: {e}")
+
+    async def apply(self, upsert: Iterable[BookResponse] = (), delete: Iterable[int] = ()) -> None:
+        """
+        Применяет изменения локально и рассылает их остальным воркерам.
+        Вызывается только после коммита: откат не отменил бы уже разосланное.
+        """
+        upsert, delete = list(upsert), list(delete)
+        if not upsert and not delete:
+            return
+        self._apply(upsert, delete)
+        await self._publish(upsert, delete)
+
+    async def refresh(self, book_ids: List[int]) -> None:
+        """Перечитывает книги из БД (например, после фонового обогащения)"""
+        if not book_ids:
+            return
+        async with self.repository_factory() as repository:
+            books = [BookResponse.from_row(book) for book in await repository.get_by_ids(book_ids)]
+        found = {book.book_id for book in books}
+        await self.apply(upsert=books, delete=[book_id for book_id in book_ids if book_id not in found])
+
+    def _apply(self, upsert: List[BookResponse], delete: List[int]) -> None:
+        if self._pending is not None:
+            self._pending.append((upsert, delete))
+            return
+        for book in upsert:
+            self._remove(book.book_id)
+            record = IndexedBook(book)
+            self._books[record.book_id] = record
+            self._index_terms(record)
+            self._index_sorted(record)
+        for book_id in delete:
+            self._remove(book_id)
+        self.updates += len(upsert) + len(delete)
+        self.changed_at = datetime.utcnow()
+
+    def _index_terms(self, record: IndexedBook) -> None:
+        for field, postings in self._tokens.items():
+            for token in set(tokenize(getattr(record, field))):
+                _add(postings, token, record.book_id)
+        for field, postings in self._filters.items():
+            _add(postings, getattr(record, field), record.book_id)
+
+    def _index_sorted(self, record: IndexedBook) -> None:
+        for field, order in self._order.items():
+            bisect.insort(order, record.book_id, key=self._sort_key(field))
+        if record.isbn:
+            position = bisect.bisect_left(self._isbns, record.isbn)
+            self._isbns.insert(position, record.isbn)
+            self._isbn_ids.insert(position, record.book_id)
+
+    def _sort_all(self) -> None:
+        for field in SORT_FIELDS:
+            self._order[field] = array('I', sorted(self._books, key=self._sort_key(field)))
+        pairs = sorted((record.isbn, record.book_id) for record in self._books.values() if record.isbn)
+        self._isbns = [isbn for isbn, _ in pairs]
+        self._isbn_ids = array('I', (book_id for _, book_id in pairs))
+
+    def _remove(self, book_id: int) -> None:
+        record = self._books.get(book_id)
+        if record is None:
+            return
+        # Позиции в порядках ищем по старым значениям, поэтому запись удаляем из словаря последней
+        for field, order in self._order.items():
+            key = self._sort_key(field)
+            position = bisect.bisect_left(order, key(book_id), key=key)
+            if position < len(order) and order[position] == book_id:
+                del order[position]
+        if record.isbn:
+            position = bisect.bisect_left(self._isbns, record.isbn)
+            if position < len(self._isbns) and self._isbn_ids[position] == book_id:
+                del self._isbns[position]
+                del self._isbn_ids[position]
+        for field, postings in self._tokens.items():
+            for token in set(tokenize(getattr(record, field))):
+                _discard(postings, token, book_id)
+        for field, postings in self._filters.items():
+            _discard(postings, getattr(record, field), book_id)
+        del self._books[book_id]
+
+    def _sort_key(self, field: str) -> Callable[[int], Tuple[Any, int]]:
+        books = self._books
+        return lambda book_id: (getattr(books[book_id], field), book_id)
+
+    @property
+    def version(self) -> str:
+        """
+        Версия содержимого индекса этого воркера для ETag списков: меняется с каждой
+        перестройкой и каждым применённым изменением. У воркеров версии разные.
+        """
+        return f"{self.instance_id}:{self.built_at.isoformat() if self.built_at else ''}:{self.updates}"
+
+    # --- Чтение (сигнатуры как у IBookRepository) ---
+
+    def get(self, book_id: int) -> Optional[IndexedBook]:
+        return self._books.get(book_id)
+
+    def existing_isbns(self, isbns: Iterable[str]) -> Set[str]:
+        existing = set()
+        for isbn in isbns:
+            position = bisect.bisect_left(self._isbns, isbn)
+            if position < len(self._isbns) and self._isbns[position] == isbn:
+                existing.add(isbn)
+        return existing
+
+    async def get_page(
+            self,
+            filters: dict,
+            sort: str,
+            after: Optional[List[Any]],
+            limit: int,
+            order: str = 'asc'
+    ) -> List[IndexedBook]:
+        ids = self._order[sort]
+        key = self._sort_key(sort)
+        descending = order == 'desc'
+        after_key = tuple(after) if after else None
+        candidates, predicate = self._matcher(filters)
+        if candidates is not None and predicate is not None:
+            candidates = {book_id for book_id in candidates if predicate(self._books[book_id])}
+            predicate = None
+
+        if candidates is not None and len(candidates) * CANDIDATE_SORT_RATIO < len(ids):
+            if after_key is not None:
+                candidates = [book_id for book_id in candidates
+                              if (key(book_id) < after_key if descending else key(book_id) > after_key)]
+            select = heapq.nlargest if descending else heapq.nsmallest
+            return [self._books[book_id] for book_id in select(limit, candidates, key=key)]
+
+        # Идём по готовому порядку от позиции курсора до набора limit подходящих книг
+        if descending:
+            start = bisect.bisect_left(ids, after_key, key=key) if after_key else len(ids)
+            walk = (ids[position] for position in range(start - 1, -1, -1))
+        else:
+            start = bisect.bisect_right(ids, after_key, key=key) if after_key else 0
+            walk = itertools.islice(ids, start, None)
+        if candidates is not None:
+            walk = (book_id for book_id in walk if book_id in candidates)
+        elif predicate is not None:
+            walk = (book_id for book_id in walk if predicate(self._books[book_id]))
+        return [self._books[book_id] for book_id in itertools.islice(walk, limit)]
+
+    async def count(self, filters: dict) -> int:
+        candidates, predicate = self._matcher(filters)
+        if predicate is None:
+            return len(self._books) if candidates is None else len(candidates)
+        records = self._books.values() if candidates is None else (self._books[i] for i in candidates)
+        return sum(1 for record in records if predicate(record))
+
+    async def search(
+            self,
+            query: str,
+            offset: int,
+            limit: int
+    ) -> Tuple[List[Tuple[IndexedBook, float, Optional[str]]], int]:
+        include, exclude = self._parse_query(query)
+        if not include:
+            return [], 0
+
+        scores: Optional[Dict[int, float]] = None
+        for token in include:
+            token_scores: Dict[int, float] = {}
+            for field, weight in FIELD_WEIGHTS.items():
+                for book_id in self._tokens[field].get(token, EMPTY):
+                    token_scores[book_id] = token_scores.get(book_id, 0.0) + weight
+            if scores is None:
+                scores = token_scores
+            else:
+                scores = {book_id: score + token_scores[book_id] for book_id, score in scores.items()
+                          if book_id in token_scores}
+            if not scores:
+                return [], 0
+        for token in exclude:
+            for postings in self._tokens.values():
+                for book_id in postings.get(token, EMPTY):
+                    scores.pop(book_id, None)
+
+        top = heapq.nsmallest(offset + limit, scores.items(), key=lambda item: (-item[1], item[0]))[offset:]
+        hits = [
+            (self._books[book_id], score, self._highlight(self._books[book_id], set(include)))
+            for book_id, score in top
+        ]
+        return hits, len(scores)
+
+    def _matcher(self, filters: dict) -> Tuple[Optional[Set[int]], Optional[Callable[[IndexedBook], bool]]]:
+        """
+        Кандидаты по точным фильтрам (пересечение списков из словарей; None — все книги)
+        и проверка диапазонов и доступности, которая применяется к каждой записи
+        """
+        postings = []
+        if filters.get('author') is not None:
+            postings.append(self._filters['author'].get(filters['author'], EMPTY))
+        genres = set(filters.get('genre') or ())
+        if len(genres) == 1:
+            postings.append(self._filters['genre'].get(genres.pop(), EMPTY))
+        elif genres:
+            postings.append(set().union(*(self._filters['genre'].get(genre, EMPTY) for genre in genres)))
+        if filters.get('year_publication') is not None:
+            postings.append(self._filters['year_publication'].get(filters['year_publication'], EMPTY))
+
+        candidates = None
+        if postings:
+            postings.sort(key=len)
+            candidates = set(postings[0])
+            for ids in postings[1:]:
+                candidates.intersection_update(ids)
+
+        checks = [
+            (attribute, compare, filters[name])
+            for name, attribute, compare in RECORD_FILTERS if filters.get(name) is not None
+        ]
+        if not checks:
+            return candidates, None
+        return candidates, lambda record: all(compare(getattr(record, attribute), value)
+                                              for attribute, compare, value in checks)
+
+    @staticmethod
+    def _parse_query(query: str) -> Tuple[List[str], List[str]]:
+        """Упрощённый websearch: слова через AND, "-слово" исключает; фразы разбираются на слова"""
+        include, exclude = [], []
+        for match in QUERY_TERM_RE.finditer(query):
+            negated, term = match.groups()
+            if term.casefold() == 'or':
+                continue
+            (exclude if negated else include).extend(tokenize(term))
+        return include, exclude
+
+    @staticmethod
+    def _highlight(record: IndexedBook, tokens: Set[str]) -> str:
+        text = ' — '.join(value for value in (record.title, record.author, record.description) if value)
+        parts, words = [], 0
+        for piece in re.split(r"(\w+)", text):
+            if TOKEN_RE.fullmatch(piece):
+                words += 1
+                if words > HIGHLIGHT_MAX_WORDS:
+                    break
+                if piece.casefold() in tokens:
+                    piece = f"<mark>{piece}</mark>"
+            parts.append(piece)
+        return ''.join(parts).strip(' —')
+
+    # --- Статистика ---
+
+    def memory_usage(self) -> int:
+        """Приблизительный объём индекса в байтах (записи оцениваются по выборке)"""
+        books = len(self._books)
+        total = sys.getsizeof(self._books)
+        if books:
+            sample = list(itertools.islice(self._books.values(), MEMORY_SAMPLE_SIZE))
+            sampled = sum(
+                sys.getsizeof(record) + sum(sys.getsizeof(getattr(record, name)) for name in IndexedBook.__slots__)
+                for record in sample
+            )
+            total += sampled * books // len(sample)
+        for postings in (*self._tokens.values(), *self._filters.values()):
+            total += sys.getsizeof(postings)
+            total += sum(sys.getsizeof(key) + sys.getsizeof(ids) for key, ids in postings.items())
+        total += sum(sys.getsizeof(order) for order in self._order.values())
+        total += sys.getsizeof(self._isbns) + sum(sys.getsizeof(isbn) for isbn in self._isbns)
+        total += sys.getsizeof(self._isbn_ids)
+        return total
+
+    def stats(self) -> Dict[str, Any]:
+        books = len(self._books)
+        memory = self.memory_usage()
+        return {
+            "ready": self.ready,
+            "books": books,
+            "tokens": sum(len(postings) for postings in self._tokens.values()),
+            "memory_bytes": memory,
+            "memory_per_book_bytes": memory // books if books else 0,
+            "built_at": self.built_at.isoformat() if self.built_at else None,
+            "build_seconds": round(self.build_seconds, 3),
+            "updates": self.updates
+        }
+
+    # --- Синхронизация между воркерами ---
+
+    async def _publish(self, upsert: List[BookResponse], delete: List[int]) -> None:
+        if self.redis is None:
+            return
+        try:
+            await self.redis.publish(self.channel, json.dumps({
+                "origin": self.instance_id,
+                "upsert": [book.model_dump(mode='json') for book in upsert],
+                "delete": delete
+            }))
+        except Exception as e:
+            logger.warning(f"Memory index change broadcast failed: {e}")
+
+    async def start_listener(self, timeout: float = 5.0) -> None:
+        if self.redis is None or self._listener is not None:
+            return
+        self._listener = asyncio.create_task(self._listen(), name="memory-index-listener")
+        # Подписка должна начаться до сканирования, иначе изменения между ними потеряются
+        try:
+            await asyncio.wait_for(self._subscribed.wait(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Memory index listener did not subscribe in time")
+
+    async def stop_listener(self) -> None:
+        for task in (self._listener, self._retry):
+            if task is not None:
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+        self._listener = self._retry = None
+
+    async def _listen(self) -> None:
+        while True:
+            pubsub = self.redis.pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                if self._subscribed.is_set():
+                    # После переподключения часть изменений могла быть пропущена
+                    await self.build()
+                self._subscribed.set()
+                async for message in pubsub.listen():
+                    if message["type"] != "message":
+                        continue
+                    payload = json.loads(message["data"])
+                    if payload.get("origin") != self.instance_id:
+                        self._apply(
+                            [BookResponse.from_cached(book) for book in payload.get("upsert", [])],
+                            payload.get("delete", [])
+                        )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Memory index listener failed, resubscribing: {e}")
+                self.ready = False
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.aclose()
+
+
+# --- Индекс на воркер (создаётся в lifespan) ---
+
+_memory_index: Optional[MemoryIndex] = None
+
+
+async def init_memory_index(
+        repository_factory: Callable[[], AsyncContextManager[IBookRepository]],
+        redis: Optional[Redis] = None,
+        chunk_size: int = 5000,
+        retry_interval: float = 30.0
+) -> MemoryIndex:
+    """Builds the index; if the build fails, reads keep going to the database until a retry succeeds"""
+    global _memory_index
+    index = MemoryIndex(repository_factory, redis=redis, chunk_size=chunk_size, retry_interval=retry_interval)
+    await index.start_listener()
+    try:
+        await index.build()
+    except Exception as e:
+        logger.error(f"Memory index build failed, serving reads from the database: {e}")
+        index.schedule_rebuild()
+    _memory_index = index
+    return index
+
+
+async def close_memory_index() -> None:
+    global _memory_index
+    if _memory_index is not None:
+        await _memory_index.stop_listener()
+        _memory_index = None
+
+
+def get_memory_index() -> Optional[MemoryIndex]:
+    return _memory_index
@@ -3,10 +3,23 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
 from contextlib import asynccontextmanager
 from config.settings import get_settings
+from application.services.enrichment_worker import get_enrichment_queue
+from infrastructure.cache.redis_cache import init_cache, close_cache
+from infrastructure.database.pool import PoolAutoscaler, warm_up
+from infrastructure.database.session import all_engines, replicas
 from infrastructure.logging.setup import setup_logging
+from infrastructure.monitoring.metrics import mark_process_dead
+from infrastructure.rate_limit.limiter import init_rate_limiter, close_rate_limiter
+from infrastructure.external.file_storage_client import get_file_storage_client
+from infrastructure.external.http_client import http_clients
+from infrastructure.repositories.book_repository import open_book_repository
+from infrastructure.search.memory_index import init_memory_index, close_memory_index
 from presentation.api.exception_handlers import register_exception_handlers
 from presentation.middleware.logging import log_requests_middleware
-from presentation.api.v1 import books, health
+from presentation.middleware.metrics import metrics_middleware
+from presentation.middleware.rate_limit import RateLimitMiddleware
+from presentation.middleware.read_your_writes import read_your_writes_middleware
+from presentation.api.v1 import books, health, metrics
 from loguru import logger
 
 settings = get_settings()
@@ -19,9 +32,69 @@ async def lifespan(app: FastAPI):
         environment=settings.environment,
         version=settings.api_version
     )
+    cache = await init_cache(
+        settings.redis_url,
+        local_maxsize=settings.cache_local_maxsize,
+        local_ttl=settings.cache_local_ttl,
+        # Промах, прочитанный с отстающей реплики, может вернуть в кеш старые данные: реплика
+        # из ротации догоняет запись не позже чем через max_lag + check_interval
+        repeat_invalidation_after=settings.replica_max_lag + settings.replica_check_interval if replicas else 0.0
+    )
+    if settings.rate_limit_enabled:
+        await init_rate_limiter(
+            redis=cache.redis if cache else None,
+            sync_interval=settings.rate_limit_sync_interval
+        )
+    if replicas:
+        await replicas.start()
+    if settings.db_pool_warmup:
+        for engine in all_engines():
+            await warm_up(engine, settings.db_pool_size)
+    autoscalers = [
+        PoolAutoscaler(
+            engine,
+            min_overflow=settings.db_pool_min_overflow,
+            max_overflow=settings.db_pool_max_overflow,
+            target_wait_ms=settings.db_pool_target_wait_ms,
+            interval=settings.db_pool_adapt_interval
+        )
+        for engine in all_engines()
+    ] if settings.db_pool_adaptive else []
+    for autoscaler in autoscalers:
+        await autoscaler.start()
+    if settings.memory_index_enabled and cache is None and settings.web_concurrency > 1:
+        logger.error(
+            "Memory index needs Redis to share changes between workers, "
+            "it stays disabled and reads are served from the database"
+        )
+    elif settings.memory_index_enabled:
+        await init_memory_index(
+            open_book_repository,
+            redis=cache.redis if cache else None,
+            chunk_size=settings.memory_index_chunk_size,
+            retry_interval=settings.memory_index_retry_interval
+        )
+    await http_clients.startup([settings.openlibrary_base_url])
+    enrichment_queue = get_enrichment_queue()
+    if enrichment_queue:
+        await enrichment_queue.start()
     yield
     # Shutdown
+    for autoscaler in autoscalers:
+        await autoscaler.stop()
+    if enrichment_queue:
+        await enrichment_queue.stop()
+    await close_memory_index()
+    if replicas:
+        await replicas.stop()
+    await http_clients.aclose()
+    await close_rate_limiter()
+    await close_cache()
+    await get_file_storage_client().flush_async()
+    mark_process_dead()
     logger.info("application_shutdown")
+    # Дописать записи из очередей логов (режим fast)
+    await logger.complete()
 
 def create_application() -> FastAPI:
     """Application factory"""
@@ -29,7 +102,8 @@ def create_application() -> FastAPI:
     # Setup logging
     setup_logging(
         environment=settings.environment,
-        log_level=settings.log_level
+        log_level=settings.log_level,
+        mode=settings.log_mode
     )
 
     app: FastAPI = FastAPI(
@@ -43,6 +117,11 @@ def create_application() -> FastAPI:
         lifespan=lifespan
     )
 
+    if settings.rate_limit_enabled:
+        # Внутри CORS (добавлен раньше — значит, глубже): ответ 429 получает заголовки CORS.
+        # И внутри логирования и метрик: отклонённые запросы тоже видны в логах и на /metrics
+        app.add_middleware(RateLimitMiddleware)
+
     # CORS Middleware
     app.add_middleware(
         CORSMiddleware,
@@ -56,7 +135,12 @@ def create_application() -> FastAPI:
     app.add_middleware(GZipMiddleware, minimum_size=1000)
 
     # Custom middleware
+    if settings.database_replica_urls:
+        app.middleware("http")(read_your_writes_middleware)
     app.middleware("http")(log_requests_middleware)
+    if settings.metrics_enabled:
+        # Последним — самый внешний: время и статус с учётом всех остальных middleware
+        app.middleware("http")(metrics_middleware)
 
     # Exception handlers
     register_exception_handlers(app)
@@ -72,6 +156,8 @@ def create_application() -> FastAPI:
         prefix="/health",
         tags=["Health"]
     )
+    if settings.metrics_enabled:
+        app.include_router(metrics.router)
 
     return app
 
@@ -1,8 +1,59 @@
-from typing import AsyncGenerator
+import re
+import time
+from typing import AsyncGenerator, Optional
+from fastapi import Request
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.ext.asyncio import AsyncSession
-from infrastructure.database.session import async_session_maker
+from config.settings import get_settings
+from infrastructure.database.session import async_session_maker, replicas
 
-async def get_db() -> AsyncGenerator[AsyncSession, None]:
+settings = get_settings()
+
+READ_ONLY_METHODS = frozenset({"GET", "HEAD"})
+# Время последней записи клиента (unix time): cookie для браузеров, заголовок — для остальных
+LAST_WRITE_COOKIE = "last_write"
+LAST_WRITE_HEADER = "X-Last-Write"
+# Позиция WAL primary после последней записи клиента (Postgres)
+LAST_WRITE_LSN_COOKIE = "last_write_lsn"
+LAST_WRITE_LSN_HEADER = "X-Last-Write-LSN"
+LSN_PATTERN = re.compile(r"^[0-9A-Fa-f]{1,8}/[0-9A-Fa-f]{1,8}$")
+
+
+def read_your_writes_window() -> float:
+    """
+    Сколько секунд после записи клиента без позиции WAL читать из primary. Реплика
+    с отставанием до replica_max_lag остаётся в ротации до следующей проверки, так что
+    запись видна на любой реплике из ротации не раньше, чем через max_lag + check_interval.
+    """
+    return settings.replica_max_lag + settings.replica_check_interval
+
+
+def last_write_lsn(request: Request) -> Optional[str]:
+    """Позиция WAL последней записи клиента, если он её прислал"""
+    lsn = request.headers.get(LAST_WRITE_LSN_HEADER) or request.cookies.get(LAST_WRITE_LSN_COOKIE)
+    return lsn if lsn and LSN_PATTERN.match(lsn) else None
+
+
+def reads_from_replica(request: Request) -> bool:
+    """
+    Можно ли отдать чтение реплике. С позицией WAL — можно: подойдёт только реплика,
+    применившая её (см. ReplicaRouter.open_session). Без неё — если клиент сам не писал
+    в последние read_your_writes_window() секунд.
+    """
+    if request.method not in READ_ONLY_METHODS:
+        return False
+    if last_write_lsn(request):
+        return True
+    last_write = request.headers.get(LAST_WRITE_HEADER) or request.cookies.get(LAST_WRITE_COOKIE)
+    if last_write:
+        try:
+            return time.time() - float(last_write) > read_your_writes_window()
+        except ValueError:
+            pass
+    return True
+
+
+async def get_primary_db() -> AsyncGenerator[AsyncSession, None]:
     async with async_session_maker() as session:
         try:
             yield session
@@ -11,4 +62,23 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
             await session.rollback()
             raise
         finally:
-            await session.close()
\ No newline at end of file
+            await session.close()
+
+
+async def get_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """Сессия primary, а для чтения — реплики (если они настроены и доступны)"""
+    session: Optional[AsyncSession] = None
+    if replicas and reads_from_replica(request):
+        session = await replicas.open_session(min_lsn=last_write_lsn(request))
+    replica = session.info["replica"] if session else None
+    session = session or async_session_maker()
+    try:
+        yield session
+        await session.commit()
+    except Exception as e:
+        await session.rollback()
+        if replica and isinstance(e, DBAPIError) and e.connection_invalidated:
+            replicas.eject(replica, e)
+        raise
+    finally:
+        await session.close()
@@ -0,0 +1,28 @@
+import time
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from infrastructure.monitoring.profiling import record
+
+
+def _default(value: Any) -> Any:
+    # Модели собраны из проверенных данных (from_row / from_cached) — отдаём поля как есть
+    if isinstance(value, BaseModel):
+        return value.__dict__
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+class TrustedJSONResponse(JSONResponse):
+    """
+    JSON-ответ для моделей, собранных сервисом из доверенных данных.
+    Эндпоинт возвращает его вместо модели, поэтому FastAPI не валидирует ответ
+    повторно по response_model (он остаётся только для OpenAPI); orjson пишет сразу в байты.
+    """
+
+    def render(self, content: Any) -> bytes:
+        started = time.perf_counter()
+        body = orjson.dumps(content, default=_default)
+        record("serialize", time.perf_counter() - started)
+        return body
@@ -1,31 +1,169 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from typing import List, Optional
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from typing import Any, Dict, List, Literal, Optional, Tuple
 from application.services.book_service import BookService, get_book_service
-from domain.schemas.book import BookCreate, BookResponse
+from domain.schemas.book import (
+    BookCreate, BookFacets, BookFilter, BookResponse, BookSearchHit, BookSortField, BookSortOrder,
+    BookSuggestion, BulkCreateResponse, SuggestField
+)
+from domain.schemas.pagination import PaginatedResponse
+from presentation.api.conditional import is_not_modified, make_etag, not_modified, validator_headers
+from presentation.api.responses import TrustedJSONResponse
 
 router = APIRouter(prefix='/api/v1/books', tags=['Books'])
 
+EXPORT_MEDIA_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+
+def get_book_filter(
+    author: Optional[str] = Query(None, description="Автор (точное совпадение)"),
+    genre: Optional[List[str]] = Query(None, description="Жанр; можно указать несколько: genre=A&genre=B"),
+    year_publication: Optional[int] = Query(None, description="Год издания (точное совпадение)"),
+    year_from: Optional[int] = Query(None, description="Год издания от (включительно)"),
+    year_to: Optional[int] = Query(None, description="Год издания до (включительно)"),
+    pages_min: Optional[int] = Query(None, ge=1, description="Минимальное число страниц"),
+    pages_max: Optional[int] = Query(None, ge=1, description="Максимальное число страниц"),
+    accessibility: Optional[bool] = Query(None, description="Доступность книги")
+) -> BookFilter:
+    """Общие фильтры списка, выгрузки и фасетов"""
+    return BookFilter(
+        author=author,
+        genre=genre,
+        year_publication=year_publication,
+        year_from=year_from,
+        year_to=year_to,
+        pages_min=pages_min,
+        pages_max=pages_max,
+        accessibility=accessibility
+    )
+
+
+async def catalog_validators(
+        service: BookService,
+        *parts: Any,
+        indexed: bool = True
+) -> Optional[Tuple[str, Optional[datetime]]]:
+    """
+    ETag и Last-Modified ответа со списком: версия источника, из которого он будет отдан
+    (индекс, кеш или база), плюс все параметры запроса. Список из индекса — indexed.
+    None, если версия не ведётся (база без миграций, без кеша и индекса).
+    """
+    catalog = await service.get_catalog_version(indexed=indexed)
+    if catalog is None:
+        return None
+    version, last_modified = catalog
+    return make_etag('books', version, *parts), last_modified
+
+
+@router.get('/export', response_class=StreamingResponse)
+async def export_books(
+    filters: BookFilter = Depends(get_book_filter),
+    fmt: Literal['ndjson', 'csv'] = Query('ndjson', alias='format', description="Формат выгрузки"),
+    service: BookService = Depends(get_book_service)
+):
+    """Потоковая выгрузка всего каталога (NDJSON или CSV)"""
+    return StreamingResponse(
+        service.export_books(fmt, filters),
+        media_type=EXPORT_MEDIA_TYPES[fmt],
+        headers={'Content-Disposition': f'attachment; filename="books.{fmt}"'}
+    )
+
+
+@router.get('/search', response_model=PaginatedResponse[BookSearchHit])
+async def search_books(
+    q: str = Query(..., min_length=1, max_length=200, description="Поисковый запрос (синтаксис websearch)"),
+    page: int = Query(1, ge=1, le=1000),
+    page_size: Optional[int] = Query(None, ge=1, description="Размер страницы (ограничен max_page_size)"),
+    service: BookService = Depends(get_book_service)
+):
+    """Полнотекстовый поиск по названию, автору и описанию"""
+    return TrustedJSONResponse(await service.search_books(q, page=page, page_size=page_size))
+
+
+@router.get('/facets', response_model=BookFacets)
+async def get_book_facets(
+    request: Request,
+    response: Response,
+    filters: BookFilter = Depends(get_book_filter),
+    service: BookService = Depends(get_book_service)
+):
+    """Число книг по жанрам, десятилетиям и доступности с учётом фильтров"""
+    # Фасеты не читаются из индекса — валидатор берётся от кеша или базы
+    validators = await catalog_validators(service, 'facets', filters.model_dump(), indexed=False)
+    if validators:
+        if is_not_modified(request, *validators):
+            return not_modified(*validators)
+        response.headers.update(validator_headers(*validators))
+    return await service.get_facets(filters)
+
+
+@router.get('/autocomplete', response_model=List[BookSuggestion])
+async def autocomplete_books(
+    q: str = Query(..., min_length=1, max_length=200, description="Начало названия или имени автора"),
+    field: SuggestField = Query('title', description="Поле для подсказок"),
+    limit: Optional[int] = Query(None, ge=1, le=50),
+    service: BookService = Depends(get_book_service)
+):
+    """Автодополнение по префиксу названия или автора"""
+    return await service.autocomplete(field, q, limit)
+
+
+@router.get('/fuzzy', response_model=List[BookSuggestion])
+async def fuzzy_search_books(
+    q: str = Query(..., min_length=2, max_length=200, description="Название или имя автора, возможно с опечатками"),
+    field: SuggestField = Query('author', description="Поле для поиска"),
+    limit: Optional[int] = Query(None, ge=1, le=50),
+    service: BookService = Depends(get_book_service)
+):
+    """Нечёткий поиск (pg_trgm) по названию или автору, по убыванию схожести"""
+    return await service.fuzzy_search(field, q, limit)
+
+
 @router.get('/{book_id}', response_model=BookResponse)
 async def get_book(
     book_id: int,
+    request: Request,
     service: BookService = Depends(get_book_service)
 ):
-    """Получить книгу по ID"""
+    """Получить книгу по ID (поддерживает If-None-Match / If-Modified-Since)"""
     try:
-        return await service.get_book(book_id)
+        book = await service.get_book(book_id)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
+    # Валидаторы — от отдаваемой версии книги (из индекса, кеша или базы): на 304 в базу не ходим,
+    # если книга нашлась в индексе или кеше, и не сериализуем её
+    etag = make_etag('book', book.book_id, book.updated_at)
+    if is_not_modified(request, etag, book.updated_at):
+        return not_modified(etag, book.updated_at)
+    return TrustedJSONResponse(book, headers=validator_headers(etag, book.updated_at))
 
 
-@router.get('/', response_model=List[BookResponse])
+@router.get('/', response_model=PaginatedResponse[BookResponse])
 async def get_books(
-    author: Optional[str] = Query(None),
-    genre: Optional[str] = Query(None),
-    year_publication: Optional[int] = Query(None),
+    request: Request,
+    filters: BookFilter = Depends(get_book_filter),
+    sort: BookSortField = Query('book_id', description="Поле сортировки"),
+    order: BookSortOrder = Query('asc', description="Направление сортировки"),
+    cursor: Optional[str] = Query(None, description="Курсор из next_cursor предыдущей страницы"),
+    page_size: Optional[int] = Query(None, ge=1, description="Размер страницы (ограничен max_page_size)"),
+    include_total: bool = Query(False, description="Посчитать общее количество книг"),
     service: BookService = Depends(get_book_service)
 ):
-    """Получить список книг с фильтрацией"""
-    return await service.get_books(author, genre, year_publication)
+    """Получить страницу списка книг с фильтрацией (keyset-пагинация)"""
+    validators = await catalog_validators(
+        service, 'list', filters.model_dump(), sort, order, cursor, page_size, include_total
+    )
+    if validators and is_not_modified(request, *validators):
+        return not_modified(*validators)
+    page = await service.get_books(
+        filters,
+        sort=sort, order=order, cursor=cursor, page_size=page_size, include_total=include_total
+    )
+    return TrustedJSONResponse(page, headers=validator_headers(*validators) if validators else None)
 
 
 @router.post('/', response_model=BookResponse, status_code=status.HTTP_201_CREATED)
@@ -40,6 +178,15 @@ async def create_book(
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@router.post('/bulk', response_model=BulkCreateResponse, status_code=status.HTTP_201_CREATED)
+async def bulk_create_books(
+    books: List[Dict[str, Any]],
+    service: BookService = Depends(get_book_service)
+):
+    """Создать книги пачкой; ошибки возвращаются по каждому элементу"""
+    return await service.bulk_create_books(books)
+
+
 @router.put('/{book_id}', response_model=BookResponse)
 async def update_book(
     book_id: int,
@@ -2,7 +2,12 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
 from config.settings import get_settings
-from presentation.api.dependencies import get_db
+from application.services.enrichment_worker import get_enrichment_queue
+from infrastructure.cache.redis_cache import get_cache_service
+from infrastructure.database.pool import pool_stats
+from infrastructure.database.session import engine, replicas
+from infrastructure.search.memory_index import get_memory_index
+from presentation.api.dependencies import get_primary_db
 
 # Используем настройки, например, для получения версии API или окружения
 settings = get_settings()
@@ -23,7 +28,7 @@ async def health_check():
     }
 
 @router.get("/db")
-async def health_check_db(db: AsyncSession = Depends(get_db)):
+async def health_check_db(db: AsyncSession = Depends(get_primary_db)):
     """
     Эндпоинт проверки состояния подключения к базе данных.
     Выполняет простой SQL-запрос для проверки соединения.
@@ -40,4 +45,67 @@ async def health_check_db(db: AsyncSession = Depends(get_db)):
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             detail=f"Database unhealthy: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+@router.get("/enrichment")
+async def health_check_enrichment():
+    """
+    Состояние фоновой очереди обогащения книг данными OpenLibrary:
+    глубина очереди, число воркеров и счётчики обработанных/отброшенных задач.
+    """
+    enrichment_queue = get_enrichment_queue()
+    if enrichment_queue is None:
+        return {"status": "disabled"}
+    return {"status": "healthy" if enrichment_queue.running else "stopped", **enrichment_queue.stats()}
+
+
+@router.get("/cache")
+async def health_check_cache():
+    """
+    Статистика кеша по уровням: L1 (память воркера) и L2 (Redis) —
+    попадания, промахи и вытеснения.
+    """
+    cache = get_cache_service()
+    if cache is None:
+        return {"status": "disabled"}
+    return {"status": "healthy", **cache.stats()}
+
+
+@router.get("/index")
+async def health_check_index():
+    """
+    Состояние индекса каталога в памяти воркера: число книг и токенов,
+    приблизительный объём памяти (в том числе на одну книгу) и время построения.
+    """
+    index = get_memory_index()
+    if index is None:
+        return {"status": "disabled"}
+    return {"status": "healthy" if index.ready else "building", **index.stats()}
+
+
+@router.get("/replicas")
+async def health_check_replicas():
+    """
+    Реплики для чтения: сколько в ротации, отставание и ошибки каждой,
+    число чтений, ушедших в primary из-за отсутствия доступных реплик.
+    """
+    if replicas is None:
+        return {"status": "disabled"}
+    stats = replicas.stats()
+    return {"status": "healthy" if stats["available"] == len(stats["replicas"]) else "degraded", **stats}
+
+
+@router.get("/pool")
+async def health_check_pool():
+    """
+    Пулы соединений primary и реплик: занятые, свободные и overflow-соединения,
+    их возраст, гистограмма ожидания соединения (мс) и таймауты.
+    Рост p95 ожидания и таймауты означают, что пул мал для нагрузки.
+    """
+    primary = pool_stats(engine)
+    exhausted = primary.get("checked_out", 0) >= primary.get("pool_size", 0) + primary.get("max_overflow", 0)
+    return {
+        "status": "saturated" if exhausted else "healthy",
+        "primary": primary,
+        "replicas": {replica.name: pool_stats(replica.engine) for replica in replicas.replicas} if replicas else {},
+    }
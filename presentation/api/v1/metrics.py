@@ -0,0 +1,14 @@
+from fastapi import APIRouter, Response
+from infrastructure.monitoring.metrics import render_latest
+
+router = APIRouter(tags=["Monitoring"])
+
+
+@router.get("/metrics", include_in_schema=False)
+def metrics():
+    """
+    Метрики в формате Prometheus. Обычная (не async) функция: в режиме multiprocess
+    чтение файлов всех воркеров выполняется в пуле потоков, а не в event loop.
+    """
+    body, content_type = render_latest()
+    return Response(content=body, media_type=content_type)
@@ -1,37 +1,80 @@
 from fastapi import Request
+import random
 import time
 from loguru import logger
+from config.settings import get_settings
+from infrastructure.monitoring.profiling import start_profile, stop_profile
+from presentation.middleware.metrics import route_template
+
+settings = get_settings()
+
+
+def _sampled(route: str) -> bool:
+    """Попадает ли успешный запрос в лог (режим fast); доля задаётся по маршруту"""
+    rate = settings.log_sample_rates.get(route, settings.log_sample_rate)
+    return rate >= 1.0 or random.random() < rate
 
 
 async def log_requests_middleware(request: Request, call_next):
-    """Log all requests with timing"""
+    """
+    Log all requests with timing; profiles SQL, cache, external calls and serialization per request.
+    In the fast log mode a request is a single record written after the response,
+    and successful requests are sampled.
+    """
 
     request_id = request.headers.get('X-Request-ID', 'unknown')
     start_time = time.time()
+    profile, token = start_profile()
+    single_record = settings.log_mode == "fast"
 
-    logger.info(
-        "request_started",
-        method=request.method,
-        path=request.url.path,
-        request_id=request_id,
-        client=request.client.host if request.client else None
-    )
+    if not single_record:
+        logger.info(
+            "request_started",
+            method=request.method,
+            path=request.url.path,
+            request_id=request_id,
+            client=request.client.host if request.client else None
+        )
 
     try:
         response = await call_next(request)
         duration = time.time() - start_time
 
-        logger.info(
-            "request_completed",
-            method=request.method,
-            path=request.url.path,
-            status_code=response.status_code,
-            duration=f"{duration:.3f}s",
-            request_id=request_id
-        )
+        if not single_record:
+            logger.info(
+                "request_completed",
+                method=request.method,
+                path=request.url.path,
+                status_code=response.status_code,
+                duration=f"{duration:.3f}s",
+                queries=profile.queries,
+                request_id=request_id
+            )
+        else:
+            route = route_template(request)
+            if response.status_code >= 400 or _sampled(route):
+                logger.info(
+                    "request",
+                    method=request.method,
+                    route=route,
+                    path=request.url.path,
+                    status_code=response.status_code,
+                    duration_ms=round(duration * 1000, 2),
+                    queries=profile.queries,
+                    request_id=request_id,
+                    client=request.client.host if request.client else None
+                )
+        if profile.queries > settings.request_max_queries:
+            statement, repeats = profile.most_repeated()
+            logger.warning(
+                f"{request.method} {request.url.path} issued {profile.queries} SQL queries "
+                f"(limit {settings.request_max_queries}), most repeated x{repeats}: {statement}"
+            )
 
         response.headers['X-Request-ID'] = request_id
         response.headers['X-Process-Time'] = str(duration)
+        if settings.server_timing_enabled:
+            response.headers['Server-Timing'] = profile.server_timing(duration)
 
         return response
 
@@ -46,4 +89,6 @@ async def log_requests_middleware(request: Request, call_next):
             request_id=request_id,
             exc_info=True
         )
-        raise
\ No newline at end of file
+        raise
+    finally:
+        stop_profile(token)
@@ -0,0 +1,31 @@
+import time
+from fastapi import Request
+from infrastructure.monitoring.metrics import HTTP_REQUEST_DURATION, HTTP_REQUESTS_IN_PROGRESS
+
+# Метод и маршрут — метки с ограниченным числом значений; произвольные методы и пути в них не попадают
+KNOWN_METHODS = frozenset({"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"})
+UNMATCHED_ROUTE = "unmatched"
+
+
+def route_template(request: Request) -> str:
+    """Шаблон пути маршрута (/books/{book_id}), а не сам путь запроса"""
+    route = request.scope.get("route")
+    return getattr(route, "path", UNMATCHED_ROUTE)
+
+
+async def metrics_middleware(request: Request, call_next):
+    """Латентность запросов по маршруту, методу и статусу и число запросов в обработке"""
+    method = request.method if request.method in KNOWN_METHODS else "OTHER"
+    in_progress = HTTP_REQUESTS_IN_PROGRESS.labels(method)
+    in_progress.inc()
+    started = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        in_progress.dec()
+        HTTP_REQUEST_DURATION.labels(method, route_template(request), str(status_code)).observe(
+            time.perf_counter() - started
+        )
@@ -0,0 +1,32 @@
+import math
+import time
+from fastapi import Request
+from infrastructure.database.session import replicas
+from presentation.api.dependencies import (
+    LAST_WRITE_COOKIE,
+    LAST_WRITE_HEADER,
+    LAST_WRITE_LSN_COOKIE,
+    LAST_WRITE_LSN_HEADER,
+    READ_ONLY_METHODS,
+    read_your_writes_window,
+)
+
+
+async def read_your_writes_middleware(request: Request, call_next):
+    """
+    После успешной записи отмечает клиента позицией WAL primary (cookie и заголовок
+    X-Last-Write-LSN) и временем записи (X-Last-Write). Его чтения идут только в реплики,
+    применившие эту позицию, а без неё — в primary, пока окно read-your-writes не истекло (см. get_db).
+    """
+    response = await call_next(request)
+    if request.method not in READ_ONLY_METHODS and response.status_code < 400:
+        # Запись уже закоммичена сервисом, так что текущая позиция WAL не меньше её коммита
+        lsn = await replicas.primary_lsn() if replicas else None
+        max_age = max(1, math.ceil(read_your_writes_window()))
+        stamps = [(LAST_WRITE_COOKIE, LAST_WRITE_HEADER, f"{time.time():.3f}")]
+        if lsn:
+            stamps.append((LAST_WRITE_LSN_COOKIE, LAST_WRITE_LSN_HEADER, lsn))
+        for cookie, header, value in stamps:
+            response.set_cookie(cookie, value, max_age=max_age, httponly=True, samesite="lax")
+            response.headers[header] = value
+    return response